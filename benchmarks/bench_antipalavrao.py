@@ -0,0 +1,80 @@
+"""Vazão do filtro de palavras: `any(palavra in texto)` contra o autômato Aho–Corasick.
+
+Usa a lista de moderation_config.json e listas maiores geradas a partir
+dela, sobre um corpus sintético com tamanhos de mensagem típicos de chat.
+
+Uso: python benchmarks/bench_antipalavrao.py [mensagens]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cogs._aho_corasick import AutomatoPalavras
+
+VOCABULARIO = (
+    "oi tudo bem com vocês hoje alguém vai jogar mais tarde eu acho que sim "
+    "mas preciso terminar o trabalho primeiro kkkk valeu mano boa noite pessoal "
+    "quem tá no call bora partida ranqueada servidor caiu de novo que isso "
+    "alguém viu o vídeo novo muito bom demais aquele boss é difícil"
+).split()
+
+
+def gerar_mensagem(palavrao, taxa_palavrao=0.05):
+    # Maioria curta, algumas longas (colagens de texto, links, etc.)
+    tamanho = min(int(random.expovariate(1 / 12)) + 1, 300)
+    palavras = [random.choice(VOCABULARIO) for _ in range(tamanho)]
+    if random.random() < taxa_palavrao:
+        palavras.insert(random.randrange(len(palavras) + 1), random.choice(palavrao))
+    return " ".join(palavras)
+
+
+def expandir_lista(base, tamanho):
+    lista = list(base)
+    while len(lista) < tamanho:
+        palavra = random.choice(base)
+        lista.append(palavra + random.choice("aeiouxz") + str(len(lista)))
+    return lista
+
+
+def vazao(funcao, corpus):
+    inicio = time.perf_counter()
+    encontradas = sum(1 for texto in corpus if funcao(texto))
+    return len(corpus) / (time.perf_counter() - inicio), encontradas
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    random.seed(7)
+
+    with open(os.path.join(RAIZ, "moderation_config.json"), encoding="utf-8") as f:
+        base = json.load(f)["blocked_words"]
+
+    corpus = [gerar_mensagem(base).lower() for _ in range(total)]
+    media = sum(map(len, corpus)) / len(corpus)
+    print(f"Mensagens: {total} (média de {media:.0f} caracteres)")
+
+    for tamanho in (len(base), 500, 2000):
+        palavras = expandir_lista(base, tamanho)
+
+        inicio = time.perf_counter()
+        automato = AutomatoPalavras(palavras)
+        montagem = time.perf_counter() - inicio
+
+        ingenua, achadas_ingenua = vazao(lambda t: any(p in t for p in palavras), corpus)
+        aho, achadas_aho = vazao(automato.buscar, corpus)
+        assert achadas_ingenua == achadas_aho
+
+        print(
+            f"{tamanho:>5} palavras | any(): {ingenua:>9.0f} msg/s | "
+            f"Aho–Corasick: {aho:>9.0f} msg/s ({aho / ingenua:.1f}x) | "
+            f"montagem {montagem * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compara um !rank ingênuo (ordenar todos os usuários por carteira + banco) com o Ranking incremental.
+
+Uso: python benchmarks/bench_baltop.py [usuarios]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._ranking import Ranking
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    random.seed(42)
+
+    # Mesmo formato de data['users'] na economia
+    users = {
+        str(uid): {"money": int(random.paretovariate(1.2) * 100), "bank": random.randint(0, 5000)}
+        for uid in range(10**17, 10**17 + usuarios)
+    }
+    ids = [int(uid) for uid in users]
+
+    def top_por_ordenacao(pagina=1):
+        ordem = sorted(users.items(), key=lambda item: (-(item[1]["money"] + item[1]["bank"]), int(item[0])))
+        return [(int(uid), u["money"] + u["bank"]) for uid, u in ordem[(pagina - 1) * 10:pagina * 10]]
+
+    def posicao_por_ordenacao(alvo):
+        ordem = sorted(users.items(), key=lambda item: (-(item[1]["money"] + item[1]["bank"]), int(item[0])))
+        return next(i for i, (uid, _) in enumerate(ordem, 1) if int(uid) == alvo)
+
+    inicio = time.perf_counter()
+    ranking = Ranking({int(uid): (u["money"] + u["bank"],) for uid, u in users.items()})
+    montagem = time.perf_counter() - inicio
+
+    alvo = ids[len(ids) // 2]
+    assert ranking.top(10) == top_por_ordenacao()
+    assert ranking.pagina(500) == top_por_ordenacao(500)
+    assert ranking.posicao(alvo) == posicao_por_ordenacao(alvo)
+
+    def movimentar():
+        # O que change_balance faz a cada daily/work/aposta
+        uid = random.choice(ids)
+        u = users[str(uid)]
+        u["money"] += random.randint(-50, 150)
+        ranking.atualizar(uid, u["money"] + u["bank"])
+
+    resultados = [
+        ("sort: top 10", medir(top_por_ordenacao, 3)),
+        ("sort: posição de um usuário", medir(lambda: posicao_por_ordenacao(alvo), 3)),
+        ("ranking: top 10", medir(lambda: ranking.top(10), 10_000)),
+        ("ranking: página 500", medir(lambda: ranking.pagina(500), 10_000)),
+        ("ranking: posição de um usuário", medir(lambda: ranking.posicao(random.choice(ids)), 10_000)),
+        ("ranking: movimentação de saldo", medir(movimentar, 50_000)),
+    ]
+
+    print(f"Usuários: {usuarios}")
+    print(f"Montagem inicial do ranking: {montagem * 1000:.1f}ms")
+    for nome, segundos in resultados:
+        print(f"{nome:<36} {segundos * 1e6:>12.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Mede o sorteio da loteria com muitos bilhetes na rodada.
+
+Compara a conferência vetorizada do TicketPool com a conferência bilhete a
+bilhete usando sets (como o comando fazia antes, um sorteio por bilhete).
+
+Uso: python benchmarks/bench_loteria.py [bilhetes] [usuarios]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._lottery import NUMBERS, PICKS, TicketPool, from_mask, to_mask
+from cogs.economia import LOTTERY_PRIZES
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) / repeticoes
+
+
+def bilhetes_aleatorios(quantidade, rng):
+    # Seis números distintos por bilhete: os seis menores de uma permutação por linha
+    numeros = np.argsort(rng.random((quantidade, NUMBERS)), axis=1)[:, :PICKS].astype(np.uint64)
+    return np.bitwise_or.reduce(np.uint64(1) << numeros, axis=1)
+
+
+def main():
+    bilhetes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    usuarios = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    rng = np.random.default_rng(42)
+    random.seed(42)
+
+    masks = bilhetes_aleatorios(bilhetes, rng)
+    donos = rng.integers(10**17, 10**17 + usuarios, size=bilhetes, dtype=np.uint64)
+
+    pool = TicketPool()
+    _, tempo_carga = medir(lambda: (pool.clear(), pool.extend(donos, masks)), 3)
+    sorteada = to_mask(random.sample(range(1, NUMBERS + 1), PICKS))
+
+    (ganhadores, totais, _, faixas), tempo_pool = medir(lambda: pool.payouts(sorteada, LOTTERY_PRIZES), 5)
+
+    amostra = min(bilhetes, 100_000)
+    numeros_sorteados = set(from_mask(sorteada))
+    conjuntos = [(int(u), set(from_mask(int(m)))) for u, m in zip(donos[:amostra], masks[:amostra])]
+
+    def por_bilhete():
+        premios = {}
+        for uid, numeros in conjuntos:
+            premio = LOTTERY_PRIZES.get(len(numeros & numeros_sorteados), 0)
+            if premio:
+                premios[uid] = premios.get(uid, 0) + premio
+        return premios
+
+    premios, tempo_sets = medir(por_bilhete, 1)
+    esperado = {uid: total for uid, total in zip(*pool_amostra(donos, masks, amostra, sorteada)) if total}
+    assert premios == esperado
+
+    print(f"Bilhetes: {bilhetes} | usuários: {usuarios} | memória do pool: {bilhetes * 16 / 2**20:.1f}MB")
+    print(f"{'carga do pool':<32} {tempo_carga * 1000:>10.1f}ms")
+    print(f"{'TicketPool: conferir e somar':<32} {tempo_pool * 1000:>10.1f}ms")
+    print(f"{'sets (estimado p/ todos)':<32} {tempo_sets * bilhetes / amostra * 1000:>10.1f}ms")
+    print(f"{'ganhadores':<32} {len(ganhadores):>10} (${sum(totais)} em prêmios)")
+    print(f"{'bilhetes por faixa':<32} {faixas}")
+
+
+def pool_amostra(donos, masks, quantidade, sorteada):
+    pool = TicketPool()
+    pool.extend(donos[:quantidade], masks[:quantidade])
+    usuarios, totais, _, _ = pool.payouts(sorteada, LOTTERY_PRIZES)
+    return usuarios, totais
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compara a memória e o tamanho gravado do XP em dicts (formato antigo) e em TabelaXP.
+
+Uso: python benchmarks/bench_memoria_xp.py [membros]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._regras_xp import ConfigXP
+from cogs._tabela_xp import BYTES_POR_LINHA, TabelaXP
+
+
+def medir_memoria(montar):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    objeto = montar()
+    duracao = time.perf_counter() - inicio
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objeto, atual, duracao
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    membros = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(42)
+    agora = int(time.time())
+    valores = [
+        (uid, random.randint(0, 500), random.randint(1, 60), random.randint(0, 50_000), uid % 50 == 0)
+        for uid in range(10**17, 10**17 + membros)
+    ]
+
+    # Mesmo formato de self.dados[gid] antes da TabelaXP (VIP com data ISO, como era gravado)
+    guild, memoria_dicts, _ = medir_memoria(lambda: {
+        str(uid): {
+            "xp": xp, "nivel": nivel, "mensagens": mensagens, "vip": vip,
+            "vip_expira": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(agora + 86400)) if vip else None
+        }
+        for uid, xp, nivel, mensagens, vip in valores
+    })
+
+    def montar_tabela():
+        tabela = TabelaXP(capacidade=membros)
+        for uid, xp, nivel, mensagens, vip in valores:
+            tabela.registro(uid).update(
+                xp=xp, nivel=nivel, mensagens=mensagens, vip=vip, vip_expira=agora + 86400 if vip else None
+            )
+        return tabela
+
+    tabela, memoria_tabela, montagem = medir_memoria(montar_tabela)
+
+    inicio = time.perf_counter()
+    json_gravado = sum(len(json.dumps(info)) + len(uid) + 20 for uid, info in guild.items())
+    tempo_json = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    binario = [(bloco, tabela.serializar_bloco(bloco)) for bloco in range(tabela.blocos)]
+    tempo_binario = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    relida = TabelaXP.desserializar(binario)
+    tempo_leitura = time.perf_counter() - inicio
+    assert relida.top(10) == tabela.top(10)
+
+    def top_por_ordenacao():
+        usuarios = [(int(uid), info["nivel"], info["xp"]) for uid, info in guild.items()]
+        return sorted(usuarios, key=lambda x: (-x[1], -x[2], x[0]))[:10]
+
+    assert tabela.top(10) == top_por_ordenacao()
+    alvo = valores[membros // 2][0]
+    todas = tabela.selecionar()
+    config = ConfigXP()
+
+    print(f"Membros: {membros} ({BYTES_POR_LINHA} bytes por linha nas colunas)")
+    print(f"{'dicts: memória':<36} {memoria_dicts / 2**20:>10.1f}MB ({memoria_dicts / membros:.0f} B/membro)")
+    print(f"{'TabelaXP: memória':<36} {memoria_tabela / 2**20:>10.1f}MB ({memoria_tabela / membros:.0f} B/membro)")
+    print(f"{'TabelaXP: montagem (com tracemalloc)':<36} {montagem:>10.2f}s")
+    print(f"{'JSON por registro: tamanho':<36} {json_gravado / 2**20:>10.1f}MB ({tempo_json:.2f}s)")
+    print(f"{'binário: tamanho':<36} {sum(len(dados) for _, dados in binario) / 2**20:>10.1f}MB ({tempo_binario * 1000:.1f}ms)")
+    print(f"{'binário: leitura':<36} {tempo_leitura * 1000:>10.1f}ms")
+    for nome, segundos in (
+        ("dicts: top 10 (sort)", medir(top_por_ordenacao, 3)),
+        ("TabelaXP: top 10", medir(lambda: tabela.top(10), 20)),
+        ("TabelaXP: página 500", medir(lambda: tabela.top(10, 4990), 20)),
+        ("TabelaXP: posição de um usuário", medir(lambda: tabela.posicao(alvo), 20)),
+        ("TabelaXP: busca de um registro", medir(lambda: tabela.registro(alvo)["xp"], 100_000)),
+        ("TabelaXP: decaimento de 10% (todos)", medir(lambda: tabela.decair(todas, 10, config), 3)),
+        ("TabelaXP: +100 XP (todos)", medir(lambda: tabela.conceder(todas, 100, config), 3)),
+    ):
+        print(f"{nome:<36} {segundos * 1000:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Compara os formatos dos perfis da economia: economy_data.json, linhas JSON e binário.
+
+- economy_data.json: o arquivo único de antes do SQLite (json.dump com indent=2)
+- linhas JSON: uma linha por usuário na coleção `economia_usuarios`
+- binário: uma linha por usuário em `economia_perfis` (cogs/_profiles.py),
+  decodificada só no primeiro acesso
+
+Mede tamanho, tempo para gravar tudo e tempo para carregar (inclusive a
+leitura do SQLite, em um banco temporário).
+
+Uso: python benchmarks/bench_perfis_economia.py [usuarios]
+"""
+import gc
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._profiles import Profiles, create_tables, from_json, pack, read_profiles, write_profiles
+
+ITENS = ['💎', '🏆', '🎮', '🍕', '🚗', '🏠', '🔥', '🌟', '🎁']
+
+
+def perfil_antigo(agora):
+    def horario(chance):
+        if random.random() < chance:
+            return datetime.fromtimestamp(agora - random.randint(0, 86400 * 30)).isoformat()
+        return None
+
+    return {
+        'money': int(random.paretovariate(1.2) * 100),
+        'bank': random.randint(0, 5000),
+        'inventory': {emoji: random.randint(1, 5) for emoji in random.sample(ITENS, random.choice((0, 0, 1, 2, 4)))},
+        'daily_claimed': horario(0.7),
+        'work_cooldown': horario(0.5),
+        'level': random.randint(1, 40),
+        'xp': random.randint(0, 3900),
+    }
+
+
+def cronometrar(funcao):
+    # Sem o coletor de lixo, como o timeit: com milhões de objetos vivos, ele domina as medições
+    gc.disable()
+    try:
+        inicio = time.perf_counter()
+        resultado = funcao()
+        return resultado, time.perf_counter() - inicio
+    finally:
+        gc.enable()
+
+
+def memoria(funcao):
+    gc.collect()
+    tracemalloc.start()
+    objeto = funcao()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objeto, atual
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(42)
+    agora = int(time.time())
+    antigos = {str(uid): perfil_antigo(agora) for uid in range(10**17, 10**17 + usuarios)}
+    saldos = {uid: {'money': p['money'], 'bank': p['bank']} for uid, p in antigos.items()}
+    pasta = tempfile.mkdtemp(prefix="bench_perfis_")
+
+    try:
+        # economy_data.json: o arquivo inteiro a cada save_data
+        arquivo = os.path.join(pasta, "economy_data.json")
+
+        def gravar_arquivo():
+            with open(arquivo, "w", encoding="utf-8") as f:
+                json.dump({'users': antigos}, f, indent=2, default=str)
+
+        def ler_arquivo():
+            with open(arquivo, encoding="utf-8") as f:
+                return json.load(f)
+
+        _, grava_arquivo = cronometrar(gravar_arquivo)
+        _, le_arquivo = cronometrar(ler_arquivo)
+        tamanho_arquivo = os.path.getsize(arquivo)
+
+        # Linhas JSON e binárias no SQLite, como o Armazenamento grava
+        conexao = sqlite3.connect(os.path.join(pasta, "bench.db"), isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("CREATE TABLE registros (colecao TEXT, chave TEXT, valor TEXT, PRIMARY KEY (colecao, chave)) WITHOUT ROWID")
+        create_tables(conexao)
+
+        def gravar_json():
+            linhas = [
+                ('economia_usuarios', uid, json.dumps({k: v for k, v in p.items() if k not in saldos[uid]},
+                                                      ensure_ascii=False, default=str))
+                for uid, p in antigos.items()
+            ]
+            conexao.execute("BEGIN")
+            conexao.executemany("INSERT OR REPLACE INTO registros VALUES (?, ?, ?)", linhas)
+            conexao.execute("COMMIT")
+            return sum(len(chave) + len(valor.encode()) for _, chave, valor in linhas)
+
+        def ler_json():
+            linhas = conexao.execute("SELECT chave, valor FROM registros WHERE colecao = 'economia_usuarios'")
+            users = {chave: json.loads(valor) for chave, valor in linhas}
+            for uid, saldo in saldos.items():
+                users[uid].update(saldo)
+            return users
+
+        perfis = {uid: from_json(p) for uid, p in antigos.items()}
+
+        def gravar_binario():
+            linhas = [(uid, pack(p)) for uid, p in perfis.items()]
+            conexao.execute("BEGIN")
+            write_profiles(conexao, linhas)
+            conexao.execute("COMMIT")
+            return sum(len(uid) + len(dados) for uid, dados in linhas)
+
+        def ler_binario():
+            return Profiles(read_profiles(conexao), saldos)
+
+        tamanho_json, grava_json = cronometrar(gravar_json)
+        _, le_json = cronometrar(ler_json)
+        tamanho_binario, grava_binario = cronometrar(gravar_binario)
+        carregados, le_binario = cronometrar(ler_binario)
+
+        amostra = random.sample(list(antigos), 10_000)
+        _, decodifica = cronometrar(lambda: [carregados[uid] for uid in amostra])
+        for uid in amostra[:100]:
+            esperado = dict(perfis[uid], **saldos[uid])
+            assert carregados[uid] == esperado, uid
+        _, decodifica_todos = cronometrar(lambda: [carregados[uid] for uid in antigos])
+
+        _, memoria_json = memoria(ler_json)
+        _, memoria_binario = memoria(ler_binario)
+        conexao.close()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    print(f"Usuários: {usuarios}")
+    print(f"{'formato':<22} {'tamanho':>10} {'gravar tudo':>12} {'carregar':>10} {'memória':>10}")
+    print(f"{'economy_data.json':<22} {tamanho_arquivo / 2**20:>8.1f}MB {grava_arquivo:>11.2f}s {le_arquivo:>9.2f}s {'':>10}")
+    print(f"{'linhas JSON':<22} {tamanho_json / 2**20:>8.1f}MB {grava_json:>11.2f}s {le_json:>9.2f}s "
+          f"{memoria_json / 2**20:>8.0f}MB")
+    print(f"{'binário (sob demanda)':<22} {tamanho_binario / 2**20:>8.1f}MB {grava_binario:>11.2f}s {le_binario:>9.2f}s "
+          f"{memoria_binario / 2**20:>8.0f}MB")
+    print(f"{'decodificar 1 perfil':<22} {decodifica / len(amostra) * 1e6:>10.1f}µs")
+    print(f"{'decodificar todos':<22} {decodifica_todos:>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compara o !topxp antigo (ordenar a guild inteira) com o Ranking incremental.
+
+Uso: python benchmarks/bench_ranking.py [membros]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._ranking import Ranking
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    membros = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(42)
+
+    # Mesmo formato de self.dados[gid] no SistemaXP
+    guild = {
+        str(uid): {"xp": random.randint(0, 500), "nivel": random.randint(1, 60), "mensagens": 0}
+        for uid in range(10**17, 10**17 + membros)
+    }
+    ids = [int(uid) for uid in guild]
+
+    def top_por_ordenacao():
+        usuarios = [(int(uid), info["nivel"], info["xp"]) for uid, info in guild.items()]
+        return sorted(usuarios, key=lambda x: (x[1], x[2]), reverse=True)[:10]
+
+    def posicao_por_ordenacao():
+        usuarios = [(int(uid), info["nivel"], info["xp"]) for uid, info in guild.items()]
+        ordem = sorted(usuarios, key=lambda x: (-x[1], -x[2], x[0]))
+        alvo = ids[len(ids) // 2]
+        return next(i for i, u in enumerate(ordem, 1) if u[0] == alvo)
+
+    inicio = time.perf_counter()
+    ranking = Ranking({int(uid): (info["nivel"], info["xp"]) for uid, info in guild.items()})
+    montagem = time.perf_counter() - inicio
+
+    assert [u[0] for u in ranking.top(10)] == [u[0] for u in top_por_ordenacao()]
+    assert ranking.posicao(ids[len(ids) // 2]) == posicao_por_ordenacao()
+
+    def atualizar():
+        uid = random.choice(ids)
+        info = guild[str(uid)]
+        info["xp"] += 10
+        ranking.atualizar(uid, info["nivel"], info["xp"])
+
+    resultados = [
+        ("sort: top 10", medir(top_por_ordenacao, 5)),
+        ("sort: posição de um usuário", medir(posicao_por_ordenacao, 5)),
+        ("ranking: top 10", medir(lambda: ranking.top(10), 10_000)),
+        ("ranking: página 500", medir(lambda: ranking.pagina(500), 10_000)),
+        ("ranking: posição de um usuário", medir(lambda: ranking.posicao(random.choice(ids)), 10_000)),
+        ("ranking: atualização (ganho de XP)", medir(atualizar, 50_000)),
+    ]
+
+    print(f"Membros: {membros}")
+    print(f"Montagem inicial do ranking: {montagem * 1000:.1f}ms")
+    for nome, segundos in resultados:
+        print(f"{nome:<36} {segundos * 1e6:>12.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Replay offline das regras de XP (as mesmas do on_message e do !xpbackfill).
+
+Sem argumentos, gera um histórico sintético e mede a vazão do replay. Com
+um CSV (user_id,timestamp por linha, em ordem de tempo), reproduz o arquivo
+e mostra o top 10 resultante.
+
+Uso: python benchmarks/replay_xp.py [mensagens | arquivo.csv]
+"""
+import csv
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._regras_xp import ConfigXP, reproduzir
+
+
+def gerar_eventos(total, membros=5_000, mensagens_por_segundo=5):
+    # Poucos membros falam muito, a maioria fala pouco
+    pesos = [1 / (i + 1) for i in range(membros)]
+    autores = random.choices(range(10**17, 10**17 + membros), weights=pesos, k=total)
+    agora = 1_700_000_000.0
+    eventos = []
+    for autor in autores:
+        agora += random.expovariate(mensagens_por_segundo)
+        eventos.append((autor, agora))
+    return eventos
+
+
+def ler_csv(caminho):
+    with open(caminho, newline="", encoding="utf-8") as f:
+        return [(int(linha[0]), float(linha[1])) for linha in csv.reader(f) if linha]
+
+
+def main():
+    random.seed(3)
+    argumento = sys.argv[1] if len(sys.argv) > 1 else "1000000"
+    eventos = ler_csv(argumento) if os.path.exists(argumento) else gerar_eventos(int(argumento))
+    vips = {autor for autor, _ in eventos[:1000:10]}
+
+    inicio = time.perf_counter()
+    usuarios = reproduzir(eventos, ConfigXP(), vips)
+    duracao = time.perf_counter() - inicio
+
+    print(f"Mensagens: {len(eventos)} | membros: {len(usuarios)} | VIPs: {len(vips)}")
+    print(f"Replay: {duracao:.2f}s ({len(eventos) / duracao:,.0f} mensagens/s)")
+    top = sorted(usuarios.items(), key=lambda item: (item[1]["nivel"], item[1]["xp"]), reverse=True)[:10]
+    for posicao, (autor, usuario) in enumerate(top, 1):
+        print(f"{posicao:>2}. {autor} | nível {usuario['nivel']} | {usuario['xp']} XP | {usuario['mensagens']} mensagens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Simulação Monte Carlo da economia: quanto dinheiro os comandos criam e destroem.
+
+Usa as mesmas regras de cogs/economia.py (DAILY_REWARD, BET_WIN_CHANCE,
+ROB_CHANCE, LOTTERY_PRIZES...), então basta mudar uma constante lá e rodar
+de novo. Cada dia simulado sorteia de uma vez, em arrays do NumPy, o que
+todos os jogadores fazem: daily, trabalhos, apostas, roubos e bilhetes da
+loteria. Só a carteira é simulada; nada vai para o banco.
+
+Simplificações:
+- Os roubos acontecem em rodadas; em cada uma, um jogador é roubado no
+  máximo uma vez.
+- A aposta é uma fração fixa da carteira (`--aposta`), até `--aposta-max`.
+- Quantas vezes cada jogador usa um comando no dia é a média dele,
+  arredondada para cima ou para baixo ao acaso (mais barato que Poisson e
+  com a mesma média).
+- Os bilhetes da loteria têm números aleatórios, então os acertos de cada
+  um seguem a distribuição hipergeométrica.
+
+Mostra a evolução do dinheiro em circulação e do coeficiente de Gini, e o
+valor esperado de cada comando (simulado e calculado pelas regras).
+
+Uso: python benchmarks/sim_economia.py [--jogadores 50000] [--dias 365] [--vips 0.05]
+                                       [--trabalhos 3] [--apostas 2] [--roubos 0.5] [--bilhetes 0.3]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._lottery import NUMBERS, PICKS
+from cogs.economia import (
+    BET_PAYOUT, BET_WIN_CHANCE, BET_WIN_CHANCE_VIP, DAILY_HOURS, DAILY_REWARD, DAILY_VIP_BONUS,
+    LOTTERY_HOURS, LOTTERY_PRIZES, LOTTERY_TICKET_PRICE, LOTTERY_VIP_BONUS, ROB_CHANCE, ROB_FINE,
+    ROB_HOURS, ROB_MIN_TARGET_BALANCE, ROB_STEAL_MAX, ROB_STEAL_MIN, ROB_TARGET_VIP_PENALTY,
+    ROB_VIP_BONUS, WORK_HOURS, WORK_PAY, WORK_VIP_BONUS
+)
+
+SALDO_INICIAL = 100  # Mesmo valor da 'abertura' em get_user_data
+
+COMANDOS = ("daily", "work", "apostar", "roubar", "loteria")
+
+
+class Contabilidade:
+    """Usos e dinheiro líquido criado (positivo) ou destruído (negativo) por comando."""
+
+    def __init__(self):
+        self.usos = dict.fromkeys(COMANDOS, 0)
+        self.liquido = dict.fromkeys(COMANDOS, 0)
+        self.extras = {}
+
+    def registrar(self, comando, usos, liquido):
+        self.usos[comando] += int(usos)
+        self.liquido[comando] += int(liquido)
+
+    def contar(self, nome, quantidade):
+        self.extras[nome] = self.extras.get(nome, 0) + int(quantidade)
+
+
+def gini(valores):
+    ordenados = np.sort(valores).astype(np.float64)
+    total = ordenados.sum()
+    if total <= 0:
+        return 0.0
+    n = len(ordenados)
+    pesos = np.arange(1, n + 1, dtype=np.float64)
+    return float((2 * (pesos * ordenados).sum()) / (n * total) - (n + 1) / n)
+
+
+def inteiros(rng, faixa, tamanho):
+    """Como random.randint(a, b), com os dois extremos incluídos."""
+    return rng.integers(faixa[0], faixa[1] + 1, size=tamanho)
+
+
+def usos(rng, media):
+    """Usos no dia: `media` arredondada ao acaso, para que a média de longo prazo seja exata."""
+    return (media + rng.random(len(media))).astype(np.int64)
+
+
+def probabilidades_loteria():
+    """Chance de cada quantidade de acertos para um bilhete de PICKS números."""
+    total = math.comb(NUMBERS, PICKS)
+    return {k: math.comb(PICKS, k) * math.comb(NUMBERS - PICKS, PICKS - k) / total for k in range(PICKS + 1)}
+
+
+def valor_esperado(vip):
+    """Valor esperado de um uso de cada comando, direto das regras (aposta de $1)."""
+    bonus_trabalho = WORK_VIP_BONUS if vip else 0
+    chance_aposta = BET_WIN_CHANCE_VIP if vip else BET_WIN_CHANCE
+    premio_loteria = sum(p * LOTTERY_PRIZES.get(k, 0) for k, p in probabilidades_loteria().items())
+    if vip:
+        premio_loteria *= 1 + LOTTERY_VIP_BONUS
+    multa_media = sum(ROB_FINE) / 2
+    return {
+        "daily": DAILY_REWARD + (DAILY_VIP_BONUS if vip else 0),
+        "work": sum(WORK_PAY) / 2 * (1 + bonus_trabalho),
+        "apostar": chance_aposta * sum(BET_PAYOUT) / 2 - 1,
+        # O valor roubado só muda de dono; para a economia, o roubo só destrói a multa
+        "roubar": -(1 - ROB_CHANCE - (ROB_VIP_BONUS if vip else 0)) * multa_media,
+        "loteria": premio_loteria - LOTTERY_TICKET_PRICE,
+    }
+
+
+def simular(args):
+    rng = np.random.default_rng(args.semente)
+    n = args.jogadores
+    carteira = np.full(n, SALDO_INICIAL, dtype=np.int64)
+    vip = rng.random(n) < args.vips
+    # Atividade de cada jogador: poucos jogam muito, a maioria joga pouco. Em ordem
+    # decrescente, quem ainda aposta na rodada r está sempre no começo dos arrays.
+    atividade = np.sort(np.minimum(rng.pareto(2.0, n) + 0.2, 5.0))[::-1]
+    chance_aposta = np.where(vip, BET_WIN_CHANCE_VIP, BET_WIN_CHANCE)
+    conta = Contabilidade()
+
+    max_trabalhos = int(24 / WORK_HOURS)
+    max_roubos = int(24 / ROB_HOURS)
+    sorteios_por_dia = max(1, round(24 / LOTTERY_HOURS))
+    premios = np.zeros(PICKS + 1, dtype=np.int64)
+    for acertos, premio in LOTTERY_PRIZES.items():
+        premios[acertos] = premio
+    # Acertos de um bilhete aleatório por sorteio inverso na distribuição acumulada
+    acumulada = np.cumsum(list(probabilidades_loteria().values()))
+
+    historico = [(0, int(carteira.sum()), gini(carteira))]
+    marcos = set(np.linspace(0, args.dias, min(args.dias, 12) + 1, dtype=int)[1:])
+
+    for dia in range(1, args.dias + 1):
+        # daily: uma vez a cada DAILY_HOURS
+        for _ in range(max(1, int(24 / DAILY_HOURS))):
+            coletou = rng.random(n) < np.minimum(args.daily * atividade, 1)
+            ganho = np.where(coletou, DAILY_REWARD + np.where(vip, DAILY_VIP_BONUS, 0), 0)
+            carteira += ganho
+            conta.registrar("daily", coletou.sum(), ganho.sum())
+
+        # work: até um por WORK_HOURS; só soma dinheiro, então todos os trabalhos do dia saem juntos
+        trabalhos = np.minimum(usos(rng, args.trabalhos * atividade), max_trabalhos)
+        trabalhou = np.flatnonzero(trabalhos)
+        base = inteiros(rng, WORK_PAY, int(trabalhos.sum()))
+        ganho = base + np.where(np.repeat(vip[trabalhou], trabalhos[trabalhou]), (base * WORK_VIP_BONUS).astype(np.int64), 0)
+        # Os trabalhos de cada jogador são vizinhos no array, então a soma por jogador é um reduceat
+        inicio = np.concatenate(([0], np.cumsum(trabalhos[trabalhou])[:-1]))
+        carteira[trabalhou] += np.add.reduceat(ganho, inicio) if len(trabalhou) else 0
+        conta.registrar("work", len(base), ganho.sum())
+
+        # loteria: bilhetes comprados durante o dia, sorteados juntos
+        for _ in range(sorteios_por_dia):
+            quer = usos(rng, args.bilhetes * atividade / sorteios_por_dia)
+            bilhetes = np.minimum(quer, carteira // LOTTERY_TICKET_PRICE)
+            carteira -= bilhetes * LOTTERY_TICKET_PRICE
+            total = int(bilhetes.sum())
+            if total:
+                donos = np.repeat(np.arange(n), bilhetes)
+                acertos = np.minimum(acumulada.searchsorted(rng.random(total), side="right"), PICKS)
+                premio = np.bincount(donos, weights=premios[acertos], minlength=n).astype(np.int64)
+                premio += np.where(vip, (premio * LOTTERY_VIP_BONUS).astype(np.int64), 0)
+                carteira += premio
+                conta.registrar("loteria", total, premio.sum() - total * LOTTERY_TICKET_PRICE)
+
+        # apostar: uma fração da carteira por aposta, limitada a --aposta-max
+        media = args.apostas * atividade
+        apostas = usos(rng, media)
+        for rodada in range(int(apostas.max(initial=0))):
+            k = np.count_nonzero(media > rodada)
+            valor = np.minimum((carteira[:k] * args.aposta).astype(np.int64), args.aposta_max)
+            valor *= apostas[:k] > rodada
+            ganhou = rng.random(k) < chance_aposta[:k]
+            retorno = (valor * rng.uniform(*BET_PAYOUT, size=k)).astype(np.int64)
+            liquido = np.where(ganhou, retorno - valor, -valor)
+            carteira[:k] += liquido
+            conta.registrar("apostar", np.count_nonzero(valor), liquido.sum())
+            conta.contar("apostado", valor.sum())
+
+        # roubar: alvos de uma permutação aleatória, então ninguém é roubado duas vezes na mesma rodada
+        roubos = np.minimum(usos(rng, args.roubos * atividade), max_roubos)
+        for rodada in range(int(roubos.max(initial=0))):
+            ladroes = np.flatnonzero(roubos > rodada)
+            alvos = rng.permutation(n)[ladroes]
+            ladroes, alvos = ladroes[alvos != ladroes], alvos[alvos != ladroes]
+
+            saldo_alvo = carteira[alvos]
+            pode = saldo_alvo >= ROB_MIN_TARGET_BALANCE
+            conta.contar("roubos contra alvos pobres", (~pode).sum())
+            ladroes, alvos, saldo_alvo = ladroes[pode], alvos[pode], saldo_alvo[pode]
+
+            chance = ROB_CHANCE + np.where(vip[ladroes], ROB_VIP_BONUS, 0) - np.where(vip[alvos], ROB_TARGET_VIP_PENALTY, 0)
+            sucesso = rng.random(len(ladroes)) < chance
+            maximo = np.minimum(saldo_alvo // 3, ROB_STEAL_MAX)
+            # Como no comando: abaixo de ROB_STEAL_MIN, o mínimo cai para o próprio máximo
+            roubado = rng.integers(np.minimum(ROB_STEAL_MIN, maximo), maximo + 1)
+            roubado = np.where(sucesso, roubado, 0)
+            falhou = ~sucesso
+            # Alvos e ladrões são únicos na rodada, mas um ladrão pode ser alvo de outro
+            carteira[alvos] -= roubado
+            multa = np.where(falhou, np.minimum(inteiros(rng, ROB_FINE, len(ladroes)), carteira[ladroes]), 0)
+            carteira[ladroes] += roubado - multa
+            conta.registrar("roubar", len(ladroes), -multa.sum())
+            conta.contar("dinheiro roubado", roubado.sum())
+
+        if dia in marcos:
+            historico.append((dia, int(carteira.sum()), gini(carteira)))
+
+    return carteira, vip, historico, conta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jogadores", type=int, default=50_000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--vips", type=float, default=0.05, help="fração de jogadores VIP")
+    parser.add_argument("--daily", type=float, default=0.6, help="chance de coletar o daily (jogador médio)")
+    parser.add_argument("--trabalhos", type=float, default=3, help="trabalhos por dia (jogador médio)")
+    parser.add_argument("--apostas", type=float, default=2, help="apostas por dia (jogador médio)")
+    parser.add_argument("--aposta", type=float, default=0.1, help="fração da carteira em cada aposta")
+    parser.add_argument("--aposta-max", type=int, default=1000, help="valor máximo de cada aposta")
+    parser.add_argument("--roubos", type=float, default=0.5, help="tentativas de roubo por dia (jogador médio)")
+    parser.add_argument("--bilhetes", type=float, default=0.3, help="bilhetes da loteria por dia (jogador médio)")
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    carteira, vip, historico, conta = simular(args)
+    duracao = time.perf_counter() - inicio
+
+    dias_jogador = args.jogadores * args.dias
+    print(f"Jogadores: {args.jogadores} ({vip.sum()} VIPs) | dias: {args.dias} | "
+          f"{dias_jogador:,} dias-jogador em {duracao:.2f}s ({dias_jogador / duracao:,.0f}/s)")
+
+    print(f"\n{'dia':>5} {'em circulação':>16} {'crescimento':>12} {'por jogador':>12} {'Gini':>6}")
+    inicial = historico[0][1]
+    for dia, total, coeficiente in historico:
+        print(f"{dia:>5} {total:>16,} {(total / inicial - 1):>12.0%} {total / args.jogadores:>12,.0f} {coeficiente:>6.3f}")
+
+    ordenada = np.sort(carteira)
+    top1 = ordenada[-max(1, len(ordenada) // 100):].sum() / max(ordenada.sum(), 1)
+    print(f"\nmediana {np.median(carteira):,.0f} | top 1% com {top1:.0%} do dinheiro | "
+          f"zerados {np.mean(carteira == 0):.1%} | média VIP {carteira[vip].mean():,.0f} "
+          f"vs {carteira[~vip].mean():,.0f}")
+
+    esperado_normal = valor_esperado(False)
+    esperado_vip = valor_esperado(True)
+    print(f"\n{'comando':<10} {'usos':>14} {'criado':>16} {'por uso':>10} {'regras':>10} {'regras VIP':>11}")
+    for comando in COMANDOS:
+        divisor = conta.extras.get("apostado", 0) if comando == "apostar" else conta.usos[comando]
+        por_uso = conta.liquido[comando] / divisor if divisor else 0
+        print(f"{comando:<10} {conta.usos[comando]:>14,} {conta.liquido[comando]:>16,} {por_uso:>10.2f} "
+              f"{esperado_normal[comando]:>10.2f} {esperado_vip[comando]:>11.2f}")
+    print("(valor por uso: simulado e pelas regras; em 'apostar', por $1 apostado)")
+    for nome, quantidade in conta.extras.items():
+        print(f"{nome:<28} {quantidade:>14,}")
+
+
+if __name__ == "__main__":
+    main()
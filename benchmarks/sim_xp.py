@@ -0,0 +1,213 @@
+"""Simulação do on_message do SistemaXP com mensagens sintéticas, sem conexão ao Discord.
+
+Guilds, membros e mensagens são objetos simples com só os atributos que o
+cog usa. O tempo é simulado: o relógio avança conforme a taxa de mensagens,
+então os cooldowns se comportam como em produção mesmo com a simulação
+rodando muito mais rápido que o tempo real. As gravações em segundo plano
+vão para um banco temporário a cada `--intervalo-gravacao` segundos
+simulados.
+
+Mede mensagens por segundo, latência p50/p99 do handler, custo das
+gravações e crescimento de memória. Com `--max-p99-us` ou `--min-vazao`,
+termina com código 1 se o limite não for atingido (para rodar antes do deploy).
+
+Uso: python benchmarks/sim_xp.py [--guilds 5] [--membros 20000] [--vips 0.05]
+                                 [--mensagens 200000] [--taxa 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PASTA = tempfile.mkdtemp(prefix="sim_xp_")
+os.environ["BANCO_DADOS"] = os.path.join(PASTA, "sim.db")
+os.environ.setdefault("XP_JANELA_ANUNCIOS", "0")
+
+from cogs._armazenamento import obter_armazenamento
+from cogs._cooldowns import Cooldowns
+from cogs.sistema_xp import LIMITE_COOLDOWNS, SistemaXP
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1_700_000_000.0
+
+
+class CooldownsSimulados(Cooldowns):
+    """Cooldowns que usam o relógio da simulação no lugar do time.monotonic()."""
+
+    def __init__(self, relogio, **kwargs):
+        super().__init__(**kwargs)
+        self.relogio = relogio
+        self._inicio_geracao = relogio.agora
+
+    def tentar(self, guild_id, user_id, cooldown, agora=None):
+        return super().tentar(guild_id, user_id, cooldown, self.relogio.agora)
+
+
+class Bot:
+    def dispatch(self, evento, *args):
+        pass
+
+
+class Canal:
+    def __init__(self, id):
+        self.id = id
+        self.enviadas = 0
+
+    async def send(self, *args, **kwargs):
+        self.enviadas += 1
+
+
+class Guild:
+    def __init__(self, id):
+        self.id = id
+
+
+class Membro:
+    __slots__ = ("id", "bot", "mention", "avatar")
+
+    def __init__(self, id):
+        self.id = id
+        self.bot = False
+        self.mention = f"<@{id}>"
+        self.avatar = None
+
+
+class Mensagem:
+    __slots__ = ("author", "guild", "channel", "created_at")
+
+    def __init__(self, author, guild, channel, created_at):
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.created_at = created_at
+
+
+def memoria_maxima_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def simular(args):
+    random.seed(args.semente)
+    relogio = Relogio()
+    armazenamento = obter_armazenamento()
+
+    cog = SistemaXP(Bot())
+    await cog.cog_load()
+    cog.cooldowns = CooldownsSimulados(relogio, limite=LIMITE_COOLDOWNS, nome="xp")
+
+    guilds = [Guild(10**17 + g) for g in range(args.guilds)]
+    canais = [[Canal(guild.id * 10 + c) for c in range(args.canais)] for guild in guilds]
+    membros = [[Membro(2 * 10**17 + g * args.membros + m) for m in range(args.membros)] for g in range(args.guilds)]
+    # Poucos membros falam muito, a maioria fala pouco
+    pesos = [1 / (m + 1) ** 0.8 for m in range(args.membros)]
+
+    for g, guild in enumerate(guilds):
+        for membro in random.sample(membros[g], int(args.membros * args.vips)):
+            await cog.vips.definir((str(guild.id), str(membro.id)), None)
+
+    autores = random.choices(range(args.membros), weights=pesos, k=args.mensagens)
+    sorteio_guild = [random.randrange(args.guilds) for _ in range(args.mensagens)]
+
+    memoria_inicial = memoria_maxima_mb()
+    latencias = []
+    gravacoes = []
+    proxima_gravacao = relogio.agora + args.intervalo_gravacao
+
+    inicio = time.perf_counter()
+    for i in range(args.mensagens):
+        relogio.agora += random.expovariate(args.taxa)
+        g = sorteio_guild[i]
+        mensagem = Mensagem(
+            membros[g][autores[i]], guilds[g], random.choice(canais[g]),
+            datetime.fromtimestamp(relogio.agora, tz=timezone.utc)
+        )
+
+        antes = time.perf_counter_ns()
+        await cog.on_message(mensagem)
+        latencias.append(time.perf_counter_ns() - antes)
+
+        if relogio.agora >= proxima_gravacao:
+            proxima_gravacao = relogio.agora + args.intervalo_gravacao
+            pendentes = cog.gravacao.pendentes
+            antes = time.perf_counter()
+            await cog.gravacao.gravar_pendentes()
+            gravacoes.append((pendentes, time.perf_counter() - antes))
+        elif i % 1000 == 0:
+            await asyncio.sleep(0)  # Deixa as tarefas de anúncio rodarem
+    duracao = time.perf_counter() - inicio
+
+    memoria_final = memoria_maxima_mb()
+    membros_com_xp = sum(len(tabela) for tabela in cog.tabelas.values())
+    cooldowns = len(cog.cooldowns)
+    anuncios = sum(canal.enviadas for lista in canais for canal in lista)
+    await cog.cog_unload()
+    await armazenamento.fechar()
+    shutil.rmtree(PASTA, ignore_errors=True)
+
+    latencias.sort()
+    vazao = args.mensagens / duracao
+    p50 = percentil(latencias, 0.50) / 1000
+    p99 = percentil(latencias, 0.99) / 1000
+    simulado = relogio.agora - 1_700_000_000.0
+
+    print(f"Guilds: {args.guilds} | membros por guild: {args.membros} | VIPs: {args.vips:.0%} | "
+          f"mensagens: {args.mensagens} ({args.taxa:g}/s simuladas, {simulado / 60:.0f} min)")
+    print(f"{'vazão':<28} {vazao:>12,.0f} mensagens/s")
+    print(f"{'latência p50':<28} {p50:>12.1f}µs")
+    print(f"{'latência p99':<28} {p99:>12.1f}µs")
+    print(f"{'latência média':<28} {statistics.fmean(latencias) / 1000:>12.1f}µs")
+    if gravacoes:
+        blocos = sum(pendentes for pendentes, _ in gravacoes)
+        tempo = sum(segundos for _, segundos in gravacoes)
+        print(f"{'gravações':<28} {len(gravacoes):>12} ({blocos} blocos, "
+              f"média {tempo / len(gravacoes) * 1000:.1f}ms, máx {max(s for _, s in gravacoes) * 1000:.1f}ms)")
+    print(f"{'memória (pico do processo)':<28} {memoria_inicial:>9.1f}MB → {memoria_final:.1f}MB")
+    print(f"{'membros com XP':<28} {membros_com_xp:>12}")
+    print(f"{'cooldowns em memória':<28} {cooldowns:>12}")
+    print(f"{'mensagens de level up':<28} {anuncios:>12}")
+
+    falhou = False
+    if args.max_p99_us is not None and p99 > args.max_p99_us:
+        print(f"❌ p99 de {p99:.1f}µs acima do limite de {args.max_p99_us:g}µs")
+        falhou = True
+    if args.min_vazao is not None and vazao < args.min_vazao:
+        print(f"❌ vazão de {vazao:,.0f}/s abaixo do mínimo de {args.min_vazao:,.0f}/s")
+        falhou = True
+    return 1 if falhou else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=5)
+    parser.add_argument("--membros", type=int, default=20_000, help="membros por guild")
+    parser.add_argument("--vips", type=float, default=0.05, help="fração de membros VIP")
+    parser.add_argument("--mensagens", type=int, default=200_000)
+    parser.add_argument("--taxa", type=float, default=50, help="mensagens por segundo simulado, somando as guilds")
+    parser.add_argument("--canais", type=int, default=5, help="canais por guild")
+    parser.add_argument("--intervalo-gravacao", type=float, default=30, help="segundos simulados entre gravações")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--max-p99-us", type=float, default=None)
+    parser.add_argument("--min-vazao", type=float, default=None)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(simular(args)))
+
+
+if __name__ == "__main__":
+    main()
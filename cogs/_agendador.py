@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import time
+
+from cogs._metricas import tamanho_cache, remover_cache
+
+# Espera máxima entre verificações, para tolerar ajustes no relógio do sistema
+ESPERA_MAXIMA = 300
+# Itens cujo tratador falhou voltam depois de 30s, 60s, 120s... até no máximo 1 hora
+RETENTATIVA_INICIAL = 30
+RETENTATIVA_MAXIMA = 3600
+# Entradas velhas toleradas no heap (além de uma por item) antes de reconstruí-lo
+FOLGA_HEAP = 64
+
+
+class Agendador:
+    """Dispara tarefas agendadas para um horário (epoch) com um único loop.
+
+    Os itens ficam em um min-heap ordenado pelo vencimento (inserção
+    O(log n)), e o loop dorme até o próximo vencimento. Todos os itens
+    vencidos no mesmo instante são entregues de uma vez ao tratador do seu
+    tipo, registrado com `registrar(tipo, tratador)`, que recebe uma lista
+    de (chave, dados). Se o tratador levantar uma exceção, ou retornar as
+    chaves que não conseguiu tratar, esses itens são reagendados com espera
+    crescente em vez de descartados.
+
+    Reagendar ou cancelar deixa a entrada antiga no heap; quando elas passam
+    do número de itens vivos, o heap é reconstruído só com os itens vivos.
+
+    Com um `Armazenamento`, cada item também é gravado na coleção informada,
+    e `carregar()` recupera os pendentes depois de uma reinicialização.
+    """
+
+    def __init__(self, armazenamento=None, colecao="agendamentos", esperar=None, nome="agendador"):
+        self.armazenamento = armazenamento
+        self.colecao = colecao
+        self.nome = nome
+        self._esperar = esperar  # Corrotina aguardada antes do primeiro disparo
+
+        self._heap = []   # (vencimento, chave)
+        self._itens = {}  # chave: (vencimento, tipo, dados)
+        self._tentativas = {}  # chave: falhas seguidas do tratador
+        self._tratadores = {}
+        self._acordar = asyncio.Event()
+        self._tarefa = None
+
+        self.disparados = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def registrar(self, tipo, tratador):
+        self._tratadores[tipo] = tratador
+
+    def vencimento(self, chave):
+        item = self._itens.get(chave)
+        return item[0] if item else None
+
+    async def carregar(self):
+        """Recupera os itens pendentes gravados no armazenamento."""
+        if self.armazenamento is None:
+            return
+        for chave, item in (await self.armazenamento.carregar(self.colecao)).items():
+            self._inserir(chave, item["vencimento"], item["tipo"], item.get("dados"))
+
+    def _inserir(self, chave, vencimento, tipo, dados):
+        self._itens[chave] = (vencimento, tipo, dados)
+        heapq.heappush(self._heap, (vencimento, chave))
+        self._compactar()
+        # Acorda o loop se o novo item vence antes do que ele está esperando
+        if self._heap[0][1] == chave:
+            self._acordar.set()
+
+    def _compactar(self):
+        # Cada item vivo tem exatamente uma entrada válida; o resto do heap é sobra de reagendamentos
+        if len(self._heap) > 2 * len(self._itens) + FOLGA_HEAP:
+            self._heap = [(vencimento, chave) for chave, (vencimento, _, _) in self._itens.items()]
+            heapq.heapify(self._heap)
+
+    async def agendar(self, chave, vencimento, tipo, dados=None):
+        """Agenda (ou reagenda) `chave` para o epoch `vencimento`."""
+        self._tentativas.pop(chave, None)
+        if self.armazenamento is not None:
+            await self.armazenamento.salvar(self.colecao, {
+                chave: {"vencimento": vencimento, "tipo": tipo, "dados": dados}
+            })
+        self._inserir(chave, vencimento, tipo, dados)
+
+    async def cancelar(self, chave):
+        """Remove um item agendado. A entrada antiga fica no heap até chegar ao topo ou ele ser reconstruído."""
+        self._tentativas.pop(chave, None)
+        if self._itens.pop(chave, None) is None:
+            return False
+        self._compactar()
+        if self.armazenamento is not None:
+            await self.armazenamento.remover(self.colecao, [chave])
+        return True
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+        tamanho_cache(self.nome, lambda: len(self))
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        remover_cache(self.nome)
+
+    def _retirar_vencidos(self, agora):
+        vencidos = {}
+        while self._heap and self._heap[0][0] <= agora:
+            vencimento, chave = heapq.heappop(self._heap)
+            item = self._itens.get(chave)
+            # Entradas de itens cancelados ou reagendados ficam para trás no heap
+            if item is None or item[0] != vencimento:
+                continue
+            del self._itens[chave]
+            vencidos.setdefault(item[1], []).append((chave, item[2]))
+        return vencidos
+
+    async def _disparar(self, vencidos):
+        async def _tratar(tipo, itens):
+            tratador = self._tratadores.get(tipo)
+            if tratador is None:
+                print(f"⚠️ Nenhum tratador para '{tipo}' no {self.nome}")
+                return ()
+            try:
+                return await tratador(itens) or ()
+            except Exception as e:
+                print(f"❌ Erro ao disparar '{tipo}' no {self.nome}: {e}")
+                return [chave for chave, _ in itens]
+
+        falhas = set()
+        for chaves in await asyncio.gather(*(_tratar(tipo, itens) for tipo, itens in vencidos.items())):
+            falhas.update(chaves)
+        self.disparados += sum(len(itens) for itens in vencidos.values())
+
+        agora = time.time()
+        for tipo, itens in vencidos.items():
+            for chave, dados in itens:
+                if chave not in falhas:
+                    self._tentativas.pop(chave, None)
+                elif chave not in self._itens:
+                    # Falhou e ninguém reagendou: tenta de novo mais tarde, sem perder o registro gravado
+                    tentativas = self._tentativas[chave] = self._tentativas.get(chave, 0) + 1
+                    espera = min(RETENTATIVA_INICIAL * 2 ** (tentativas - 1), RETENTATIVA_MAXIMA)
+                    self._inserir(chave, agora + espera, tipo, dados)
+
+        if self.armazenamento is not None:
+            # Itens reagendados (ou que vão ser tentados de novo) continuam gravados
+            chaves = [chave for itens in vencidos.values() for chave, _ in itens if chave not in self._itens]
+            await self.armazenamento.remover(self.colecao, chaves)
+
+    async def _loop(self):
+        if self._esperar is not None:
+            await self._esperar()
+
+        while True:
+            self._acordar.clear()
+            vencidos = self._retirar_vencidos(time.time())
+            if vencidos:
+                await self._disparar(vencidos)
+                continue
+
+            espera = ESPERA_MAXIMA
+            if self._heap:
+                espera = min(max(self._heap[0][0] - time.time(), 0), ESPERA_MAXIMA)
+            try:
+                await asyncio.wait_for(self._acordar.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
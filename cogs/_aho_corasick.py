@@ -0,0 +1,72 @@
+from collections import deque
+
+
+class AutomatoPalavras:
+    """Autômato de Aho–Corasick para procurar várias palavras de uma vez.
+
+    É montado uma vez a partir da lista de palavras e depois percorre cada
+    texto em uma única passada, em tempo proporcional ao tamanho do texto
+    (mais o número de ocorrências), não importa quantas palavras existam.
+    A busca é por substring, igual a `palavra in texto`.
+    """
+
+    def __init__(self, palavras):
+        self.palavras = sorted({p for p in palavras if p})
+
+        # Cada estado: transições, estado de falha e palavras que terminam nele
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saida = [()]
+
+        for palavra in self.palavras:
+            estado = 0
+            for caractere in palavra:
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saida.append(())
+                    self._transicoes[estado][caractere] = proximo
+                estado = proximo
+            self._saida[estado] = (palavra,)
+
+        # Busca em largura para calcular as falhas e herdar as saídas delas
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                falha = self._transicoes[falha].get(caractere, 0)
+                self._falha[proximo] = falha
+                if self._saida[falha]:
+                    self._saida[proximo] = self._saida[proximo] + self._saida[falha]
+
+    def __len__(self):
+        return len(self.palavras)
+
+    def _percorrer(self, texto):
+        transicoes = self._transicoes
+        falha = self._falha
+        saida = self._saida
+        estado = 0
+        for fim, caractere in enumerate(texto):
+            while estado and caractere not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            if saida[estado]:
+                for palavra in saida[estado]:
+                    yield palavra, fim - len(palavra) + 1
+
+    def buscar(self, texto):
+        """Primeira ocorrência como (palavra, posição), ou None se não houver."""
+        for ocorrencia in self._percorrer(texto):
+            return ocorrencia
+        return None
+
+    def buscar_todas(self, texto):
+        """Todas as ocorrências como lista de (palavra, posição)."""
+        return list(self._percorrer(texto))
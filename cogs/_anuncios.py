@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import discord
+
+from cogs._metricas import obter_registro
+
+# Limites do Discord: embeds por mensagem e tamanho da descrição de um embed
+EMBEDS_POR_MENSAGEM = 10
+LIMITE_DESCRICAO = 4096
+
+
+class FilaAnuncios:
+    """Agrupa anúncios por canal para mandar poucas mensagens em rajadas.
+
+    O primeiro anúncio de um canal abre uma janela de `janela` segundos; no
+    fim dela, tudo o que chegou vai em uma única mensagem: até 10 embeds, ou
+    um embed de resumo com uma linha por anúncio quando passar disso. Cada
+    canal tem no máximo um envio em andamento.
+
+    Anúncios com a mesma chave (ex.: o mesmo usuário subindo dois níveis)
+    são mesclados, ficando só o mais novo. Se um canal acumular mais de
+    `limite_por_canal` anúncios (envio lento ou rate limit), os mais antigos
+    são descartados.
+    """
+
+    def __init__(self, janela=2.0, limite_por_canal=50, titulo_resumo="Anúncios", cor_resumo=None, nome="anuncios"):
+        self.janela = janela
+        self.limite_por_canal = limite_por_canal
+        self.titulo_resumo = titulo_resumo
+        self.cor_resumo = cor_resumo
+        self.nome = nome
+
+        self._pendentes = {}  # canal_id: {chave: (embed, resumo)}, em ordem de chegada
+        self._canais = {}     # canal_id: canal
+        self._tarefas = {}    # canal_id: tarefa de envio
+
+        registro = obter_registro()
+        registro.medidor(
+            "natanbot_anuncios_pendentes", "Anúncios esperando envio", ("fila",)
+        ).definir_funcao(lambda: self.pendentes, fila=nome)
+        self._enviados = registro.contador(
+            "natanbot_anuncios_enviados_total", "Anúncios entregues", ("fila",)
+        )
+        self._mensagens = registro.contador(
+            "natanbot_anuncios_mensagens_total", "Mensagens enviadas pela fila de anúncios", ("fila", "formato")
+        )
+        self._descartados = registro.contador(
+            "natanbot_anuncios_descartados_total", "Anúncios descartados ou mesclados", ("fila", "motivo")
+        )
+        self._duracao_envio = registro.histograma(
+            "natanbot_anuncios_envio_segundos", "Duração de cada envio da fila de anúncios", ("fila",)
+        )
+
+    @property
+    def pendentes(self):
+        return sum(len(itens) for itens in self._pendentes.values())
+
+    def anunciar(self, canal, chave, embed, resumo):
+        """Enfileira um anúncio. `resumo` é a linha usada quando a mensagem vira um resumo."""
+        itens = self._pendentes.setdefault(canal.id, {})
+        if itens.pop(chave, None) is not None:
+            self._descartados.incrementar(fila=self.nome, motivo="mesclado")
+        itens[chave] = (embed, resumo)
+
+        while len(itens) > self.limite_por_canal:
+            del itens[next(iter(itens))]
+            self._descartados.incrementar(fila=self.nome, motivo="fila_cheia")
+
+        self._canais[canal.id] = canal
+        tarefa = self._tarefas.get(canal.id)
+        if tarefa is None or tarefa.done():
+            self._tarefas[canal.id] = asyncio.create_task(self._enviar_canal(canal.id))
+
+    async def parar(self):
+        tarefas = list(self._tarefas.values())
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self._tarefas.clear()
+        self._pendentes.clear()
+        self._canais.clear()
+
+    def _montar(self, itens):
+        if len(itens) <= EMBEDS_POR_MENSAGEM:
+            return [embed for embed, _ in itens], "embeds"
+
+        linhas = []
+        tamanho = 0
+        for indice, (_, resumo) in enumerate(itens):
+            if tamanho + len(resumo) + 1 > LIMITE_DESCRICAO - 40:
+                linhas.append(f"... e mais {len(itens) - indice}")
+                break
+            linhas.append(resumo)
+            tamanho += len(resumo) + 1
+
+        embed = discord.Embed(
+            title=f"{self.titulo_resumo} ({len(itens)})",
+            description="\n".join(linhas),
+            color=self.cor_resumo
+        )
+        return [embed], "resumo"
+
+    async def _enviar_canal(self, canal_id):
+        try:
+            while self._pendentes.get(canal_id):
+                await asyncio.sleep(self.janela)
+                itens = list(self._pendentes.pop(canal_id, {}).values())
+                if not itens:
+                    break
+
+                embeds, formato = self._montar(itens)
+                inicio = time.perf_counter()
+                try:
+                    await self._canais[canal_id].send(embeds=embeds)
+                    self._enviados.incrementar(len(itens), fila=self.nome)
+                    self._mensagens.incrementar(fila=self.nome, formato=formato)
+                except discord.HTTPException as e:
+                    self._descartados.incrementar(len(itens), fila=self.nome, motivo="erro")
+                    print(f"❌ Erro ao enviar anúncios no canal {canal_id}: {e}")
+                finally:
+                    self._duracao_envio.observar(time.perf_counter() - inicio, fila=self.nome)
+        finally:
+            if canal_id not in self._pendentes:
+                self._canais.pop(canal_id, None)
+                self._tarefas.pop(canal_id, None)
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cogs._metricas import obter_registro
+
+CAMINHO_BANCO = os.getenv("BANCO_DADOS", "data/natanbot.db")
+
+
+class Armazenamento:
+    """Banco SQLite (modo WAL) compartilhado por todos os cogs.
+
+    Os dados ficam na tabela `registros`, organizados em coleções de pares
+    chave/valor (o valor é JSON). Cada gravação altera só as linhas
+    informadas, então salvar custa O(linhas alteradas) e não O(arquivo todo).
+
+    Todo acesso ao SQLite acontece em uma única thread dedicada, fora do loop
+    de eventos. Os valores são convertidos para JSON ainda no loop, antes de
+    irem para a thread, para que ela nunca leia um dicionário sendo alterado.
+    """
+
+    def __init__(self, caminho=CAMINHO_BANCO):
+        self.caminho = caminho
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="armazenamento")
+        self._conexao = None  # Só usada dentro da thread do executor
+        self._duracao = obter_registro().histograma(
+            "natanbot_armazenamento_transacao_segundos",
+            "Tempo até cada transação no SQLite terminar, incluindo a espera na fila"
+        )
+
+    # ==== Thread do banco ====
+
+    def _conectar(self):
+        if self._conexao is None:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS registros ("
+                " colecao TEXT NOT NULL,"
+                " chave TEXT NOT NULL,"
+                " valor TEXT NOT NULL,"
+                " PRIMARY KEY (colecao, chave)"
+                ") WITHOUT ROWID"
+            )
+            self._conexao = conexao
+        return self._conexao
+
+    def _em_transacao(self, funcao, args):
+        conexao = self._conectar()
+        conexao.execute("BEGIN")
+        try:
+            resultado = funcao(conexao, *args)
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+        return resultado
+
+    async def executar(self, funcao, *args):
+        """Executa `funcao(conexao, *args)` na thread do banco, dentro de uma transação."""
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, self._em_transacao, funcao, args)
+        finally:
+            self._duracao.observar(time.perf_counter() - inicio)
+
+    # ==== Coleções chave/valor ====
+
+    async def carregar(self, colecao):
+        """Retorna todos os registros de uma coleção como {chave: valor}, em ordem de chave."""
+        def _carregar(conexao):
+            linhas = conexao.execute(
+                "SELECT chave, valor FROM registros WHERE colecao = ? ORDER BY chave", (colecao,)
+            )
+            return {chave: json.loads(valor) for chave, valor in linhas}
+        return await self.executar(_carregar)
+
+    async def obter(self, colecao, chave, padrao=None):
+        """Retorna um único registro, ou `padrao` se ele não existir."""
+        def _obter(conexao):
+            linha = conexao.execute(
+                "SELECT valor FROM registros WHERE colecao = ? AND chave = ?", (colecao, chave)
+            ).fetchone()
+            return json.loads(linha[0]) if linha else padrao
+        return await self.executar(_obter)
+
+    async def gravar(self, alteracoes, extra=None):
+        """Aplica várias alterações em uma única transação.
+
+        `alteracoes` é uma lista de (colecao, chave, valor). Valor `None`
+        remove o registro; qualquer outro valor é inserido ou atualizado.
+        `extra(conexao)`, se informado, roda na mesma transação e seu
+        retorno é devolvido.
+        """
+        upserts, remocoes = _preparar(alteracoes)
+        if not upserts and not remocoes and extra is None:
+            return None
+
+        def _gravar(conexao):
+            _aplicar(conexao, upserts, remocoes)
+            if extra is not None:
+                return extra(conexao)
+        return await self.executar(_gravar)
+
+    async def salvar(self, colecao, registros):
+        """Insere ou atualiza os registros {chave: valor} de uma coleção."""
+        await self.gravar([(colecao, chave, valor) for chave, valor in registros.items()])
+
+    async def remover(self, colecao, chaves):
+        await self.gravar([(colecao, chave, None) for chave in chaves])
+
+    async def fechar(self):
+        """Faz o checkpoint do WAL, fecha a conexão e encerra a thread."""
+        def _fechar():
+            if self._conexao is not None:
+                self._conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conexao.close()
+                self._conexao = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, _fechar)
+        self._executor.shutdown(wait=True)
+
+
+def _preparar(alteracoes):
+    upserts = []
+    remocoes = []
+    for colecao, chave, valor in alteracoes:
+        if valor is None:
+            remocoes.append((colecao, str(chave)))
+        else:
+            upserts.append((colecao, str(chave), json.dumps(valor, ensure_ascii=False, default=str)))
+    return upserts, remocoes
+
+
+def _aplicar(conexao, upserts, remocoes):
+    if upserts:
+        conexao.executemany(
+            "INSERT INTO registros (colecao, chave, valor) VALUES (?, ?, ?) "
+            "ON CONFLICT (colecao, chave) DO UPDATE SET valor = excluded.valor",
+            upserts
+        )
+    if remocoes:
+        conexao.executemany(
+            "DELETE FROM registros WHERE colecao = ? AND chave = ?", remocoes
+        )
+
+
+def aplicar_alteracoes(conexao, alteracoes):
+    """Versão síncrona de `gravar`, para uso dentro de funções passadas a `executar`."""
+    _aplicar(conexao, *_preparar(alteracoes))
+
+
+_armazenamento = None
+
+
+def obter_armazenamento():
+    """Retorna a instância única do armazenamento, criando-a se preciso."""
+    global _armazenamento
+    if _armazenamento is None:
+        _armazenamento = Armazenamento()
+    return _armazenamento
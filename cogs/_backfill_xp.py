@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import discord
+
+from cogs._regras_xp import reproduzir
+
+# Canais lidos ao mesmo tempo; o discord.py espera os rate limits de cada rota sozinho
+CANAIS_SIMULTANEOS = int(os.getenv("XP_BACKFILL_CANAIS", 3))
+# Mensagens acumuladas antes de cada checkpoint
+TAMANHO_LOTE = 1000
+
+
+class BackfillXP:
+    """Lê o histórico de uma guild para calcular o XP que o bot não viu.
+
+    Os canais são paginados em paralelo (até CANAIS_SIMULTANEOS), do mais
+    antigo para o mais novo, até o momento em que o backfill começou. A cada
+    TAMANHO_LOTE mensagens o lote (autores e horários) e a posição do canal
+    são gravados na mesma transação, então um backfill interrompido continua
+    de onde parou.
+
+    Mensagens que chegam durante o backfill também são registradas; cada
+    checkpoint grava só as que chegaram depois do anterior. No fim,
+    tudo é ordenado por horário e reproduzido com as mesmas regras do
+    on_message (`cogs._regras_xp`), e o resultado é gravado de uma vez.
+    """
+
+    def __init__(self, armazenamento, guild, estado=None, ao_vivo=None):
+        self.armazenamento = armazenamento
+        self.guild = guild
+        self.colecao = f"xp_backfill:{guild.id}"
+        self.estado = estado or {"corte": time.time(), "desde": None, "canais": {}, "lotes": 0}
+        self.estado.setdefault("lotes_ao_vivo", 0)
+        self.ao_vivo = ao_vivo or []  # [user_id, timestamp] depois do corte
+        self._ao_vivo_gravados = len(self.ao_vivo)
+
+        self.mensagens_lidas = 0
+        self.tarefa = None
+
+    @classmethod
+    async def retomar(cls, armazenamento, guild):
+        """Recupera o backfill interrompido da guild, ou None se não houver."""
+        colecao = f"xp_backfill:{guild.id}"
+        estado = await armazenamento.obter(colecao, "_estado")
+        if estado is None:
+            return None
+
+        def _ler_ao_vivo(conexao):
+            # "_ao_vivo" (lista inteira, formato antigo) vem antes dos lotes "_ao_vivo:<sequência>"
+            return conexao.execute(
+                "SELECT valor FROM registros WHERE colecao = ? AND chave >= '_ao_vivo' AND chave < '_ao_vivp'"
+                " ORDER BY chave", (colecao,)
+            ).fetchall()
+
+        ao_vivo = [evento for (valor,) in await armazenamento.executar(_ler_ao_vivo) for evento in json.loads(valor)]
+        return cls(armazenamento, guild, estado, ao_vivo)
+
+    @staticmethod
+    async def pendentes(armazenamento):
+        """Ids das guilds com um backfill interrompido."""
+        def _listar(conexao):
+            return [
+                int(colecao.split(":", 1)[1]) for (colecao,) in conexao.execute(
+                    "SELECT colecao FROM registros WHERE colecao >= 'xp_backfill:' AND colecao < 'xp_backfill;'"
+                    " AND chave = '_estado'"
+                )
+            ]
+        return await armazenamento.executar(_listar)
+
+    @property
+    def canais_concluidos(self):
+        return sum(1 for canal in self.estado["canais"].values() if canal["concluido"])
+
+    def registrar_ao_vivo(self, user_id, timestamp):
+        if timestamp >= self.estado["corte"]:
+            self.ao_vivo.append([user_id, timestamp])
+
+    async def _checkpoint(self, canal_id, autores, horarios, ultimo_id, concluido=False):
+        # A posição do canal só avança junto com o lote que ela cobre
+        posicao = self.estado["canais"][str(canal_id)]
+        posicao["ultimo_id"] = ultimo_id
+        posicao["concluido"] = concluido
+        alteracoes = [(self.colecao, "_estado", self.estado)]
+        novos = self.ao_vivo[self._ao_vivo_gravados:]
+        if novos:
+            self.estado["lotes_ao_vivo"] += 1
+            alteracoes.append((self.colecao, f"_ao_vivo:{self.estado['lotes_ao_vivo']:08d}", novos))
+            self._ao_vivo_gravados += len(novos)
+        if autores:
+            self.estado["lotes"] += 1
+            chave = f"{canal_id}:{self.estado['lotes']:08d}"
+            alteracoes.append((self.colecao, chave, {"u": autores, "t": horarios}))
+        await self.armazenamento.gravar(alteracoes)
+
+    async def _paginar(self, canal, semaforo):
+        posicao = self.estado["canais"].setdefault(str(canal.id), {"ultimo_id": None, "concluido": False})
+        if posicao["concluido"]:
+            return
+
+        if posicao["ultimo_id"] is not None:
+            depois = discord.Object(posicao["ultimo_id"])
+        elif self.estado["desde"] is not None:
+            depois = datetime.fromtimestamp(self.estado["desde"], tz=timezone.utc)
+        else:
+            depois = None
+        antes = datetime.fromtimestamp(self.estado["corte"], tz=timezone.utc)
+
+        async with semaforo:
+            autores, horarios = [], []
+            ultimo_id = posicao["ultimo_id"]
+            try:
+                async for mensagem in canal.history(limit=None, after=depois, before=antes, oldest_first=True):
+                    ultimo_id = mensagem.id
+                    self.mensagens_lidas += 1
+                    if mensagem.author.bot:
+                        continue
+                    autores.append(mensagem.author.id)
+                    horarios.append(mensagem.created_at.timestamp())
+                    if len(autores) >= TAMANHO_LOTE:
+                        await self._checkpoint(canal.id, autores, horarios, ultimo_id)
+                        autores, horarios = [], []
+            except discord.Forbidden:
+                pass  # Sem acesso ao histórico deste canal
+
+            await self._checkpoint(canal.id, autores, horarios, ultimo_id, concluido=True)
+
+    async def ler_historico(self):
+        """Pagina todos os canais que ainda não terminaram."""
+        eu = self.guild.me
+        canais = [
+            canal for canal in self.guild.text_channels
+            if canal.permissions_for(eu).read_message_history
+        ]
+        semaforo = asyncio.Semaphore(CANAIS_SIMULTANEOS)
+        # Se um canal falhar, o TaskGroup cancela os outros em vez de deixá-los rodando soltos
+        try:
+            async with asyncio.TaskGroup() as grupo:
+                for canal in canais:
+                    grupo.create_task(self._paginar(canal, semaforo))
+        except ExceptionGroup as erros:
+            raise erros.exceptions[0]
+
+    async def calcular(self, config, vips=()):
+        """Junta os lotes por horário e reproduz as regras. Retorna {user_id: registro}.
+
+        A reprodução roda na thread do banco: cada canal é lido lote a lote
+        por um cursor próprio e intercalado com os outros, então nem o
+        histórico inteiro fica em memória nem o loop de eventos para.
+        """
+        canais = list(self.estado["canais"])
+        ao_vivo = sorted(((user_id, horario) for user_id, horario in self.ao_vivo), key=lambda e: e[1])
+
+        def _reproduzir(conexao):
+            # Cada canal já está em ordem; as chaves "canal:sequência" mantêm os lotes na ordem de leitura
+            def _eventos(canal_id):
+                for (valor,) in conexao.execute(
+                    "SELECT valor FROM registros WHERE colecao = ? AND chave >= ? AND chave < ? ORDER BY chave",
+                    (self.colecao, f"{canal_id}:", f"{canal_id};")
+                ):
+                    lote = json.loads(valor)
+                    yield from zip(lote["u"], lote["t"])
+
+            fontes = [_eventos(canal_id) for canal_id in canais]
+            fontes.append(ao_vivo)
+            return reproduzir(heapq.merge(*fontes, key=lambda evento: evento[1]), config, vips)
+
+        return await self.armazenamento.executar(_reproduzir)
+
+    async def descartar(self, alteracoes=(), extra=None):
+        """Apaga o checkpoint; `alteracoes` e `extra(conexao)` vão na mesma transação."""
+        def _apagar(conexao):
+            conexao.execute("DELETE FROM registros WHERE colecao = ?", (self.colecao,))
+            if extra is not None:
+                extra(conexao)
+
+        await self.armazenamento.gravar(list(alteracoes), _apagar)
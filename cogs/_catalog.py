@@ -0,0 +1,87 @@
+import discord
+
+PAGE_SIZE = 25  # Limite de campos de um embed
+MAX_QUANTITY = 1000  # Por item em um pedido
+
+
+class Catalog:
+    """Itens da loja e as páginas da `!loja` já montadas.
+
+    As páginas são montadas na primeira consulta e reaproveitadas até o
+    catálogo mudar; por isso toda alteração passa por `set` e `remove`.
+    `items` é o mesmo dicionário gravado em `config/economia_loja`.
+    """
+
+    def __init__(self, items=None):
+        self.load(items if items is not None else {})
+
+    def load(self, items):
+        self.items = items
+        self._pages = None
+
+    def __contains__(self, emoji):
+        return emoji in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, emoji, default=None):
+        return self.items.get(emoji, default)
+
+    def set(self, emoji, item):
+        self.items[emoji] = item
+        self._pages = None
+
+    def remove(self, emoji):
+        item = self.items.pop(emoji)
+        self._pages = None
+        return item
+
+    def page(self, number):
+        """(embed, página, total de páginas); páginas fora do intervalo viram a mais próxima."""
+        if self._pages is None:
+            self._pages = self._build()
+        number = min(max(number, 1), len(self._pages))
+        return self._pages[number - 1], number, len(self._pages)
+
+    def _build(self):
+        entries = list(self.items.items())
+        chunks = [entries[i:i + PAGE_SIZE] for i in range(0, len(entries), PAGE_SIZE)] or [[]]
+        pages = []
+        for number, chunk in enumerate(chunks, 1):
+            embed = discord.Embed(title="🛒 Loja do Servidor", color=0x0099ff)
+            for emoji, item in chunk:
+                embed.add_field(name=f"{emoji} {item['name']} - ${item['price']}", value=item['description'], inline=False)
+            footer = "Use !comprar <emoji> [quantidade] para comprar (vários itens de uma vez também)"
+            if len(chunks) > 1:
+                footer = f"Página {number}/{len(chunks)} • {footer}"
+            embed.set_footer(text=footer)
+            pages.append(embed)
+        return pages
+
+
+def parse_order(args):
+    """`<emoji> [quantidade] <emoji> [quantidade] ...` vira [(emoji, quantidade)].
+
+    Sem quantidade, vale 1; o mesmo emoji repetido soma as quantidades.
+    Levanta ValueError com a mensagem para o usuário.
+    """
+    order = {}
+    last = None
+    for arg in args:
+        if arg.lstrip('-').isdigit():
+            if last is None:
+                raise ValueError(f"Quantidade `{arg}` sem um item antes!")
+            quantity = int(arg)
+            if quantity <= 0:
+                raise ValueError("Quantidade inválida!")
+            # A quantidade substitui o 1 implícito do emoji que veio antes dela
+            order[last] += quantity - 1
+            last = None
+        else:
+            order[arg] = order.get(arg, 0) + 1
+            last = arg
+    for emoji, quantity in order.items():
+        if quantity > MAX_QUANTITY:
+            raise ValueError(f"No máximo {MAX_QUANTITY} unidades de {emoji} por vez!")
+    return list(order.items())
@@ -0,0 +1,80 @@
+import time
+
+from cogs._metricas import obter_registro
+
+
+class Cooldowns:
+    """Cooldowns por (guild, usuário) que expiram sozinhos e têm tamanho limitado.
+
+    As entradas ficam em duas gerações. Cada geração dura `ttl` segundos
+    (o maior cooldown já pedido); ao virar, a geração anterior é descartada
+    inteira, sem percorrer item por item. Assim uma entrada vive entre `ttl`
+    e `2 * ttl` segundos, e a memória acompanha só quem falou recentemente.
+
+    A chave é um único inteiro (guild << 64 | usuário) e o valor é o
+    `time.monotonic()` do último ganho, imune a ajustes no relógio do sistema.
+
+    Se o total passar de `limite`, a geração anterior é descartada antes da
+    hora; nesse caso alguns usuários podem ganhar XP um pouco antes do fim do
+    cooldown, mas a memória nunca passa do limite.
+    """
+
+    def __init__(self, ttl=60.0, limite=100_000, nome="cooldowns"):
+        self.ttl = ttl
+        self.limite = limite
+        self.nome = nome
+
+        self._atual = {}
+        self._anterior = {}
+        self._inicio_geracao = time.monotonic()
+
+        self._descartes = obter_registro().contador(
+            "natanbot_cooldowns_descartados_total",
+            "Cooldowns descartados antes do fim por causa do limite de memória",
+            ("cooldowns",)
+        )
+
+    def __len__(self):
+        return len(self._atual) + len(self._anterior)
+
+    @staticmethod
+    def _chave(guild_id, user_id):
+        return (guild_id << 64) | user_id
+
+    def _virar(self, agora):
+        self._anterior = self._atual
+        self._atual = {}
+        self._inicio_geracao = agora
+
+    def _manter(self, agora):
+        if agora - self._inicio_geracao >= self.ttl:
+            self._virar(agora)
+        if len(self) >= self.limite:
+            self._descartes.incrementar(len(self._anterior), cooldowns=self.nome)
+            self._virar(agora)
+
+    def ultimo(self, guild_id, user_id):
+        """Momento (monotônico) do último registro, ou None se já expirou."""
+        chave = self._chave(guild_id, user_id)
+        ultimo = self._atual.get(chave)
+        if ultimo is None:
+            ultimo = self._anterior.get(chave)
+        return ultimo
+
+    def tentar(self, guild_id, user_id, cooldown, agora=None):
+        """Registra o uso e retorna True se o cooldown já acabou; senão retorna False."""
+        if agora is None:
+            agora = time.monotonic()
+        if cooldown > self.ttl:
+            self.ttl = cooldown
+        self._manter(agora)
+
+        ultimo = self.ultimo(guild_id, user_id)
+        if ultimo is not None and agora - ultimo < cooldown:
+            return False
+        self._atual[self._chave(guild_id, user_id)] = agora
+        return True
+
+    def limpar(self):
+        self._atual.clear()
+        self._anterior.clear()
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+from cogs._metricas import obter_registro
+
+
+class GravacaoAtrasada:
+    """Acumula registros alterados e grava tudo em segundo plano (write-behind).
+
+    Os cogs chamam `marcar(chave)` sempre que um registro muda. A função
+    `gravar(chaves)` recebida no construtor é chamada com o conjunto de chaves
+    sujas a cada `intervalo` segundos, ou antes disso quando o número de
+    registros pendentes chega a `limite_sujos`.
+    """
+
+    def __init__(self, gravar, intervalo=30.0, limite_sujos=200, nome="gravacao"):
+        self._gravar = gravar
+        self.intervalo = intervalo
+        self.limite_sujos = limite_sujos
+        self.nome = nome
+
+        self._sujos = set()
+        self._acordar = asyncio.Event()
+        self._trava = asyncio.Lock()
+        self._tarefa = None
+
+        # Contadores expostos para monitoramento
+        self.gravacoes = 0
+        self.falhas = 0
+        self.registros_gravados = 0
+        self.ultima_latencia = 0.0
+        self.latencia_maxima = 0.0
+        self.latencia_total = 0.0
+
+        registro = obter_registro()
+        self._histograma = registro.histograma(
+            "natanbot_gravacao_segundos", "Duração de cada gravação em segundo plano", ("gravacao",)
+        )
+        self._pendentes = registro.medidor(
+            "natanbot_gravacao_pendentes", "Registros alterados esperando gravação", ("gravacao",)
+        )
+        self._falhas = registro.contador(
+            "natanbot_gravacao_falhas_total", "Gravações em segundo plano que falharam", ("gravacao",)
+        )
+
+    @property
+    def pendentes(self):
+        return len(self._sujos)
+
+    def marcar(self, chave):
+        """Marca um registro como alterado."""
+        self._sujos.add(chave)
+        if len(self._sujos) >= self.limite_sujos:
+            self._acordar.set()
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._loop())
+        self._pendentes.definir_funcao(lambda: self.pendentes, gravacao=self.nome)
+
+    async def parar(self):
+        """Interrompe o loop e grava o que ainda estiver pendente."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await self.gravar_pendentes()
+        self._pendentes.remover(gravacao=self.nome)
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._acordar.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._acordar.clear()
+            await self.gravar_pendentes()
+
+    async def gravar_pendentes(self):
+        """Grava imediatamente todos os registros sujos. Retorna quantos foram gravados."""
+        async with self._trava:
+            if not self._sujos:
+                return 0
+
+            chaves, self._sujos = self._sujos, set()
+            inicio = time.perf_counter()
+            try:
+                await self._gravar(chaves)
+            except Exception as e:
+                # Devolve as chaves para tentar de novo na próxima rodada
+                self._sujos |= chaves
+                self.falhas += 1
+                self._falhas.incrementar(gravacao=self.nome)
+                print(f"❌ Erro na gravação em segundo plano ({self.nome}): {e}")
+                return 0
+
+            latencia = time.perf_counter() - inicio
+            self.gravacoes += 1
+            self.registros_gravados += len(chaves)
+            self.ultima_latencia = latencia
+            self.latencia_total += latencia
+            self.latencia_maxima = max(self.latencia_maxima, latencia)
+            self._histograma.observar(latencia, gravacao=self.nome)
+            return len(chaves)
+
+    def metricas(self):
+        return {
+            "gravacoes": self.gravacoes,
+            "falhas": self.falhas,
+            "registros_gravados": self.registros_gravados,
+            "pendentes": self.pendentes,
+            "ultima_latencia": self.ultima_latencia,
+            "latencia_media": self.latencia_total / self.gravacoes if self.gravacoes else 0.0,
+            "latencia_maxima": self.latencia_maxima,
+        }
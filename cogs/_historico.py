@@ -0,0 +1,203 @@
+import heapq
+import json
+import time
+import zlib
+from datetime import datetime
+
+
+def _criar_tabelas(conexao):
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS mod_historico ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " guild_id INTEGER,"
+        " usuario_id INTEGER,"
+        " moderador_id INTEGER,"
+        " acao TEXT NOT NULL,"
+        " timestamp INTEGER NOT NULL,"
+        " usuario TEXT,"
+        " moderador TEXT,"
+        " motivo TEXT,"
+        " duracao TEXT"
+        ")"
+    )
+    for nome, colunas in (
+        ("guild", "guild_id, id"),
+        ("usuario", "guild_id, usuario_id, id"),
+        ("moderador", "guild_id, moderador_id, id"),
+        ("acao", "guild_id, acao, id"),
+        ("timestamp", "timestamp"),
+    ):
+        conexao.execute(f"CREATE INDEX IF NOT EXISTS mod_historico_{nome} ON mod_historico ({colunas})")
+    # Linhas sem guild ficam todas com SEM_GUILD, para uma única consulta indexada achar as antigas
+    conexao.execute("UPDATE mod_historico SET guild_id = 0 WHERE guild_id IS NULL")
+
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS mod_historico_arquivo ("
+        " segmento INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " primeiro_id INTEGER NOT NULL,"
+        " ultimo_id INTEGER NOT NULL,"
+        " inicio INTEGER NOT NULL,"
+        " fim INTEGER NOT NULL,"
+        " quantidade INTEGER NOT NULL,"
+        " dados BLOB NOT NULL"
+        ")"
+    )
+
+
+SEM_GUILD = 0
+
+COLUNAS = ("id", "guild_id", "usuario_id", "moderador_id", "acao", "timestamp",
+           "usuario", "moderador", "motivo", "duracao")
+
+
+class HistoricoModeracao:
+    """Histórico de moderação append-only com índices secundários.
+
+    Cada ação é uma linha da tabela `mod_historico`, indexada por guild,
+    (guild, usuário), (guild, moderador), (guild, ação) e horário. As
+    consultas andam para trás a partir de um cursor (o id da última linha
+    vista), então cada página custa O(resultados) e não O(histórico todo).
+
+    Linhas antigas são movidas em segmentos comprimidos com zlib para
+    `mod_historico_arquivo` e deixam de aparecer nas consultas.
+
+    Entradas importadas da versão antiga não sabem de qual guild vieram nem
+    os ids dos membros: ficam com guild_id 0, aparecem nas consultas de
+    qualquer guild e são filtradas pelo nome gravado.
+    """
+
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+
+    async def preparar(self):
+        await self.armazenamento.executar(_criar_tabelas)
+        await self._importar_legado()
+
+    async def _importar_legado(self):
+        # Entradas que a versão anterior guardava na coleção chave/valor
+        antigas = await self.armazenamento.carregar("mod_historico")
+        if not antigas:
+            return
+
+        linhas = []
+        for entrada in antigas.values():
+            try:
+                timestamp = int(datetime.fromisoformat(entrada["timestamp"]).timestamp())
+            except (KeyError, ValueError):
+                timestamp = 0
+            linhas.append((
+                SEM_GUILD, None, None, entrada.get("acao", "?"), timestamp,
+                entrada.get("usuario"), entrada.get("moderador"),
+                entrada.get("motivo"), entrada.get("duracao")
+            ))
+
+        def _inserir(conexao):
+            conexao.executemany(
+                "INSERT INTO mod_historico (guild_id, usuario_id, moderador_id, acao, timestamp,"
+                " usuario, moderador, motivo, duracao) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                linhas
+            )
+
+        await self.armazenamento.gravar(
+            [("mod_historico", chave, None) for chave in antigas], extra=_inserir
+        )
+
+    async def registrar(self, guild_id, acao, moderador, usuario, motivo=None, duracao=None):
+        linha = (
+            guild_id if guild_id is not None else SEM_GUILD, getattr(usuario, "id", None), getattr(moderador, "id", None), acao,
+            int(time.time()), str(usuario), str(moderador), motivo, duracao
+        )
+
+        def _inserir(conexao):
+            conexao.execute(
+                "INSERT INTO mod_historico (guild_id, usuario_id, moderador_id, acao, timestamp,"
+                " usuario, moderador, motivo, duracao) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                linha
+            )
+        await self.armazenamento.executar(_inserir)
+
+    async def buscar(self, guild_id, usuario_id=None, moderador_id=None, acao=None,
+                     desde=None, cursor=None, limite=10, usuario_nome=None, moderador_nome=None):
+        """Entradas da mais recente para a mais antiga.
+
+        As entradas importadas da versão antiga só têm o nome (`str(membro)`);
+        com `usuario_nome`/`moderador_nome`, elas também entram no filtro.
+        Retorna (entradas, proximo_cursor); `proximo_cursor` é None quando
+        não há mais páginas.
+        """
+        def _filtro(gid):
+            condicoes = ["guild_id = ?"]
+            parametros = [gid]
+            for coluna, valor, coluna_nome, nome in (
+                ("usuario_id", usuario_id, "usuario", usuario_nome),
+                ("moderador_id", moderador_id, "moderador", moderador_nome),
+                ("acao", acao, None, None),
+            ):
+                if valor is None:
+                    continue
+                if gid == SEM_GUILD and nome is not None:
+                    condicoes.append(f"({coluna} = ? OR ({coluna} IS NULL AND {coluna_nome} = ?))")
+                    parametros += [valor, nome]
+                else:
+                    condicoes.append(f"{coluna} = ?")
+                    parametros.append(valor)
+            if desde is not None:
+                condicoes.append("timestamp >= ?")
+                parametros.append(int(desde))
+            if cursor is not None:
+                condicoes.append("id < ?")
+                parametros.append(cursor)
+            # Uma consulta para a guild e outra para as linhas sem guild, cada uma andando no
+            # índice (guild_id, ..., id) em ordem; `guild_id IN (?, ?)` obrigaria a ordenar tudo
+            sql = (
+                f"SELECT {', '.join(COLUNAS)} FROM mod_historico WHERE {' AND '.join(condicoes)} "
+                "ORDER BY id DESC LIMIT ?"
+            )
+            return sql, parametros + [limite + 1]
+
+        def _consultar(conexao):
+            return [conexao.execute(*_filtro(gid)).fetchall() for gid in dict.fromkeys((guild_id, SEM_GUILD))]
+
+        consultas = await self.armazenamento.executar(_consultar)
+        linhas = list(heapq.merge(*consultas, key=lambda linha: -linha[0]))[:limite + 1]
+        entradas = [dict(zip(COLUNAS, linha)) for linha in linhas[:limite]]
+        proximo = entradas[-1]["id"] if len(linhas) > limite else None
+        return entradas, proximo
+
+    async def arquivar(self, idade_dias=90, tamanho_segmento=1000):
+        """Comprime e move para o arquivo as entradas mais antigas que `idade_dias`."""
+        limite = int(time.time()) - idade_dias * 86400
+
+        def _arquivar(conexao):
+            total = 0
+            while True:
+                linhas = conexao.execute(
+                    f"SELECT {', '.join(COLUNAS)} FROM mod_historico WHERE timestamp < ? ORDER BY id LIMIT ?",
+                    (limite, tamanho_segmento)
+                ).fetchall()
+                if not linhas:
+                    return total
+
+                dados = zlib.compress(json.dumps(linhas, ensure_ascii=False).encode("utf-8"), 9)
+                conexao.execute(
+                    "INSERT INTO mod_historico_arquivo (primeiro_id, ultimo_id, inicio, fim, quantidade, dados)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (linhas[0][0], linhas[-1][0], min(l[5] for l in linhas), max(l[5] for l in linhas),
+                     len(linhas), dados)
+                )
+                conexao.executemany("DELETE FROM mod_historico WHERE id = ?", [(l[0],) for l in linhas])
+                total += len(linhas)
+
+        return await self.armazenamento.executar(_arquivar)
+
+    async def ler_segmento(self, segmento):
+        """Descomprime um segmento arquivado e devolve suas entradas."""
+        def _ler(conexao):
+            return conexao.execute(
+                "SELECT dados FROM mod_historico_arquivo WHERE segmento = ?", (segmento,)
+            ).fetchone()
+
+        linha = await self.armazenamento.executar(_ler)
+        if linha is None:
+            return []
+        return [dict(zip(COLUNAS, l)) for l in json.loads(zlib.decompress(linha[0]))]
@@ -0,0 +1,160 @@
+import json
+import time
+
+from cogs._armazenamento import aplicar_alteracoes
+
+ACCOUNTS = ('money', 'bank')
+
+
+def _create_tables(conexao):
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS economia_ledger ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " user_id TEXT NOT NULL,"
+        " account TEXT NOT NULL,"
+        " delta INTEGER NOT NULL,"
+        " reason TEXT NOT NULL,"
+        " ts INTEGER NOT NULL"
+        ")"
+    )
+    conexao.execute(
+        "CREATE INDEX IF NOT EXISTS economia_ledger_user ON economia_ledger (user_id, id)"
+    )
+
+
+class Ledger:
+    """Livro-razão append-only das movimentações de dinheiro da economia.
+
+    Cada alteração de saldo vira uma linha (usuário, conta, delta, motivo,
+    horário) na tabela `economia_ledger`. Os saldos consolidados ficam na
+    coleção `economia_saldos`, junto com o id da última linha já incluída
+    (`_meta/economia_snapshot`). Ao iniciar, basta ler o snapshot e somar as
+    linhas posteriores a ele.
+
+    A consistência entre snapshot e ledger depende de todas as gravações
+    passarem pela thread única do `Armazenamento`, que executa as transações
+    na ordem em que foram pedidas.
+    """
+
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+        self._pending = []     # Linhas ainda não enviadas ao banco
+        self._touched = set()  # Usuários com saldo alterado desde o último snapshot
+        self.snapshot_id = 0
+
+    async def setup(self):
+        await self.armazenamento.executar(_create_tables)
+
+    def add(self, user_id, account, delta, reason):
+        """Registra uma movimentação. A linha é gravada no próximo `commit` ou `snapshot`."""
+        if delta == 0:
+            return
+        self._pending.append((str(user_id), account, int(delta), reason, int(time.time())))
+        self._touched.add(str(user_id))
+
+    def mark(self, user_ids):
+        """Força a inclusão dos usuários informados no próximo snapshot."""
+        self._touched.update(str(u) for u in user_ids)
+
+    def _drain(self):
+        entries, self._pending = self._pending, []
+
+        def _append(conexao):
+            if entries:
+                conexao.executemany(
+                    "INSERT INTO economia_ledger (user_id, account, delta, reason, ts) VALUES (?, ?, ?, ?, ?)",
+                    entries
+                )
+        return entries, _append
+
+    async def commit(self, changes=(), extra=None):
+        """Grava as linhas pendentes, as `changes` e `extra(conexao)` em uma transação."""
+        entries, append = self._drain()
+
+        def _write(conexao):
+            append(conexao)
+            if extra is not None:
+                extra(conexao)
+
+        try:
+            await self.armazenamento.gravar(list(changes), extra=_write)
+        except Exception:
+            self._pending[:0] = entries
+            raise
+
+    async def snapshot(self, users):
+        """Consolida os saldos alterados e avança o marcador do snapshot."""
+        touched, self._touched = self._touched, set()
+        balances = [
+            ('economia_saldos', uid, {account: users[uid][account] for account in ACCOUNTS})
+            for uid in touched if uid in users
+        ]
+        entries, append = self._drain()
+
+        def _fold(conexao):
+            append(conexao)
+            aplicar_alteracoes(conexao, balances)
+            last_id = conexao.execute("SELECT COALESCE(MAX(id), 0) FROM economia_ledger").fetchone()[0]
+            aplicar_alteracoes(conexao, [('_meta', 'economia_snapshot', {'ledger_id': last_id})])
+            return last_id
+
+        try:
+            self.snapshot_id = await self.armazenamento.executar(_fold)
+        except Exception:
+            self._pending[:0] = entries
+            self._touched |= touched
+            raise
+        return len(balances)
+
+    async def load_balances(self, base=None, prefix=None):
+        """Lê o snapshot e reaplica as linhas posteriores a ele.
+
+        `base` fornece saldos antigos para usuários que ainda não têm
+        snapshot (dados de antes do ledger existir). Com `prefix`, só as
+        chaves que começam com ele são lidas (por exemplo, "<guild_id>:"
+        para carregar um único servidor).
+        """
+        def _read(conexao):
+            # Tudo na mesma transação: um snapshot entre as leituras contaria linhas duas vezes
+            meta = conexao.execute(
+                "SELECT valor FROM registros WHERE colecao = '_meta' AND chave = 'economia_snapshot'"
+            ).fetchone()
+            snapshot_id = json.loads(meta[0])['ledger_id'] if meta else 0
+
+            where, args = "", ()
+            if prefix is not None:
+                where, args = " AND {0} >= ? AND {0} < ?", (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+            snapshot = conexao.execute(
+                "SELECT chave, valor FROM registros WHERE colecao = 'economia_saldos'" + where.format("chave"), args
+            ).fetchall()
+            tail = conexao.execute(
+                "SELECT user_id, account, SUM(delta) FROM economia_ledger WHERE id > ?"
+                + where.format("user_id") + " GROUP BY user_id, account",
+                (snapshot_id, *args)
+            ).fetchall()
+            return snapshot_id, snapshot, tail
+
+        self.snapshot_id, snapshot, tail = await self.armazenamento.executar(_read)
+        balances = dict(base or {})
+        balances.update((uid, json.loads(value)) for uid, value in snapshot)
+        for uid, account, total in tail:
+            balance = balances.setdefault(uid, {account: 0 for account in ACCOUNTS})
+            balance[account] = balance.get(account, 0) + total
+        return balances
+
+    async def history(self, user_id, limit=10, before_id=None):
+        """Últimas movimentações de um usuário, da mais recente para a mais antiga."""
+        def _query(conexao):
+            return conexao.execute(
+                "SELECT id, account, delta, reason, ts FROM economia_ledger "
+                "WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (str(user_id), before_id if before_id is not None else 2 ** 63 - 1, limit)
+            ).fetchall()
+
+        rows = await self.armazenamento.executar(_query)
+        # Inclui linhas ainda não gravadas, que são sempre as mais recentes
+        pending = [
+            (None, account, delta, reason, ts)
+            for uid, account, delta, reason, ts in reversed(self._pending) if uid == str(user_id)
+        ]
+        return (pending + rows)[:limit] if before_id is None else rows
@@ -0,0 +1,157 @@
+import asyncio
+
+import numpy as np
+
+NUMBERS = 50
+PICKS = 6
+
+# Bilhetes de uma rodada; cada um ocupa uma linha (rodada, servidor, usuário, números em bitmask)
+def create_tables(conexao):
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS economia_loteria_bilhetes ("
+        " round INTEGER NOT NULL,"
+        " user_id INTEGER NOT NULL,"
+        " mask INTEGER NOT NULL,"
+        " guild_id INTEGER NOT NULL DEFAULT 0"
+        ")"
+    )
+    columns = {row[1] for row in conexao.execute("PRAGMA table_info(economia_loteria_bilhetes)")}
+    if 'guild_id' not in columns:
+        # Bilhetes de antes da economia por servidor ficam com guild_id 0 até a partição
+        conexao.execute("ALTER TABLE economia_loteria_bilhetes ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+    conexao.execute(
+        "CREATE INDEX IF NOT EXISTS economia_loteria_bilhetes_round ON economia_loteria_bilhetes (round)"
+    )
+
+
+def to_mask(numbers):
+    """Números de 1 a 50 viram um inteiro de 50 bits (bit n-1 ligado para o número n)."""
+    mask = 0
+    for number in numbers:
+        mask |= 1 << (number - 1)
+    return mask
+
+
+def from_mask(mask):
+    return [n + 1 for n in range(NUMBERS) if mask >> n & 1]
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(values):
+        return np.bitwise_count(values)
+else:
+    _BITS_PER_BYTE = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+    def popcount(values):
+        # numpy < 2.0: conta os bits de cada byte e soma os 8 bytes de cada valor
+        as_bytes = np.ascontiguousarray(values, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+        return _BITS_PER_BYTE[as_bytes].sum(axis=1, dtype=np.uint8)
+
+
+class TicketPool:
+    """Bilhetes da rodada em dois arrays paralelos (usuário e bitmask dos números).
+
+    Cada bilhete custa 16 bytes. No sorteio, os acertos de todos os bilhetes
+    saem de uma única operação: popcount(mascaras & mascara_sorteada).
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._users = np.zeros(capacity, dtype=np.uint64)
+        self._masks = np.zeros(capacity, dtype=np.uint64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def users(self):
+        return self._users[:self.size]
+
+    @property
+    def masks(self):
+        return self._masks[:self.size]
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self._users):
+            return
+        capacity = max(needed, len(self._users) * 2)
+        for name in ("_users", "_masks"):
+            array = np.zeros(capacity, dtype=np.uint64)
+            array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+
+    def add(self, user_id, mask):
+        self._reserve(1)
+        self._users[self.size] = user_id
+        self._masks[self.size] = mask
+        self.size += 1
+
+    def extend(self, users, masks):
+        users = np.asarray(users, dtype=np.uint64)
+        self._reserve(len(users))
+        self._users[self.size:self.size + len(users)] = users
+        self._masks[self.size:self.size + len(users)] = np.asarray(masks, dtype=np.uint64)
+        self.size += len(users)
+
+    def clear(self):
+        self.size = 0
+
+    def tickets_of(self, user_id):
+        return self.masks[self.users == np.uint64(user_id)].tolist()
+
+    def matches(self, winning_mask):
+        """Acertos de cada bilhete, na ordem de compra."""
+        return popcount(self.masks & np.uint64(winning_mask))
+
+    def payouts(self, winning_mask, prizes):
+        """Soma os prêmios por usuário: (user_ids, totais, melhor acerto, bilhetes por faixa).
+
+        `prizes` é {acertos: prêmio}; os usuários saem como ints do Python.
+        """
+        matches = self.matches(winning_mask)
+        table = np.zeros(PICKS + 1, dtype=np.int64)
+        for hits, prize in prizes.items():
+            table[hits] = prize
+        per_ticket = table[matches]
+
+        winners = per_ticket > 0
+        users, inverse = np.unique(self.users[winners], return_inverse=True)
+        totals = np.bincount(inverse, weights=per_ticket[winners], minlength=len(users)).astype(np.int64)
+        best = np.zeros(len(users), dtype=np.uint8)
+        np.maximum.at(best, inverse, matches[winners])
+        tiers = np.bincount(matches, minlength=PICKS + 1)
+        return users.tolist(), totals.tolist(), best.tolist(), {hits: int(tiers[hits]) for hits in prizes}
+
+
+class RoundGate:
+    """Deixa várias compras acontecerem juntas, mas o sorteio espera todas terminarem.
+
+    Enquanto o sorteio roda, compras novas esperam ele acabar; assim nenhum
+    bilhete é gravado em uma rodada que já foi sorteada.
+    """
+
+    def __init__(self):
+        self._buying = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._open = asyncio.Event()
+        self._open.set()
+
+    async def __aenter__(self):
+        await self._open.wait()
+        self._buying += 1
+        self._idle.clear()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._buying -= 1
+        if self._buying == 0:
+            self._idle.set()
+
+    async def close(self):
+        """Fecha para compras novas e espera as que estão em andamento."""
+        self._open.clear()
+        await self._idle.wait()
+
+    def reopen(self):
+        self._open.set()
@@ -0,0 +1,193 @@
+import bisect
+import functools
+import math
+import time
+
+# Limites padrão dos histogramas, em segundos
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _formatar_valor(valor):
+    if math.isnan(valor):
+        return "NaN"
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+
+    def _chave(self, rotulos):
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"{self.nome} espera os rótulos {self.rotulos}, recebeu {tuple(rotulos)}")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def remover(self, **rotulos):
+        self._series.pop(self._chave(rotulos), None)
+
+    def _linhas(self):
+        for chave, valor in self._series.items():
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}"
+
+    def exportar(self):
+        cabecalho = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        return cabecalho + list(self._linhas())
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        self._series[chave] = self._series.get(chave, 0) + valor
+
+
+class Medidor(_Metrica):
+    """Valor que sobe e desce. Pode ser definido direto ou lido de uma função na hora da coleta."""
+
+    tipo = "gauge"
+
+    def definir(self, valor, **rotulos):
+        self._series[self._chave(rotulos)] = valor
+
+    def definir_funcao(self, funcao, **rotulos):
+        self._series[self._chave(rotulos)] = funcao
+
+    def _linhas(self):
+        for chave, valor in list(self._series.items()):
+            if callable(valor):
+                try:
+                    valor = valor()
+                except Exception:
+                    valor = math.nan
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}"
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        serie = self._series.get(chave)
+        if serie is None:
+            # Contagem por bucket (não cumulativa), soma e total
+            serie = self._series[chave] = [[0] * len(self.buckets), 0.0, 0]
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self.buckets):
+            serie[0][indice] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def _linhas(self):
+        for chave, (contagens, soma, total) in self._series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, chave, ("le", _formatar_valor(limite)))
+                yield f"{self.nome}_bucket{rotulos} {acumulado}"
+            rotulos = _formatar_rotulos(self.rotulos, chave, ("le", "+Inf"))
+            yield f"{self.nome}_bucket{rotulos} {total}"
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            yield f"{self.nome}_sum{rotulos} {_formatar_valor(soma)}"
+            yield f"{self.nome}_count{rotulos} {total}"
+
+
+class Registro:
+    """Conjunto das métricas do processo, exportado no formato texto do Prometheus.
+
+    Pedir duas vezes a mesma métrica devolve a mesma instância, então cada
+    módulo pode declarar as suas sem se preocupar com a ordem de carga.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+
+    def _obter(self, classe, nome, ajuda, rotulos, **opcoes):
+        metrica = self._metricas.get(nome)
+        if metrica is None:
+            metrica = self._metricas[nome] = classe(nome, ajuda, rotulos, **opcoes)
+        elif not isinstance(metrica, classe):
+            raise ValueError(f"A métrica {nome} já existe com outro tipo")
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._obter(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome, ajuda, rotulos=()):
+        return self._obter(Medidor, nome, ajuda, rotulos)
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        return self._obter(Histograma, nome, ajuda, rotulos, buckets=buckets)
+
+    def exportar(self):
+        linhas = []
+        for metrica in self._metricas.values():
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+_registro = None
+
+
+def obter_registro():
+    global _registro
+    if _registro is None:
+        _registro = Registro()
+    return _registro
+
+
+def tamanho_cache(nome, funcao):
+    """Publica o tamanho de um cache em memória; `funcao` é chamada a cada coleta."""
+    obter_registro().medidor(
+        "natanbot_cache_itens", "Itens em cada cache em memória", ("cache",)
+    ).definir_funcao(funcao, cache=nome)
+
+
+def remover_cache(nome):
+    obter_registro().medidor(
+        "natanbot_cache_itens", "Itens em cada cache em memória", ("cache",)
+    ).remover(cache=nome)
+
+
+def medir_listener(funcao):
+    """Decorador que registra o tempo de execução de um listener assíncrono."""
+    histograma = obter_registro().histograma(
+        "natanbot_listener_segundos", "Tempo de execução de cada listener", ("listener",)
+    )
+    nome = funcao.__qualname__
+
+    @functools.wraps(funcao)
+    async def _medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await funcao(*args, **kwargs)
+        finally:
+            histograma.observar(time.perf_counter() - inicio, listener=nome)
+
+    return _medido
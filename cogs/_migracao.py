@@ -0,0 +1,100 @@
+import json
+import os
+
+# Importação única dos arquivos JSON antigos para o banco SQLite.
+# Cada função recebe o conteúdo do arquivo e gera tuplas (colecao, chave, valor).
+
+
+def _linhas_xp(dados):
+    for gid, usuarios in dados.items():
+        if gid == "config":
+            yield ("config", "xp", usuarios)
+            continue
+        for uid, registro in usuarios.items():
+            yield ("xp", f"{gid}:{uid}", registro)
+
+
+def _linhas_economia(dados):
+    for uid, registro in dados.get("users", {}).items():
+        yield ("economia_usuarios", uid, registro)
+    for uid, registro in dados.get("vip", {}).items():
+        yield ("economia_vip", uid, registro)
+    if "shop" in dados:
+        yield ("config", "economia_loja", dados["shop"])
+
+
+def _linhas_moderacao(dados):
+    for uid, avisos in dados.get("avisos", {}).items():
+        yield ("mod_avisos", uid, avisos)
+    for uid, mute in dados.get("mutes", {}).items():
+        yield ("mod_mutes", uid, mute)
+    for uid, ban in dados.get("bans_temporarios", {}).items():
+        yield ("mod_bans_temporarios", uid, ban)
+    if "configuracoes" in dados:
+        yield ("config", "moderacao", dados["configuracoes"])
+    for i, entrada in enumerate(dados.get("historico", []), 1):
+        yield ("mod_historico", f"{i:012d}", entrada)
+
+
+def _linhas_antipalavrao_config(dados):
+    yield ("config", "antipalavrao", dados)
+
+
+def _linhas_por_guild_usuario(colecao):
+    def _linhas(dados):
+        for gid, usuarios in dados.items():
+            for uid, registro in usuarios.items():
+                yield (colecao, f"{gid}:{uid}", registro)
+    return _linhas
+
+
+def _linhas_por_guild(colecao):
+    def _linhas(dados):
+        for gid, registro in dados.items():
+            yield (colecao, gid, registro)
+    return _linhas
+
+
+def _linhas_mensagens(dados):
+    for i, mensagem in enumerate(dados, 1):
+        yield ("mensagens", f"{i:08d}", dict(mensagem, id=i))
+
+
+ARQUIVOS_JSON = [
+    ("data/xp.json", _linhas_xp),
+    ("economy_data.json", _linhas_economia),
+    ("moderacao.json", _linhas_moderacao),
+    ("antipalavrao_config.json", _linhas_antipalavrao_config),
+    ("antipalavrao_warnings.json", _linhas_por_guild_usuario("antipalavrao_avisos")),
+    ("data/logs.json", _linhas_por_guild("logs")),
+    ("data/tickets.json", _linhas_por_guild("tickets")),
+    ("data/sorteios.json", _linhas_por_guild("sorteios")),
+    ("data/mensagens.json", _linhas_mensagens),
+    ("aniversarios.json", _linhas_por_guild_usuario("aniversarios")),
+]
+
+
+async def migrar_arquivos_json(armazenamento):
+    """Importa cada arquivo JSON antigo uma única vez.
+
+    Os arquivos já importados ficam anotados na coleção `_meta`, então as
+    próximas inicializações não fazem nada. Os arquivos originais não são
+    apagados.
+    """
+    migrados = await armazenamento.obter("_meta", "migracao_json", {})
+
+    for caminho, gerar_linhas in ARQUIVOS_JSON:
+        if migrados.get(caminho) or not os.path.exists(caminho):
+            continue
+
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"❌ Erro ao ler {caminho} para migração: {e}")
+            continue
+
+        linhas = list(gerar_linhas(dados))
+        migrados[caminho] = True
+        await armazenamento.gravar(linhas + [("_meta", "migracao_json", migrados)])
+        print(f"✅ {caminho} migrado para o banco ({len(linhas)} registros)")
@@ -0,0 +1,224 @@
+import json
+import struct
+
+from cogs._armazenamento import aplicar_alteracoes
+from cogs._ledger import ACCOUNTS
+from cogs._vip import para_epoch
+
+# Perfil da economia em binário (versão 2), uma linha por (servidor, usuário) em economia_perfis_guild
+# (economia_perfis guarda os perfis globais de antes da economia por servidor):
+#   cabeçalho  "<BIIIIIH": versão, level, xp, daily_claimed, work_cooldown, rob_cooldown, itens
+#              (horários em epoch; 0 = nunca)
+#   itens      por item: tamanho do emoji (H), emoji em UTF-8, quantidade (I)
+#              (a versão 1 gravava o tamanho em um byte e ainda é lida)
+#   extras     tamanho (I) + JSON com campos desconhecidos, normalmente vazio
+# Saldos não entram aqui: vivem no ledger e nos snapshots.
+VERSION = 2
+_HEADER = struct.Struct("<BIIIIIH")
+_KEY = struct.Struct("<H")
+_ITEM = struct.Struct("<I")
+_EXTRAS = struct.Struct("<I")
+
+TIMESTAMPS = ('daily_claimed', 'work_cooldown', 'rob_cooldown')
+_KNOWN = {'level', 'xp', 'inventory', *TIMESTAMPS, *ACCOUNTS}
+
+
+def new_profile():
+    return {
+        'money': 0,
+        'bank': 0,
+        'inventory': {},
+        'daily_claimed': None,
+        'work_cooldown': None,
+        'rob_cooldown': None,
+        'level': 1,
+        'xp': 0
+    }
+
+
+def create_tables(conexao):
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS economia_perfis ("
+        " user_id TEXT PRIMARY KEY,"
+        " dados BLOB NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS economia_perfis_guild ("
+        " guild_id INTEGER NOT NULL,"
+        " user_id TEXT NOT NULL,"
+        " dados BLOB NOT NULL,"
+        " PRIMARY KEY (guild_id, user_id)"
+        ") WITHOUT ROWID"
+    )
+
+
+def pack(profile):
+    """Codifica um perfil (sem os saldos) no formato binário."""
+    inventory = profile.get('inventory') or {}
+    parts = [_HEADER.pack(
+        VERSION, profile.get('level', 1), profile.get('xp', 0),
+        *(profile.get(field) or 0 for field in TIMESTAMPS), len(inventory)
+    )]
+    for emoji, quantity in inventory.items():
+        encoded = emoji.encode('utf-8')
+        parts += (_KEY.pack(len(encoded)), encoded, _ITEM.pack(quantity))
+    extras = {k: v for k, v in profile.items() if k not in _KNOWN}
+    encoded = json.dumps(extras, ensure_ascii=False, default=str).encode('utf-8') if extras else b""
+    parts += (_EXTRAS.pack(len(encoded)), encoded)
+    return b"".join(parts)
+
+
+def unpack(raw):
+    version, level, xp, *times, items = _HEADER.unpack_from(raw)
+    if version not in (1, VERSION):
+        raise ValueError(f"Versão de perfil desconhecida: {version}")
+    profile = new_profile()
+    profile.update(zip(TIMESTAMPS, (t or None for t in times)), level=level, xp=xp)
+
+    offset = _HEADER.size
+    inventory = profile['inventory']
+    for _ in range(items):
+        if version == 1:
+            size = raw[offset]
+            offset += 1
+        else:
+            (size,) = _KEY.unpack_from(raw, offset)
+            offset += _KEY.size
+        emoji = raw[offset:offset + size].decode('utf-8')
+        offset += size
+        inventory[emoji] = _ITEM.unpack_from(raw, offset)[0]
+        offset += _ITEM.size
+
+    (size,) = _EXTRAS.unpack_from(raw, offset)
+    if size:
+        offset += _EXTRAS.size
+        profile.update(json.loads(raw[offset:offset + size]))
+    return profile
+
+
+def from_json(record):
+    """Converte um perfil no formato JSON antigo (horários em texto ISO local)."""
+    profile = new_profile()
+    profile.update({k: v for k, v in record.items() if k not in ACCOUNTS})
+    for field in TIMESTAMPS:
+        profile[field] = para_epoch(profile[field])
+    return profile
+
+
+def read_profiles(conexao):
+    return dict(conexao.execute("SELECT user_id, dados FROM economia_perfis"))
+
+
+def write_profiles(conexao, profiles):
+    """Grava [(user_id, bytes)] na mesma transação de `conexao`."""
+    conexao.executemany(
+        "INSERT INTO economia_perfis (user_id, dados) VALUES (?, ?) "
+        "ON CONFLICT (user_id) DO UPDATE SET dados = excluded.dados",
+        profiles
+    )
+
+
+def read_guild_profiles(conexao, guild_id):
+    return dict(conexao.execute("SELECT user_id, dados FROM economia_perfis_guild WHERE guild_id = ?", (guild_id,)))
+
+
+def write_guild_profiles(conexao, guild_id, profiles):
+    """Grava [(user_id, bytes)] de um servidor na mesma transação de `conexao`."""
+    conexao.executemany(
+        "INSERT INTO economia_perfis_guild (guild_id, user_id, dados) VALUES (?, ?, ?) "
+        "ON CONFLICT (guild_id, user_id) DO UPDATE SET dados = excluded.dados",
+        [(guild_id, uid, raw) for uid, raw in profiles]
+    )
+
+
+def convert_json_profiles(conexao):
+    """Passa os perfis da coleção JSON `economia_usuarios` para economia_perfis.
+
+    Linhas muito antigas ainda trazem o saldo; ele vira o snapshot do usuário
+    se ainda não houver um. Tudo acontece em uma transação, então um perfil
+    nunca fica nos dois formatos nem some no meio da conversão.
+    """
+    create_tables(conexao)
+    rows = conexao.execute(
+        "SELECT chave, valor FROM registros WHERE colecao = 'economia_usuarios'"
+    ).fetchall()
+    if not rows:
+        return 0
+    snapshots = {uid for (uid,) in conexao.execute(
+        "SELECT chave FROM registros WHERE colecao = 'economia_saldos'"
+    )}
+
+    profiles = []
+    balances = []
+    for uid, value in rows:
+        record = json.loads(value)
+        if 'money' in record and uid not in snapshots:
+            balances.append(('economia_saldos', uid, {a: record.get(a, 0) for a in ACCOUNTS}))
+        profiles.append((uid, pack(from_json(record))))
+
+    write_profiles(conexao, profiles)
+    aplicar_alteracoes(conexao, balances)
+    conexao.execute("DELETE FROM registros WHERE colecao = 'economia_usuarios'")
+    return len(profiles)
+
+
+class Profiles:
+    """Perfis da economia, decodificados só quando alguém usa o usuário.
+
+    Ao iniciar, cada perfil fica como os bytes lidos do banco mais os saldos
+    (cerca de 100 bytes por usuário). No primeiro acesso, vira o dicionário
+    de sempre e passa a ser usado diretamente pelos comandos.
+    """
+
+    def __init__(self, packed=None, balances=None):
+        self._loaded = {}
+        # user_id: (bytes ou None, saldos ou None) dos perfis ainda não decodificados
+        self._lazy = {uid: (raw, None) for uid, raw in (packed or {}).items()}
+        for uid, balance in (balances or {}).items():
+            self._lazy[uid] = (self._lazy.get(uid, (None,))[0], balance)
+
+    def __len__(self):
+        return len(self._loaded) + len(self._lazy)
+
+    def __contains__(self, user_id):
+        return user_id in self._loaded or user_id in self._lazy
+
+    def __iter__(self):
+        yield from self._loaded
+        yield from self._lazy
+
+    def __getitem__(self, user_id):
+        profile = self._loaded.get(user_id)
+        if profile is None:
+            raw, balance = self._lazy.pop(user_id)
+            profile = unpack(raw) if raw is not None else new_profile()
+            if balance:
+                profile.update(balance)
+            self._loaded[user_id] = profile
+        return profile
+
+    def __setitem__(self, user_id, profile):
+        self._lazy.pop(user_id, None)
+        self._loaded[user_id] = profile
+
+    def get(self, user_id, default=None):
+        return self[user_id] if user_id in self else default
+
+    @property
+    def loaded(self):
+        return len(self._loaded)
+
+    def wealth(self):
+        """(user_id, carteira + banco) de todos os usuários, sem decodificar ninguém."""
+        for uid, profile in self._loaded.items():
+            yield uid, profile['money'] + profile['bank']
+        for uid, (_, balance) in self._lazy.items():
+            yield uid, sum(balance.values()) if balance else 0
+
+    def pack(self, user_id):
+        """Bytes atuais de um perfil; perfis nunca decodificados voltam como foram lidos."""
+        if user_id in self._loaded:
+            return pack(self._loaded[user_id])
+        raw, _ = self._lazy[user_id]
+        return raw if raw is not None else pack(new_profile())
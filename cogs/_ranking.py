@@ -0,0 +1,204 @@
+from bisect import bisect_left, insort
+
+
+class ListaOrdenada:
+    """Lista sempre ordenada, dividida em blocos de tamanho limitado.
+
+    Inserir e remover custam uma busca binária nos máximos dos blocos mais
+    uma inserção dentro de um bloco pequeno. Uma árvore de Fenwick sobre o
+    tamanho dos blocos permite descobrir a posição de um valor (e o valor
+    de uma posição) sem percorrer a lista.
+    """
+
+    CARGA = 512
+
+    def __init__(self, valores=()):
+        self._blocos = []
+        self._maximos = []
+        self._arvore = []
+        self._tamanho = 0
+
+        valores = sorted(valores)
+        for i in range(0, len(valores), self.CARGA):
+            bloco = valores[i:i + self.CARGA]
+            self._blocos.append(bloco)
+            self._maximos.append(bloco[-1])
+        self._tamanho = len(valores)
+        self._reconstruir_arvore()
+
+    def __len__(self):
+        return self._tamanho
+
+    def __iter__(self):
+        for bloco in self._blocos:
+            yield from bloco
+
+    # ==== Árvore de Fenwick com o tamanho de cada bloco ====
+
+    def _reconstruir_arvore(self):
+        arvore = [len(bloco) for bloco in self._blocos]
+        for i in range(len(arvore)):
+            pai = i | (i + 1)
+            if pai < len(arvore):
+                arvore[pai] += arvore[i]
+        self._arvore = arvore
+
+    def _somar(self, indice_bloco, delta):
+        arvore = self._arvore
+        while indice_bloco < len(arvore):
+            arvore[indice_bloco] += delta
+            indice_bloco |= indice_bloco + 1
+
+    def _antes_do_bloco(self, indice_bloco):
+        """Quantidade de valores nos blocos anteriores a `indice_bloco`."""
+        total = 0
+        i = indice_bloco - 1
+        while i >= 0:
+            total += self._arvore[i]
+            i = (i & (i + 1)) - 1
+        return total
+
+    def _localizar(self, posicao):
+        """Converte uma posição global em (índice do bloco, posição no bloco)."""
+        indice = -1
+        passo = 1 << len(self._arvore).bit_length()
+        while passo:
+            proximo = indice + passo
+            if proximo < len(self._arvore) and self._arvore[proximo] <= posicao:
+                posicao -= self._arvore[proximo]
+                indice = proximo
+            passo >>= 1
+        return indice + 1, posicao
+
+    # ==== Operações ====
+
+    def adicionar(self, valor):
+        if not self._blocos:
+            self._blocos.append([valor])
+            self._maximos.append(valor)
+            self._tamanho = 1
+            self._reconstruir_arvore()
+            return
+
+        i = bisect_left(self._maximos, valor)
+        if i == len(self._maximos):
+            i -= 1
+            self._blocos[i].append(valor)
+            self._maximos[i] = valor
+        else:
+            insort(self._blocos[i], valor)
+
+        self._tamanho += 1
+        if len(self._blocos[i]) > 2 * self.CARGA:
+            bloco = self._blocos[i]
+            self._blocos[i:i + 1] = [bloco[:self.CARGA], bloco[self.CARGA:]]
+            self._maximos[i:i + 1] = [bloco[self.CARGA - 1], bloco[-1]]
+            self._reconstruir_arvore()
+        else:
+            self._somar(i, 1)
+
+    def remover(self, valor):
+        i = bisect_left(self._maximos, valor)
+        if i == len(self._maximos):
+            raise ValueError(f"{valor!r} não está na lista")
+        bloco = self._blocos[i]
+        j = bisect_left(bloco, valor)
+        if j == len(bloco) or bloco[j] != valor:
+            raise ValueError(f"{valor!r} não está na lista")
+
+        del bloco[j]
+        self._tamanho -= 1
+        if not bloco:
+            del self._blocos[i]
+            del self._maximos[i]
+            self._reconstruir_arvore()
+        else:
+            self._maximos[i] = bloco[-1]
+            self._somar(i, -1)
+
+    def indice(self, valor):
+        """Posição (a partir de 0) de `valor` na lista."""
+        i = bisect_left(self._maximos, valor)
+        if i == len(self._maximos):
+            raise ValueError(f"{valor!r} não está na lista")
+        bloco = self._blocos[i]
+        j = bisect_left(bloco, valor)
+        if j == len(bloco) or bloco[j] != valor:
+            raise ValueError(f"{valor!r} não está na lista")
+        return self._antes_do_bloco(i) + j
+
+    def fatia(self, inicio, fim):
+        """Valores das posições [inicio, fim)."""
+        inicio = max(inicio, 0)
+        fim = min(fim, self._tamanho)
+        if inicio >= fim:
+            return []
+
+        i, j = self._localizar(inicio)
+        resultado = []
+        restantes = fim - inicio
+        while restantes > 0:
+            parte = self._blocos[i][j:j + restantes]
+            resultado.extend(parte)
+            restantes -= len(parte)
+            i, j = i + 1, 0
+        return resultado
+
+
+class Ranking:
+    """Classificação incremental de usuários por uma pontuação (maior primeiro).
+
+    A pontuação é uma tupla, comparada em ordem (por exemplo `(nivel, xp)`);
+    empates são desfeitos pelo menor ID de usuário.
+    """
+
+    def __init__(self, pontuacoes=None):
+        # pontuacoes: {user_id: tupla de pontuação}, usado para montar de uma vez
+        self._chaves = {}
+        if pontuacoes:
+            self._chaves = {uid: self._chave(uid, p) for uid, p in pontuacoes.items()}
+        self._lista = ListaOrdenada(self._chaves.values())
+
+    @staticmethod
+    def _chave(user_id, pontuacao):
+        return tuple(-p for p in pontuacao) + (user_id,)
+
+    @staticmethod
+    def _entrada(chave):
+        return (chave[-1],) + tuple(-p for p in chave[:-1])
+
+    def __len__(self):
+        return len(self._lista)
+
+    def __contains__(self, user_id):
+        return user_id in self._chaves
+
+    def atualizar(self, user_id, *pontuacao):
+        nova = self._chave(user_id, pontuacao)
+        antiga = self._chaves.get(user_id)
+        if antiga == nova:
+            return
+        if antiga is not None:
+            self._lista.remover(antiga)
+        self._lista.adicionar(nova)
+        self._chaves[user_id] = nova
+
+    def remover(self, user_id):
+        antiga = self._chaves.pop(user_id, None)
+        if antiga is not None:
+            self._lista.remover(antiga)
+
+    def posicao(self, user_id):
+        """Posição do usuário (1 = primeiro lugar), ou None se ele não estiver no ranking."""
+        chave = self._chaves.get(user_id)
+        if chave is None:
+            return None
+        return self._lista.indice(chave) + 1
+
+    def pagina(self, numero, tamanho=10):
+        """Entradas (user_id, *pontuação) da página `numero` (a partir de 1)."""
+        inicio = (numero - 1) * tamanho
+        return [self._entrada(chave) for chave in self._lista.fatia(inicio, inicio + tamanho)]
+
+    def top(self, n=10):
+        return self.pagina(1, n)
@@ -0,0 +1,119 @@
+from dataclasses import dataclass, field, fields, replace
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigXP:
+    """Configuração de XP já resolvida para uma guild (padrão global + overrides da guild).
+
+    É imutável e remontada só quando um comando !set* muda algum valor, então
+    o on_message faz uma única consulta por mensagem.
+    """
+    mensagens_por_xp: int = 10
+    xp_base: int = 10
+    xp_por_nivel: int = 10
+    cooldown: int = 60
+    # Configurações VIP
+    vip_multiplicador_xp: float = 2.0
+    vip_reducao_cooldown: float = 0.5  # 50% de redução
+    vip_bonus_nivel: float = 1.5  # Bônus no cálculo de XP necessário
+    vip_mensagens_bonus: int = 5  # A cada 5 mensagens ganha XP extra
+
+    # Valores derivados, calculados uma vez na montagem
+    cooldown_vip: int = field(init=False)
+    xp_bonus_vip: int = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "cooldown_vip", int(self.cooldown * self.vip_reducao_cooldown))
+        object.__setattr__(self, "xp_bonus_vip", int(self.xp_base * 0.5))  # 50% do XP base como bônus
+
+    @classmethod
+    def montar(cls, *camadas):
+        """Monta a config aplicando as camadas (dicts) em ordem; chaves desconhecidas são ignoradas."""
+        config = cls()
+        for camada in camadas:
+            valores = {chave: camada[chave] for chave in CHAVES_CONFIG if chave in camada}
+            if valores:
+                config = replace(config, **valores)
+        return config
+
+    def cooldown_para(self, is_vip):
+        return self.cooldown_vip if is_vip else self.cooldown
+
+    def multiplicador_para(self, is_vip):
+        return self.vip_multiplicador_xp if is_vip else 1.0
+
+    def xp_necessario(self, nivel, is_vip):
+        xp_necessario = self.xp_por_nivel * nivel
+        # Bônus VIP: XP necessário ligeiramente reduzido
+        if is_vip:
+            xp_necessario = int(xp_necessario / self.vip_bonus_nivel)
+        return xp_necessario
+
+
+CHAVES_CONFIG = tuple(f.name for f in fields(ConfigXP) if f.init)
+
+
+def novo_usuario():
+    return {
+        "xp": 0,
+        "nivel": 1,
+        "mensagens": 0,
+        "vip": False,
+        "vip_expira": None  # Epoch de quando o VIP expira
+    }
+
+
+def aplicar_mensagem(usuario, config, is_vip):
+    """Aplica uma mensagem (já fora do cooldown) ao registro do usuário.
+
+    É a regra usada tanto no on_message quanto no backfill e no replay
+    offline. Retorna (xp_ganho, subiu_de_nivel).
+    """
+    usuario["mensagens"] += 1
+    xp_ganho = 0
+
+    # Ganho de XP normal
+    if usuario["mensagens"] % config.mensagens_por_xp == 0:
+        xp_ganho = int(config.xp_base * config.multiplicador_para(is_vip))
+        usuario["xp"] += xp_ganho
+
+    # Bônus VIP: XP extra a cada X mensagens
+    if is_vip and usuario["mensagens"] % config.vip_mensagens_bonus == 0:
+        usuario["xp"] += config.xp_bonus_vip
+        xp_ganho += config.xp_bonus_vip
+
+    # Verificar level up
+    if xp_ganho > 0:
+        xp_necessario = config.xp_necessario(usuario["nivel"], is_vip)
+        if usuario["xp"] >= xp_necessario:
+            usuario["xp"] -= xp_necessario
+            usuario["nivel"] += 1
+            return xp_ganho, True
+
+    return xp_ganho, False
+
+
+def reproduzir(eventos, config, vips=(), usuarios=None):
+    """Replay offline: aplica uma sequência de mensagens em ordem de tempo.
+
+    `eventos` são pares (user_id, timestamp em segundos), já ordenados pelo
+    timestamp. O cooldown é checado pelo timestamp de cada mensagem, igual ao
+    que o bot teria feito ao vivo. Retorna {user_id: registro}.
+    """
+    usuarios = {} if usuarios is None else usuarios
+    ultimo = {}
+    vips = set(vips)
+
+    for user_id, timestamp in eventos:
+        is_vip = user_id in vips
+        anterior = ultimo.get(user_id)
+        if anterior is not None and timestamp - anterior < config.cooldown_para(is_vip):
+            continue
+        ultimo[user_id] = timestamp
+
+        usuario = usuarios.get(user_id)
+        if usuario is None:
+            usuario = usuarios[user_id] = novo_usuario()
+        aplicar_mensagem(usuario, config, is_vip)
+
+    return usuarios
@@ -0,0 +1,137 @@
+import asyncio
+import math
+import os
+import time
+
+import aiohttp
+from aiohttp import web
+
+from cogs._metricas import obter_registro
+
+# Intervalo das medições de atraso do loop de eventos
+INTERVALO_LAG = float(os.getenv("METRICAS_INTERVALO_LAG", "0.5"))
+INTERVALO_AUTO_PING = 600
+
+
+def instrumentar(bot):
+    """Registra as métricas do gateway e a latência de cada comando."""
+    registro = obter_registro()
+    registro.medidor(
+        "natanbot_gateway_latencia_segundos", "Latência do heartbeat do gateway"
+    ).definir_funcao(lambda: bot.latency)
+    registro.medidor("natanbot_guilds", "Servidores em que o bot está").definir_funcao(lambda: len(bot.guilds))
+    registro.medidor("natanbot_pronto", "1 quando o bot está conectado e pronto").definir_funcao(
+        lambda: int(bot.is_ready() and not bot.is_closed())
+    )
+
+    latencia = registro.histograma(
+        "natanbot_comando_segundos", "Tempo de execução de cada comando", ("comando", "resultado")
+    )
+
+    # Ganchos globais em vez de um listener de on_command_error, que desligaria o log padrão de erros
+    @bot.before_invoke
+    async def _antes(ctx):
+        ctx.inicio_metricas = time.perf_counter()
+
+    @bot.after_invoke
+    async def _depois(ctx):
+        inicio = getattr(ctx, "inicio_metricas", None)
+        if inicio is not None and ctx.command is not None:
+            latencia.observar(
+                time.perf_counter() - inicio,
+                comando=ctx.command.qualified_name,
+                resultado="erro" if ctx.command_failed else "ok",
+            )
+
+
+async def monitorar_loop():
+    """Mede quanto o loop de eventos atrasa para acordar uma tarefa que só dorme."""
+    registro = obter_registro()
+    atual = registro.medidor("natanbot_event_loop_lag_segundos", "Último atraso medido do loop de eventos")
+    historico = registro.histograma(
+        "natanbot_event_loop_lag_historico_segundos", "Distribuição do atraso do loop de eventos"
+    )
+    while True:
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO_LAG)
+        atraso = max(time.perf_counter() - inicio - INTERVALO_LAG, 0.0)
+        atual.definir(atraso)
+        historico.observar(atraso)
+
+
+async def auto_ping(url):
+    """Mantém o serviço acordado no Render fazendo uma requisição a cada 10 minutos."""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as sessao:
+        while True:
+            try:
+                async with sessao.get(url) as resposta:
+                    await resposta.read()
+                print(f"✅ Auto-ping enviado para: {url}")
+            except Exception as e:
+                print(f"❌ Erro no auto-ping: {e}")
+            await asyncio.sleep(INTERVALO_AUTO_PING)
+
+
+def criar_app(bot):
+    async def inicio(request):
+        return web.Response(text="✅ Bot está online!")
+
+    async def healthz(request):
+        latencia = bot.latency
+        pronto = bot.is_ready() and not bot.is_closed() and math.isfinite(latencia)
+        return web.json_response(
+            {
+                "pronto": pronto,
+                "fechado": bot.is_closed(),
+                "latencia": latencia if math.isfinite(latencia) else None,
+                "guilds": len(bot.guilds),
+            },
+            status=200 if pronto else 503,
+        )
+
+    async def metricas(request):
+        return web.Response(
+            text=obter_registro().exportar(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/", inicio)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metricas)
+    return app
+
+
+class Servidor:
+    """Servidor HTTP (keep-alive, /healthz e /metrics) rodando no mesmo loop do bot."""
+
+    def __init__(self, bot, porta=None):
+        self.bot = bot
+        self.porta = porta if porta is not None else int(os.environ.get("PORT", 8080))
+        self._runner = None
+        self._tarefas = []
+
+    async def iniciar(self):
+        instrumentar(self.bot)
+
+        self._runner = web.AppRunner(criar_app(self.bot), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "0.0.0.0", self.porta).start()
+        print(f"✅ Servidor HTTP ouvindo na porta {self.porta}")
+
+        self._tarefas.append(asyncio.create_task(monitorar_loop()))
+        url = os.getenv("RENDER_EXTERNAL_URL")
+        if url:
+            self._tarefas.append(asyncio.create_task(auto_ping(url)))
+        else:
+            print("⚠️ Variável RENDER_EXTERNAL_URL não encontrada.")
+
+    async def parar(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
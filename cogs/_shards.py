@@ -0,0 +1,196 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from cogs._armazenamento import aplicar_alteracoes
+from cogs._lottery import create_tables as create_lottery_tables
+from cogs._profiles import Profiles, create_tables, read_profiles
+from cogs._ranking import Ranking
+
+# Marca a divisão da economia global entre os servidores (coleção _meta)
+PARTITION_KEY = 'economia_particionada'
+
+
+class Shard:
+    """Economia de um servidor: perfis (com os saldos) e o ranking de riqueza.
+
+    No ledger e nos snapshots, as contas de um servidor usam a chave
+    "<guild_id>:<user_id>", como as outras coleções por servidor do bot.
+    """
+
+    def __init__(self, guild_id, packed=None, balances=None):
+        self.guild_id = guild_id
+        self.profiles = Profiles(packed, balances)
+        self.wealth = Ranking({int(uid): (total,) for uid, total in self.profiles.wealth() if uid.isdigit()})
+        self.last_used = time.monotonic()
+        self.in_use = 0  # Transações abertas; um shard em uso nunca é descartado
+
+    def key(self, user_id):
+        return f"{self.guild_id}:{user_id}"
+
+
+class _Accounts:
+    """Perfis dos shards carregados pela chave do ledger, para o `Ledger.snapshot`."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def _split(self, key):
+        guild_id, _, user_id = key.partition(':')
+        shard = self._cache.peek(int(guild_id)) if user_id else None
+        return shard, user_id
+
+    def __contains__(self, key):
+        shard, user_id = self._split(key)
+        return shard is not None and user_id in shard.profiles
+
+    def __getitem__(self, key):
+        shard, user_id = self._split(key)
+        if shard is None:
+            raise KeyError(key)
+        return shard.profiles[user_id]
+
+
+class ShardCache:
+    """Shards da economia carregados sob demanda e descartados por LRU.
+
+    `load(guild_id)` monta o shard a partir do banco; chamadas simultâneas
+    para o mesmo servidor esperam a mesma carga. Quem descarta é o `evict`,
+    chamado logo depois de um snapshot do ledger: só saem shards que não
+    foram usados desde o início do snapshot, então tudo o que eles alteraram
+    já está consolidado no banco.
+    """
+
+    def __init__(self, load, max_shards=0, idle_seconds=1800):
+        self._load = load
+        self.max_shards = max_shards  # 0 = sem limite; os ociosos saem de qualquer forma
+        self.idle_seconds = idle_seconds
+        self._shards = OrderedDict()  # guild_id: Shard, do menos para o mais recente
+        self._loading = {}  # guild_id: tarefa da carga em andamento
+        self.accounts = _Accounts(self)
+
+    def __len__(self):
+        return len(self._shards)
+
+    def __iter__(self):
+        return iter(list(self._shards.values()))
+
+    def peek(self, guild_id):
+        """Shard já carregado, sem carregar nem mexer na ordem do LRU."""
+        return self._shards.get(guild_id)
+
+    async def get(self, guild_id):
+        shard = self._shards.get(guild_id)
+        if shard is None:
+            task = self._loading.get(guild_id)
+            if task is None:
+                task = self._loading[guild_id] = asyncio.create_task(self._load_into(guild_id))
+            # Um comando cancelado não cancela a carga que os outros estão esperando
+            shard = await asyncio.shield(task)
+            shard = self._shards.setdefault(guild_id, shard)
+        self._shards.move_to_end(guild_id)
+        shard.last_used = time.monotonic()
+        return shard
+
+    async def _load_into(self, guild_id):
+        try:
+            shard = await self._load(guild_id)
+            self._shards[guild_id] = shard
+            return shard
+        finally:
+            del self._loading[guild_id]
+
+    def evict(self, before):
+        """Descarta os shards ociosos e os excedentes, dos menos usados para os mais usados.
+
+        `before` é o horário (time.monotonic) em que o último snapshot
+        começou; shards usados depois dele ficam. Retorna os guild_ids
+        descartados.
+        """
+        now = time.monotonic()
+        excess = len(self._shards) - self.max_shards if self.max_shards else 0
+        evicted = []
+        for guild_id, shard in list(self._shards.items()):
+            if shard.in_use or shard.last_used >= before:
+                continue
+            if excess > 0 or now - shard.last_used > self.idle_seconds:
+                del self._shards[guild_id]
+                evicted.append(guild_id)
+                excess -= 1
+        return evicted
+
+
+def legacy_pending(conexao):
+    """True se ainda existe economia global para dividir entre os servidores.
+
+    Em um banco sem dados antigos, a partição é marcada como feita aqui mesmo.
+    """
+    create_tables(conexao)
+    if conexao.execute(
+        "SELECT 1 FROM registros WHERE colecao = '_meta' AND chave = ?", (PARTITION_KEY,)
+    ).fetchone():
+        return False
+    legacy = (
+        conexao.execute("SELECT 1 FROM economia_perfis LIMIT 1").fetchone()
+        or conexao.execute(
+            "SELECT 1 FROM registros WHERE colecao = 'economia_saldos' AND chave NOT LIKE '%:%' LIMIT 1"
+        ).fetchone()
+    )
+    if not legacy:
+        aplicar_alteracoes(conexao, [('_meta', PARTITION_KEY, {'users': 0, 'guilds': 0})])
+    return bool(legacy)
+
+
+def home_guilds(members):
+    """{user_id: guild_id} com o servidor que fica com a conta global de cada usuário.
+
+    Cada conta vai para um único servidor, senão o dinheiro e os bilhetes
+    se multiplicariam pelo número de servidores do membro. Fica com o maior
+    servidor em que ele está (o de menor id, no empate); nos outros ele
+    começa do zero, como qualquer membro novo.
+    """
+    homes = {}
+    for guild_id, user_ids in sorted(members.items(), key=lambda item: (-len(item[1]), item[0])):
+        for uid in user_ids:
+            homes.setdefault(uid, guild_id)
+    return homes
+
+
+def partition_legacy(conexao, members, balances, round_id):
+    """Divide a economia global entre os servidores, uma conta por usuário.
+
+    `members` é {guild_id: [user_id]} e `balances` os saldos globais
+    ({user_id: {conta: valor}}). O perfil, os saldos e os bilhetes da rodada
+    atual de cada usuário vão para o servidor escolhido por `home_guilds`,
+    então o total de dinheiro e de bilhetes não muda. As tabelas globais
+    ficam intactas como backup; só os bilhetes antigos (guild_id 0) saem,
+    porque continuariam no sorteio. Retorna quantos perfis foram movidos.
+    """
+    create_tables(conexao)
+    create_lottery_tables(conexao)
+    profiles = read_profiles(conexao)
+    tickets = {}
+    for user_id, mask in conexao.execute(
+        "SELECT user_id, mask FROM economia_loteria_bilhetes WHERE round = ? AND guild_id = 0", (round_id,)
+    ):
+        tickets.setdefault(str(user_id), []).append(mask)
+
+    profile_rows, balance_rows, ticket_rows = [], [], []
+    for uid, guild_id in home_guilds(members).items():
+        if uid in profiles:
+            profile_rows.append((guild_id, uid, profiles[uid]))
+        if uid in balances:
+            balance_rows.append(('economia_saldos', f"{guild_id}:{uid}", balances[uid]))
+        ticket_rows += [(round_id, int(uid), mask, guild_id) for mask in tickets.get(uid, ())]
+
+    conexao.executemany(
+        "INSERT OR IGNORE INTO economia_perfis_guild (guild_id, user_id, dados) VALUES (?, ?, ?)", profile_rows
+    )
+    conexao.execute("DELETE FROM economia_loteria_bilhetes WHERE guild_id = 0")
+    conexao.executemany(
+        "INSERT INTO economia_loteria_bilhetes (round, user_id, mask, guild_id) VALUES (?, ?, ?, ?)", ticket_rows
+    )
+    aplicar_alteracoes(conexao, balance_rows + [
+        ('_meta', PARTITION_KEY, {'users': len(profile_rows), 'guilds': len(members)})
+    ])
+    return len(profile_rows)
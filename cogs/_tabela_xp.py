@@ -0,0 +1,403 @@
+import struct
+
+import numpy as np
+
+# Formato binário: cabeçalho + cada coluna inteira, em little-endian e na ordem de COLUNAS
+MAGICA = b"NXP"
+VERSAO = 1
+CABECALHO = struct.Struct("<3sBI")  # mágica, versão, quantidade de linhas
+
+COLUNAS = (
+    ("ids", np.dtype("<u8")),
+    ("xp", np.dtype("<i8")),
+    ("nivel", np.dtype("<i4")),
+    ("mensagens", np.dtype("<i8")),
+    ("vip", np.dtype("u1")),
+    ("vip_expira", np.dtype("<i8")),  # 0 = sem expiração
+)
+BYTES_POR_LINHA = sum(tipo.itemsize for _, tipo in COLUNAS)
+
+# Linhas por bloco gravado no banco; só os blocos alterados são regravados
+TAMANHO_BLOCO = 1024
+
+# Quantas linhas novas ficam no dicionário antes de entrarem no índice ordenado
+LIMITE_NOVOS = 4096
+
+CAMPOS = ("xp", "nivel", "mensagens", "vip", "vip_expira")
+
+
+class RegistroXP:
+    """Visão de uma linha da tabela com a mesma interface do dict antigo.
+
+    `usuario["xp"] += 10` lê e escreve direto nas colunas, então as regras
+    de `cogs._regras_xp` funcionam sem saber de onde vêm os dados.
+    """
+
+    __slots__ = ("tabela", "linha")
+
+    def __init__(self, tabela, linha):
+        self.tabela = tabela
+        self.linha = linha
+
+    def __getitem__(self, campo):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        valor = int(self.tabela._colunas[campo][self.linha])
+        if campo == "vip":
+            return bool(valor)
+        if campo == "vip_expira":
+            return valor or None
+        return valor
+
+    def __setitem__(self, campo, valor):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        if campo == "vip_expira" and valor is None:
+            valor = 0
+        self.tabela._colunas[campo][self.linha] = valor
+
+    def get(self, campo, padrao=None):
+        try:
+            return self[campo]
+        except KeyError:
+            return padrao
+
+    def update(self, **valores):
+        for campo, valor in valores.items():
+            self[campo] = valor
+
+    def para_dict(self):
+        return {campo: self[campo] for campo in CAMPOS}
+
+
+class TabelaXP:
+    """XP de uma guild em colunas numpy, uma linha por membro.
+
+    Cada membro custa BYTES_POR_LINHA bytes nas colunas, mais o índice
+    id → linha: um par de arrays ordenados (busca binária) e um dicionário
+    pequeno com as linhas criadas desde a última reorganização. As linhas
+    nunca mudam de lugar, então o número da linha identifica o membro e o
+    bloco gravado no banco (`linha // TAMANHO_BLOCO`).
+
+    As colunas crescem dobrando a capacidade. Operações sobre a guild inteira
+    (ranking, VIPs, ajustes em massa) são feitas de uma vez sobre os arrays.
+    """
+
+    def __init__(self, capacidade=16):
+        self.tamanho = 0
+        self._colunas = {nome: np.zeros(capacidade, dtype=tipo) for nome, tipo in COLUNAS}
+        self._ids_ordenados = np.empty(0, dtype=np.uint64)
+        self._linhas_ordenadas = np.empty(0, dtype=np.int64)
+        self._novos = {}  # user_id: linha, ainda fora do índice ordenado
+
+    def __len__(self):
+        return self.tamanho
+
+    def __contains__(self, user_id):
+        return self.procurar(user_id) is not None
+
+    def coluna(self, nome):
+        """Array da coluna, só com as linhas em uso (é uma visão: escrever nele altera a tabela)."""
+        return self._colunas[nome][:self.tamanho]
+
+    # ==== Índice id → linha ====
+
+    def procurar(self, user_id):
+        """Linha do membro, ou None se ele não estiver na tabela."""
+        user_id = int(user_id)
+        linha = self._novos.get(user_id)
+        if linha is not None:
+            return linha
+        ids = self._ids_ordenados
+        # Buscar com um int do Python converteria o array inteiro antes da comparação
+        posicao = int(ids.searchsorted(np.uint64(user_id)))
+        if posicao < len(ids) and ids[posicao] == user_id:
+            return int(self._linhas_ordenadas[posicao])
+        return None
+
+    def procurar_varios(self, user_ids):
+        """Linhas de vários membros de uma vez; -1 para quem não está na tabela."""
+        self._reorganizar()
+        procurados = np.asarray(user_ids, dtype=np.uint64)
+        ids = self._ids_ordenados
+        if not len(ids):
+            return np.full(len(procurados), -1, dtype=np.int64)
+        posicoes = np.minimum(np.searchsorted(ids, procurados), len(ids) - 1)
+        return np.where(ids[posicoes] == procurados, self._linhas_ordenadas[posicoes], -1)
+
+    def linha(self, user_id):
+        """Linha do membro, criando uma linha zerada (nível 1) se ele ainda não existir."""
+        linha = self.procurar(user_id)
+        if linha is None:
+            linha = self._acrescentar(int(user_id))
+        return linha
+
+    def registro(self, user_id):
+        return RegistroXP(self, self.linha(user_id))
+
+    def _acrescentar(self, user_id):
+        if self.tamanho == len(self._colunas["ids"]):
+            self._crescer(max(16, self.tamanho * 2))
+        linha = self.tamanho
+        self.tamanho += 1
+        self._colunas["ids"][linha] = user_id
+        self._colunas["nivel"][linha] = 1
+        self._novos[user_id] = linha
+        if len(self._novos) >= LIMITE_NOVOS:
+            self._reorganizar()
+        return linha
+
+    def _crescer(self, capacidade):
+        for nome, array in self._colunas.items():
+            novo = np.zeros(capacidade, dtype=array.dtype)
+            novo[:self.tamanho] = array[:self.tamanho]
+            self._colunas[nome] = novo
+
+    def _reorganizar(self):
+        if not self._novos and len(self._ids_ordenados) == self.tamanho:
+            return
+        ids = self.coluna("ids")
+        ordem = np.argsort(ids, kind="stable")
+        self._ids_ordenados = ids[ordem]
+        self._linhas_ordenadas = ordem.astype(np.int64)
+        self._novos.clear()
+
+    # ==== Consultas sobre a guild inteira ====
+
+    def pontuacao(self):
+        """(nível, XP) combinados em um único int64 que ordena igual à tupla."""
+        return (self.coluna("nivel").astype(np.int64) << 32) | self.coluna("xp").clip(0, 2**32 - 1)
+
+    def top(self, quantidade=10, inicio=0):
+        """[(user_id, nivel, xp)] das posições inicio..inicio+quantidade, como no Ranking."""
+        fim = min(inicio + quantidade, self.tamanho)
+        if inicio >= fim:
+            return []
+        chave = -self.pontuacao()
+        if fim < self.tamanho:
+            # Só as `fim` melhores linhas (mais os empates com a última) precisam ser ordenadas
+            limite = np.partition(chave, fim - 1)[fim - 1]
+            candidatas = np.flatnonzero(chave <= limite)
+        else:
+            candidatas = np.arange(self.tamanho)
+        ids = self.coluna("ids")
+        candidatas = candidatas[np.lexsort((ids[candidatas], chave[candidatas]))][inicio:fim]
+        return list(zip(
+            ids[candidatas].tolist(),
+            self.coluna("nivel")[candidatas].tolist(),
+            self.coluna("xp")[candidatas].tolist(),
+        ))
+
+    def posicao(self, user_id):
+        """Posição (1 = primeiro) do membro, ou None; desempate pelo menor id."""
+        linha = self.procurar(user_id)
+        if linha is None:
+            return None
+        pontuacao = self.pontuacao()
+        alvo = pontuacao[linha]
+        ids = self.coluna("ids")
+        return int(np.count_nonzero((pontuacao > alvo) | ((pontuacao == alvo) & (ids < ids[linha])))) + 1
+
+    def pares_ranking(self):
+        """{user_id: (nivel, xp)} para montar um `Ranking`."""
+        return dict(zip(
+            self.coluna("ids").tolist(),
+            zip(self.coluna("nivel").tolist(), self.coluna("xp").tolist())
+        ))
+
+    def vips(self):
+        """[(user_id, vip_expira ou None)] de todos os membros com VIP ligado."""
+        linhas = np.flatnonzero(self.coluna("vip"))
+        return [
+            (user_id, expira or None)
+            for user_id, expira in zip(
+                self.coluna("ids")[linhas].tolist(), self.coluna("vip_expira")[linhas].tolist()
+            )
+        ]
+
+    def desligar_vip(self, user_ids):
+        """Desliga o VIP de vários membros; retorna as linhas alteradas."""
+        linhas = self.procurar_varios(user_ids)
+        linhas = linhas[linhas >= 0]
+        self.coluna("vip")[linhas] = 0
+        self.coluna("vip_expira")[linhas] = 0
+        return linhas
+
+    # ==== Operações em massa ====
+
+    def selecionar(self, user_ids=None):
+        """Linhas dos membros informados que estão na tabela (todas, sem filtro)."""
+        if user_ids is None:
+            return np.arange(self.tamanho)
+        linhas = self.procurar_varios(list(user_ids))
+        return np.unique(linhas[linhas >= 0])
+
+    def blocos_de(self, linhas):
+        return np.unique(np.asarray(linhas) // TAMANHO_BLOCO).tolist()
+
+    def xp_total(self, linhas, config):
+        """XP acumulado desde o nível 1 de cada linha, pela progressão de `config`."""
+        nivel = self.coluna("nivel")[linhas].astype(np.int64)
+        vip = self.coluna("vip")[linhas].astype(bool)
+        maximo = int(nivel.max(initial=1))
+        base = np.where(vip, _limiares(config, maximo, True)[nivel], _limiares(config, maximo, False)[nivel])
+        return base + self.coluna("xp")[linhas]
+
+    def definir_xp_total(self, linhas, total, config):
+        """Recalcula nível e XP de cada linha a partir do XP acumulado."""
+        total = np.maximum(np.asarray(total, dtype=np.int64), 0)
+        vip = self.coluna("vip")[linhas].astype(bool)
+        nivel = np.ones(len(linhas), dtype=np.int64)
+        xp = total.copy()
+        for is_vip in (False, True):
+            grupo = vip == is_vip
+            if not grupo.any():
+                continue
+            limiares = _limiares_ate(config, is_vip, int(total[grupo].max()))
+            nivel[grupo] = np.searchsorted(limiares, total[grupo], side="right") - 1
+            xp[grupo] = total[grupo] - limiares[nivel[grupo]]
+        self.coluna("nivel")[linhas] = nivel
+        self.coluna("xp")[linhas] = xp
+
+    def resetar(self, linhas):
+        """Nova temporada: nível 1, sem XP e sem mensagens (o VIP é mantido)."""
+        self.coluna("xp")[linhas] = 0
+        self.coluna("nivel")[linhas] = 1
+        self.coluna("mensagens")[linhas] = 0
+
+    def decair(self, linhas, porcentagem, config):
+        """Remove `porcentagem`% do XP acumulado, podendo baixar o nível."""
+        total = self.xp_total(linhas, config)
+        self.definir_xp_total(linhas, np.floor(total * (1 - porcentagem / 100)).astype(np.int64), config)
+
+    def conceder(self, linhas, quantidade, config):
+        """Soma `quantidade` ao XP acumulado (negativo retira), subindo quantos níveis couber."""
+        self.definir_xp_total(linhas, self.xp_total(linhas, config) + quantidade, config)
+
+    def recalcular(self, linhas, config, config_antiga=None):
+        """Refaz os níveis com a progressão de `config`, mantendo o XP acumulado.
+
+        O acumulado é medido com `config_antiga` (a mesma, sem informar), o que
+        permite trocar o `xp_por_nivel` sem ninguém perder o XP já ganho.
+        """
+        total = self.xp_total(linhas, config_antiga or config)
+        self.definir_xp_total(linhas, total, config)
+
+    # ==== Conversão ====
+
+    @classmethod
+    def de_registros(cls, registros):
+        """Monta a tabela a partir de {user_id: dict no formato antigo}."""
+        tabela = cls(capacidade=max(16, len(registros)))
+        for user_id, dados in registros.items():
+            tabela.registro(user_id).update(**{campo: dados[campo] for campo in CAMPOS if campo in dados})
+        tabela._reorganizar()
+        return tabela
+
+    def serializar(self, inicio=0, fim=None):
+        """Linhas [inicio, fim) no formato binário."""
+        fim = self.tamanho if fim is None else min(fim, self.tamanho)
+        partes = [CABECALHO.pack(MAGICA, VERSAO, fim - inicio)]
+        partes.extend(self._colunas[nome][inicio:fim].tobytes() for nome, _ in COLUNAS)
+        return b"".join(partes)
+
+    def serializar_bloco(self, bloco):
+        return self.serializar(bloco * TAMANHO_BLOCO, (bloco + 1) * TAMANHO_BLOCO)
+
+    @property
+    def blocos(self):
+        return (self.tamanho + TAMANHO_BLOCO - 1) // TAMANHO_BLOCO
+
+    @classmethod
+    def desserializar(cls, blocos):
+        """Monta a tabela a partir de [(bloco, bytes)], como gravados por `serializar_bloco`.
+
+        Cada bloco volta para as linhas `bloco * TAMANHO_BLOCO` em diante. Um
+        bloco faltando ou incompleto no meio da tabela deslocaria as linhas
+        seguintes para outros membros, então a leitura falha em vez disso.
+        """
+        lidos = sorted((bloco, _ler(dados)) for bloco, dados in blocos)
+        for posicao, (bloco, (quantidade, _)) in enumerate(lidos):
+            if bloco != posicao:
+                raise ValueError(f"Bloco {posicao} de XP ausente (encontrado o bloco {bloco})")
+            if quantidade != TAMANHO_BLOCO and posicao < len(lidos) - 1:
+                raise ValueError(f"Bloco {bloco} de XP com {quantidade} linhas no meio da tabela")
+        total = sum(quantidade for _, (quantidade, _) in lidos)
+        tabela = cls(capacidade=max(16, total))
+        for bloco, (quantidade, colunas) in lidos:
+            inicio = bloco * TAMANHO_BLOCO
+            for nome, _ in COLUNAS:
+                tabela._colunas[nome][inicio:inicio + quantidade] = colunas[nome]
+        tabela.tamanho = total
+        tabela._reorganizar()
+        return tabela
+
+
+def _limiares(config, nivel_maximo, is_vip):
+    """XP acumulado para chegar a cada nível: `limiares[n]` é o total no início do nível n."""
+    completados = np.arange(1, max(nivel_maximo, 1), dtype=np.int64)
+    necessario = config.xp_por_nivel * completados
+    if is_vip:
+        # Mesmo arredondamento de ConfigXP.xp_necessario
+        necessario = (necessario / config.vip_bonus_nivel).astype(np.int64)
+    return np.concatenate(([0, 0], np.cumsum(necessario)))
+
+
+def _limiares_ate(config, is_vip, total):
+    """Limiares com níveis suficientes para cobrir o XP acumulado `total`."""
+    if config.xp_por_nivel <= 0:
+        raise ValueError("xp_por_nivel precisa ser positivo para recalcular níveis")
+    nivel_maximo = 16
+    limiares = _limiares(config, nivel_maximo, is_vip)
+    while limiares[-1] <= total:
+        nivel_maximo *= 2
+        limiares = _limiares(config, nivel_maximo, is_vip)
+    return limiares
+
+
+def _ler(dados):
+    magica, versao, quantidade = CABECALHO.unpack_from(dados)
+    if magica != MAGICA:
+        raise ValueError("Dados de XP em formato desconhecido")
+    if versao != VERSAO:
+        raise ValueError(f"Versão {versao} do formato de XP não suportada")
+
+    colunas = {}
+    posicao = CABECALHO.size
+    for nome, tipo in COLUNAS:
+        colunas[nome] = np.frombuffer(dados, dtype=tipo, count=quantidade, offset=posicao)
+        posicao += quantidade * tipo.itemsize
+    return quantidade, colunas
+
+
+# ==== Tabela de blocos no SQLite ====
+
+def criar_tabela(conexao):
+    conexao.execute(
+        "CREATE TABLE IF NOT EXISTS xp_blocos ("
+        " guild_id INTEGER NOT NULL,"
+        " bloco INTEGER NOT NULL,"
+        " dados BLOB NOT NULL,"
+        " PRIMARY KEY (guild_id, bloco)"
+        ") WITHOUT ROWID"
+    )
+
+
+def ler_blocos(conexao):
+    """{guild_id: [(bloco, bytes)]} com os blocos de cada guild, em ordem."""
+    criar_tabela(conexao)
+    guilds = {}
+    for guild_id, bloco, dados in conexao.execute(
+        "SELECT guild_id, bloco, dados FROM xp_blocos ORDER BY guild_id, bloco"
+    ):
+        guilds.setdefault(guild_id, []).append((bloco, dados))
+    return guilds
+
+
+def gravar_blocos(conexao, blocos):
+    """Grava [(guild_id, bloco, bytes)]; para uso dentro de `Armazenamento.executar`/`gravar`."""
+    conexao.executemany(
+        "INSERT INTO xp_blocos (guild_id, bloco, dados) VALUES (?, ?, ?) "
+        "ON CONFLICT (guild_id, bloco) DO UPDATE SET dados = excluded.dados",
+        blocos
+    )
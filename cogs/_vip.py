@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+from cogs._agendador import Agendador
+
+
+def para_epoch(valor, utc=False):
+    """Converte uma expiração gravada (epoch ou texto ISO antigo) para epoch inteiro.
+
+    Datas ISO sem fuso são interpretadas no horário local, ou em UTC com `utc=True`.
+    """
+    if valor is None or isinstance(valor, (int, float)):
+        return None if valor is None else int(valor)
+    data = datetime.fromisoformat(valor)
+    if data.tzinfo is None and utc:
+        data = data.replace(tzinfo=timezone.utc)
+    return int(data.timestamp())
+
+
+class IndiceVip:
+    """Índice de VIPs ativos com expiração em segundo plano.
+
+    Consultar se alguém é VIP é só uma busca em um set. As expirações (epoch
+    inteiro) ficam no heap de um `Agendador`, que acorda na hora certa e
+    expira de uma vez todos os VIPs vencidos: chama `ao_expirar(chaves)` para
+    o cog gravar a mudança e dispara o evento `vip_expirado(sistema, chaves)`
+    no bot, para que outros cogs possam reagir.
+
+    VIPs sem expiração (`expira=None`) são permanentes.
+    """
+
+    def __init__(self, nome, ao_expirar=None, bot=None):
+        self.nome = nome
+        self.bot = bot
+        self._ao_expirar = ao_expirar
+
+        self._ativos = set()
+        self._expira = {}  # chave: epoch, só dos VIPs temporários
+        self._agendador = Agendador(nome=f"vip {nome}")
+        self._agendador.registrar("vip", self._expirar)
+
+        self.expirados = 0
+
+    def __contains__(self, chave):
+        return chave in self._ativos
+
+    def __len__(self):
+        return len(self._ativos)
+
+    def __iter__(self):
+        return iter(self._ativos)
+
+    def expira(self, chave):
+        return self._expira.get(chave)
+
+    async def definir(self, chave, expira=None):
+        """Ativa (ou renova) o VIP de `chave` até o epoch `expira`."""
+        self._ativos.add(chave)
+        if expira is None:
+            self._expira.pop(chave, None)
+            await self._agendador.cancelar(chave)
+        else:
+            self._expira[chave] = int(expira)
+            # Expirações já vencidas são disparadas logo no próximo ciclo, em lote
+            await self._agendador.agendar(chave, int(expira), "vip")
+
+    async def remover(self, chave):
+        self._ativos.discard(chave)
+        self._expira.pop(chave, None)
+        await self._agendador.cancelar(chave)
+
+    def iniciar(self):
+        self._agendador.iniciar()
+
+    async def parar(self):
+        await self._agendador.parar()
+
+    async def _expirar(self, itens):
+        chaves = [chave for chave, _ in itens]
+        for chave in chaves:
+            self._ativos.discard(chave)
+            self._expira.pop(chave, None)
+        self.expirados += len(chaves)
+
+        if self._ao_expirar is not None:
+            await self._ao_expirar(chaves)
+        if self.bot is not None:
+            self.bot.dispatch("vip_expirado", self.nome, chaves)
+        print(f"⏰ {len(chaves)} VIP(s) expirado(s) em {self.nome}")
@@ -18,7 +18,8 @@ class Ajuda(commands.Cog):
             value=(
                 "`!saldo`, `!bal`, `!balance`, `!diario`, `!daily`, `!trabalhar`, `!work`, `!crime`, `!roubar @usuário`,\n"
                 "`!depositar <valor>`, `!sacar <valor>`, `!transferir @usuário <valor>`,\n"
-                "`!apostar <valor>`, `!bet <valor>`, `!loteria`, `!presentear @usuário <emoji> [qtd]`"
+                "`!apostar <valor>`, `!bet <valor>`, `!loteria [números]`, `!bilhetes`, `!resultadoloteria`, `!presentear @usuário <emoji> [qtd]`,\n"
+                "`!rank [página]`, `!baltop`, `!rankpos [@usuário]`"
             ),
             inline=False
         )
@@ -26,9 +27,9 @@ class Ajuda(commands.Cog):
         embed.add_field(
             name="🛒 Loja e Itens",
             value=(
-                "`!loja`, `!shop`, `!comprar <emoji>`, `!buy <emoji>`,\n"
-                "`!vender <emoji> [quantidade]`, `!sell <emoji> [quantidade]`,\n"
-                "`!inventario`, `!inv`, `!inventory`, `!abrir_bau`, `!missoes`, `!empregos`, `!emprego`"
+                "`!loja [página]`, `!shop`, `!comprar <emoji> [quantidade] ...`, `!buy`,\n"
+                "`!vender <emoji> [quantidade] ...`, `!sell`,\n"
+                "`!inventario [@usuário] [página]`, `!inv`, `!inventory`, `!abrir_bau`, `!missoes`, `!empregos`, `!emprego`"
             ),
             inline=False
         )
@@ -57,7 +58,7 @@ class Ajuda(commands.Cog):
                 "`!avisar @usuário [motivo]`, `!avisos [@usuário]`, `!limparavisos @usuário`\n"
                 "`!mute @usuário [tempo] [motivo]`, `!unmute @usuário`\n"
                 "`!kick @usuário [motivo]`, `!ban @usuário [motivo]`, `!unban <user_id>`\n"
-                "`!clear [quantidade]`, `!historico [@usuário] [limite]`, `!configmod`,\n"
+                "`!clear [quantidade]`, `!historico [@usuário] [limite] [cursor]`, `!historicomod @moderador`, `!historicoacao <ação>`, `!configmod`,\n"
                 "`!configmod canal_logs #canal`, `!configmod max_avisos 3`, `!configmod auto_punir true/false`"
             ),
             inline=False
@@ -102,7 +103,8 @@ class Ajuda(commands.Cog):
             value=(
                 "`!xp`, `!topxp`\n"
                 "`!setmensagensporxp <valor>`, `!setxpbase <valor>`, `!setxppornivel <valor>`\n"
-                "`!setxpcooldown <segundos>`, `!verxpconfig`, `!setvipxp <valor>`, `!setvipcooldown <valor>`"
+                "`!setxpcooldown <segundos>`, `!verxpconfig`, `!setvipxp <valor>`, `!setvipcooldown <valor>`\n"
+                "`!xpreset [cargo]`, `!xpdecair <%> [cargo]`, `!xpdar <xp> [cargo]`, `!xprecalcular [xp_por_nivel_antigo] [cargo]`"
             ),
             inline=False
         )
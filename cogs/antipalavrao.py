@@ -1,60 +1,74 @@
 import discord
 from discord.ext import commands, tasks
-import json
-import os
 from datetime import datetime, timedelta
 
+from cogs._aho_corasick import AutomatoPalavras
+from cogs._armazenamento import obter_armazenamento
+from cogs._metricas import medir_listener
+
+CONFIG_PADRAO = {
+    "blocked_words": [],
+    "max_warnings": 3,
+    "warning_decay_hours": 24
+}
+
 class AntiPalavrao(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config_path = "antipalavrao_config.json"
-        self.warnings_path = "antipalavrao_warnings.json"
+        self.armazenamento = obter_armazenamento()
 
-        self.config = self.carregar_config()
-        self.user_warnings = self.carregar_warnings()
-        self.limpar_warnings_antigos.start()
+        self.config = dict(CONFIG_PADRAO, blocked_words=[])
+        self.user_warnings = {}
+        self.automato = AutomatoPalavras([])
 
-    def carregar_config(self):
-        if not os.path.exists(self.config_path):
-            config_inicial = {
-                "blocked_words": [],
-                "max_warnings": 3,
-                "warning_decay_hours": 24
-            }
-            self.salvar_config(config_inicial)
-            return config_inicial
-        with open(self.config_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def salvar_config(self, config=None):
-        if config is None:
-            config = self.config
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+    async def cog_load(self):
+        self.config = await self.carregar_config()
+        self.reconstruir_automato()
+        self.user_warnings = await self.carregar_warnings()
+        self.limpar_warnings_antigos.start()
 
-    def carregar_warnings(self):
-        if not os.path.exists(self.warnings_path):
-            return {}
-        with open(self.warnings_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    def cog_unload(self):
+        self.limpar_warnings_antigos.cancel()
 
-    def salvar_warnings(self):
-        with open(self.warnings_path, "w", encoding="utf-8") as f:
-            json.dump(self.user_warnings, f, indent=2, ensure_ascii=False)
+    async def carregar_config(self):
+        config = await self.armazenamento.obter("config", "antipalavrao")
+        if config is None:
+            config = dict(CONFIG_PADRAO, blocked_words=[])
+            await self.salvar_config(config)
+        return config
 
-    def salvar_tudo(self):
-        self.salvar_config()
-        self.salvar_warnings()
+    async def salvar_config(self, config=None):
+        if config is None:
+            config = self.config
+        await self.armazenamento.salvar("config", {"antipalavrao": config})
+
+    async def carregar_warnings(self):
+        warnings = {}
+        for chave, registro in (await self.armazenamento.carregar("antipalavrao_avisos")).items():
+            guild_id, user_id = chave.split(":", 1)
+            warnings.setdefault(guild_id, {})[user_id] = registro
+        return warnings
+
+    async def salvar_warnings(self, *chaves):
+        """Grava os avisos dos pares (guild_id, user_id) informados"""
+        await self.armazenamento.gravar([
+            ("antipalavrao_avisos", f"{guild_id}:{user_id}", self.user_warnings.get(guild_id, {}).get(user_id))
+            for guild_id, user_id in chaves
+        ])
+
+    def reconstruir_automato(self):
+        """Recompila a lista de bloqueio; chamado só quando a lista muda"""
+        self.automato = AutomatoPalavras(self.config.get("blocked_words", []))
 
     def contem_palavrao(self, texto):
-        texto = texto.lower()
-        return any(palavra in texto for palavra in self.config.get("blocked_words", []))
+        """Retorna (palavra, posição) da primeira palavra bloqueada encontrada, ou None"""
+        return self.automato.buscar(texto.lower())
 
     @tasks.loop(hours=1)
     async def limpar_warnings_antigos(self):
         agora = datetime.utcnow()
         expiracao = timedelta(hours=self.config.get("warning_decay_hours", 24))
-        atualizados = False
+        removidos = []
 
         for guild_id in list(self.user_warnings.keys()):
             for user_id in list(self.user_warnings[guild_id].keys()):
@@ -62,21 +76,24 @@ class AntiPalavrao(commands.Cog):
                     timestamp = datetime.fromisoformat(self.user_warnings[guild_id][user_id]["timestamp"])
                     if agora - timestamp > expiracao:
                         del self.user_warnings[guild_id][user_id]
-                        atualizados = True
+                        removidos.append((guild_id, user_id))
                 except Exception:
                     continue
 
-        if atualizados:
-            self.salvar_warnings()
+        if removidos:
+            await self.salvar_warnings(*removidos)
 
     @commands.Cog.listener()
+    @medir_listener
     async def on_message(self, message):
         if message.author.bot or not message.guild:
             return
         if message.author.guild_permissions.administrator:
             return
 
-        if self.contem_palavrao(message.content):
+        encontrado = self.contem_palavrao(message.content)
+        if encontrado:
+            termo, _ = encontrado
             await message.delete()
             guild_id = str(message.guild.id)
             user_id = str(message.author.id)
@@ -88,7 +105,7 @@ class AntiPalavrao(commands.Cog):
             warnings_data["count"] += 1
             warnings_data["timestamp"] = datetime.utcnow().isoformat()
             self.user_warnings[guild_id][user_id] = warnings_data
-            self.salvar_warnings()
+            await self.salvar_warnings((guild_id, user_id))
 
             embed = discord.Embed(
                 title="🚫 Linguagem Inadequada",
@@ -101,7 +118,7 @@ class AntiPalavrao(commands.Cog):
             if warnings_data["count"] >= self.config.get("max_warnings", 3):
                 timeout_duration = timedelta(minutes=10)
                 try:
-                    await message.author.timeout(timeout_duration, reason="Excesso de palavrões")
+                    await message.author.timeout(timeout_duration, reason=f"Excesso de palavrões (último: {termo})")
                     await message.channel.send(f"🔇 {message.author.mention} foi silenciado por 10 minutos por excesso de avisos.")
                 except Exception:
                     pass
@@ -112,12 +129,14 @@ class AntiPalavrao(commands.Cog):
         guild_id = str(ctx.guild.id)
         if acao == "add" and parametro:
             self.config["blocked_words"].append(parametro.lower())
-            self.salvar_config()
+            self.reconstruir_automato()
+            await self.salvar_config()
             await ctx.send(f"✅ Palavra `{parametro}` adicionada à lista de bloqueio.")
         elif acao == "remove" and parametro:
             if parametro.lower() in self.config["blocked_words"]:
                 self.config["blocked_words"].remove(parametro.lower())
-                self.salvar_config()
+                self.reconstruir_automato()
+                await self.salvar_config()
                 await ctx.send(f"✅ Palavra `{parametro}` removida da lista de bloqueio.")
             else:
                 await ctx.send("❌ Palavra não encontrada na lista.")
@@ -137,14 +156,14 @@ class AntiPalavrao(commands.Cog):
                 await ctx.send("❌ Mencione um usuário.")
                 return
             self.user_warnings.get(str(ctx.guild.id), {}).pop(str(membro.id), None)
-            self.salvar_warnings()
+            await self.salvar_warnings((str(ctx.guild.id), str(membro.id)))
             await ctx.send(f"♻️ Avisos de {membro.mention} foram resetados.")
         else:
             await ctx.send("❌ Uso inválido. Exemplo: `!modconfig add palavrão` ou `!modconfig list`")
 
     @commands.Cog.listener()
     async def on_ready(self):
-        print(f"✅ Sistema de Anti-Palavrões carregado! Arquivos: {self.config_path}, {self.warnings_path}")
+        print("✅ Sistema de Anti-Palavrões carregado!")
 
 async def setup(bot):
     await bot.add_cog(AntiPalavrao(bot))
@@ -1,14 +1,25 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
-import json
-import random
-from datetime import datetime, timedelta
+import copy
 import os
+import random
+import time
+import typing
+from datetime import datetime
 
-# Dados do sistema (em produção use banco de dados)
+from cogs._agendador import Agendador
+from cogs._armazenamento import aplicar_alteracoes, obter_armazenamento
+from cogs._catalog import Catalog, parse_order
+from cogs._ledger import ACCOUNTS, Ledger
+from cogs._lottery import NUMBERS, PICKS, RoundGate, TicketPool, create_tables as create_lottery_tables, from_mask, to_mask
+from cogs._metricas import tamanho_cache, remover_cache
+from cogs._profiles import convert_json_profiles, new_profile, read_guild_profiles, write_guild_profiles
+from cogs._shards import Shard, ShardCache, legacy_pending, partition_legacy
+from cogs._vip import IndiceVip, para_epoch
+
+# Dados do sistema, carregados do banco em load_data()
 data = {
-    'users': {},
     'shop': {
         'items': {
             '🎮': {'name': 'Game Premium', 'price': 1000, 'description': 'Jogo premium exclusivo'},
@@ -18,44 +29,304 @@ data = {
             '🎁': {'name': 'Caixa Misteriosa', 'price': 150, 'description': 'Pode conter qualquer coisa!'}
         }
     },
-    'vip': {}
+    'vip': {},
+    'lottery': {'round': 1, 'next_draw': None, 'last': None}
 }
 
-def save_data():
-    with open('economy_data.json', 'w') as f:
-        json.dump(data, f, indent=2, default=str)
-
-def load_data():
-    global data
-    if os.path.exists('economy_data.json'):
-        with open('economy_data.json', 'r') as f:
-            data = json.load(f)
-
-def get_user_data(user_id):
-    if str(user_id) not in data['users']:
-        data['users'][str(user_id)] = {
-            'money': 100,
-            'bank': 0,
-            'inventory': {},
-            'daily_claimed': None,
-            'work_cooldown': None,
-            'level': 1,
-            'xp': 0
-        }
-    return data['users'][str(user_id)]
+SNAPSHOT_MINUTES = 5
+
+# Regras dos comandos (benchmarks/sim_economia.py simula a economia com estes mesmos valores)
+DAILY_HOURS = 24
+DAILY_REWARD = 100
+DAILY_VIP_BONUS = 50
+WORK_HOURS = 1
+WORK_PAY = (50, 150)
+WORK_VIP_BONUS = 0.5           # Fração do pagamento base
+BET_WIN_CHANCE = 0.45
+BET_WIN_CHANCE_VIP = 0.55
+BET_PAYOUT = (1.5, 2.5)        # Multiplicador sobre o valor apostado quando ganha
+ROB_HOURS = 2
+ROB_MIN_TARGET_BALANCE = 50    # Alvos com menos que isso não podem ser roubados
+ROB_CHANCE = 0.35
+ROB_VIP_BONUS = 0.15           # Ladrão VIP tem mais chance
+ROB_TARGET_VIP_PENALTY = 0.10  # Alvo VIP é mais difícil de roubar
+ROB_STEAL_MIN = 25
+ROB_STEAL_MAX = 500            # Além do limite de 1/3 do saldo do alvo
+ROB_FINE = (50, 150)
+SHOP_SELL_RATE = 0.7           # Fração do preço devolvida ao vender um item
+INVENTORY_PAGE_SIZE = 15
+
+# Loteria: bilhetes acumulam na rodada e são sorteados juntos a cada LOTTERY_HOURS
+LOTTERY_HOURS = float(os.getenv("LOTERIA_INTERVALO_HORAS", 24))
+LOTTERY_CHANNEL = int(os.getenv("LOTERIA_CANAL", 0))  # Canal para anunciar os resultados (opcional)
+LOTTERY_TICKET_PRICE = 100
+LOTTERY_PRIZES = {
+    6: 10000,  # Sena
+    5: 2000,   # Quina
+    4: 500,    # Quadra
+    3: 100,    # Terno
+}
+LOTTERY_VIP_BONUS = 0.25
+
+# Economia por servidor: cada shard é carregado no primeiro uso e descartado quando fica ocioso
+SHARD_MAX = int(os.getenv("ECONOMIA_MAX_SERVIDORES", 0))  # Shards em memória (0 = sem limite)
+SHARD_IDLE_MINUTES = float(os.getenv("ECONOMIA_OCIOSO_MINUTOS", 30))
+PARTITION_RETRY_MAX = 300  # Maior espera (segundos) entre tentativas de dividir a economia global
+
+armazenamento = obter_armazenamento()
+ledger = Ledger(armazenamento)
+
+# Liberado quando a economia global antiga já foi dividida entre os servidores
+partitioned = asyncio.Event()
+
+# Itens da loja, com as páginas da !loja montadas até o catálogo mudar
+catalog = Catalog(data['shop']['items'])
+
+# Bilhetes da rodada atual por servidor; o sorteio espera as compras em andamento
+lottery_pools = {}  # guild_id: TicketPool
+lottery_gate = RoundGate()
+
+async def save_data(shard=None, users=(), vip=(), shop=False, lottery=False, extra=None):
+    """Grava as movimentações pendentes e os registros alterados em uma transação"""
+    # Perfis são codificados aqui no loop, antes de irem para a thread do banco
+    profiles = [(str(u), shard.profiles.pack(str(u))) for u in users]
+    changes = [('economia_vip', str(u), data['vip'].get(str(u))) for u in vip]
+    if shop:
+        changes.append(('config', 'economia_loja', data['shop']))
+    if lottery:
+        changes.append(('economia_loteria', 'estado', data['lottery']))
+
+    def _write(conexao):
+        if profiles:
+            write_guild_profiles(conexao, shard.guild_id, profiles)
+        if extra is not None:
+            extra(conexao)
+
+    await ledger.commit(changes, _write if profiles or extra is not None else None)
+
+async def load_data():
+    """Carrega o que é global (VIPs, loja e loteria); os servidores carregam sob demanda"""
+    await ledger.setup()
+    converted_profiles = await armazenamento.executar(convert_json_profiles)
+    if converted_profiles:
+        print(f"💾 Economia: {converted_profiles} perfis convertidos de JSON para o formato binário")
+    if not await armazenamento.executar(legacy_pending):
+        partitioned.set()
+
+    data['vip'] = await armazenamento.carregar('economia_vip')
+    converted = []
+    for uid, vip_data in data['vip'].items():
+        if isinstance(vip_data['expires'], str):
+            # Formato antigo: texto ISO no horário local
+            vip_data['expires'] = para_epoch(vip_data['expires'])
+            converted.append(uid)
+        await vips.definir(uid, vip_data['expires'])
+    data['shop'] = await armazenamento.obter('config', 'economia_loja', data['shop'])
+    catalog.load(data['shop']['items'])
+    data['lottery'] = await armazenamento.obter('economia_loteria', 'estado', data['lottery'])
+    await _load_lottery_tickets()
+
+    if converted:
+        await save_data(vip=converted)
+
+async def _load_lottery_tickets():
+    round_id = data['lottery']['round']
+
+    def _read(conexao):
+        create_lottery_tables(conexao)
+        return conexao.execute(
+            "SELECT guild_id, user_id, mask FROM economia_loteria_bilhetes WHERE round = ? AND guild_id != 0",
+            (round_id,)
+        ).fetchall()
+
+    by_guild = {}
+    for guild_id, user_id, mask in await armazenamento.executar(_read):
+        users, masks = by_guild.setdefault(guild_id, ([], []))
+        users.append(user_id)
+        masks.append(mask)
+    lottery_pools.clear()
+    for guild_id, (users, masks) in by_guild.items():
+        lottery_pools[guild_id] = pool = TicketPool(len(users))
+        pool.extend(users, masks)
+
+async def _load_shard(guild_id):
+    # Quem chega antes da divisão da economia global espera por ela
+    await partitioned.wait()
+    balances = await ledger.load_balances(prefix=f"{guild_id}:")
+    packed = await armazenamento.executar(read_guild_profiles, guild_id)
+    return Shard(guild_id, packed, {key.partition(':')[2]: balance for key, balance in balances.items()})
+
+shards = ShardCache(_load_shard, max_shards=SHARD_MAX, idle_seconds=SHARD_IDLE_MINUTES * 60)
+
+def get_user_data(shard, user_id):
+    if str(user_id) not in shard.profiles:
+        shard.profiles[str(user_id)] = new_profile()
+        change_balance(shard, user_id, 100, 'abertura')
+    return shard.profiles[str(user_id)]
+
+def change_balance(shard, user_id, delta, reason, account='money'):
+    """Altera o saldo e registra a movimentação no ledger"""
+    user_data = get_user_data(shard, user_id)
+    user_data[account] += delta
+    ledger.add(shard.key(user_id), account, delta, reason)
+    shard.wealth.atualizar(int(user_id), user_data['money'] + user_data['bank'])
+
+class InsufficientFunds(Exception):
+    pass
+
+class _UserLocks:
+    """Uma trava por conta ("guild:usuário"), criada sob demanda e descartada quando ninguém mais a usa"""
+
+    def __init__(self):
+        self._locks = {}  # chave: [trava, quantos estão usando ou esperando]
+
+    async def acquire(self, user_ids):
+        # Sempre em ordem crescente de id: duas transações com os mesmos usuários nunca se cruzam
+        acquired = []
+        try:
+            for uid in user_ids:
+                entry = self._locks.setdefault(uid, [asyncio.Lock(), 0])
+                entry[1] += 1
+                try:
+                    await entry[0].acquire()
+                except BaseException:
+                    self._forget(uid)
+                    raise
+                acquired.append(uid)
+        except BaseException:
+            self.release(acquired)
+            raise
+
+    def release(self, user_ids):
+        for uid in reversed(user_ids):
+            self._locks[uid][0].release()
+            self._forget(uid)
+
+    def _forget(self, uid):
+        entry = self._locks[uid]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[uid]
+
+    def __len__(self):
+        return len(self._locks)
+
+user_locks = _UserLocks()
+
+class Transaction:
+    """Transação sobre as contas de um ou mais usuários de um servidor.
+
+    Ao entrar, carrega o shard do servidor se preciso e trava os usuários em
+    ordem de id, então comandos de usuários diferentes rodam em paralelo e
+    só os que envolvem o mesmo usuário esperam um pelo outro. As movimentações ficam acumuladas; ao sair do
+    bloco sem erro, são aplicadas e gravadas (ledger e perfis) em uma única
+    transação do banco. Se o bloco levantar uma exceção, nenhuma movimentação
+    é aplicada e os perfis voltam a como estavam.
+
+        async with Transaction(guild_id, ladrao, vitima) as tx:
+            if tx.balance(vitima) >= 50:
+                tx.change(vitima, -100, 'roubado')
+                tx.change(ladrao, 100, 'roubar')
+    """
+
+    def __init__(self, guild_id, *user_ids):
+        self.guild_id = guild_id
+        self.shard = None
+        self.user_ids = sorted({str(u) for u in user_ids}, key=int)
+        self._changes = []  # (user_id, account, delta, reason)
+        self._extra = []  # Funções (conexao) que rodam na mesma transação do banco
+        self._pending = {}  # (user_id, account): soma dos deltas ainda não aplicados
+        self._before = {}
+
+    async def __aenter__(self):
+        self.shard = await shards.get(self.guild_id)
+        # Um shard em uso não é descartado, nem enquanto a transação espera as travas
+        self.shard.in_use += 1
+        try:
+            await user_locks.acquire(self._lock_keys())
+        except BaseException:
+            self.shard.in_use -= 1
+            raise
+        for uid in self.user_ids:
+            self._before[uid] = copy.deepcopy(get_user_data(self.shard, uid))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self._commit()
+            else:
+                self._rollback()
+        finally:
+            user_locks.release(self._lock_keys())
+            self.shard.in_use -= 1
+
+    def _lock_keys(self):
+        return [self.shard.key(uid) for uid in self.user_ids]
+
+    def user(self, user_id):
+        """Perfil do usuário (inventário, cooldowns...); alterações nele entram na transação"""
+        uid = str(user_id)
+        if uid not in self._before:
+            raise KeyError(f"Usuário {uid} não faz parte da transação")
+        return self.shard.profiles[uid]
+
+    def balance(self, user_id, account='money'):
+        """Saldo já contando as movimentações desta transação"""
+        return self.user(user_id)[account] + self._pending.get((str(user_id), account), 0)
+
+    def change(self, user_id, delta, reason, account='money'):
+        self.user(user_id)
+        key = (str(user_id), account)
+        self._changes.append((key[0], account, delta, reason))
+        self._pending[key] = self._pending.get(key, 0) + delta
+
+    def execute(self, function):
+        """Roda `function(conexao)` na mesma transação do banco em que o commit for gravado"""
+        self._extra.append(function)
+
+    def transfer(self, source, target, amount, reason, source_account='money', target_account='money'):
+        """Move `amount` entre contas (do mesmo usuário ou de usuários diferentes)"""
+        if self.balance(source, source_account) < amount:
+            raise InsufficientFunds(f"Saldo insuficiente em {source}/{source_account}")
+        self.change(source, -amount, reason, source_account)
+        self.change(target, amount, reason, target_account)
+
+    async def _commit(self):
+        changed = [uid for uid in self.user_ids if self.shard.profiles[uid] != self._before[uid]]
+        if not self._changes and not changed and not self._extra:
+            return
+        for uid, account, delta, reason in self._changes:
+            change_balance(self.shard, uid, delta, reason, account)
+
+        extra = self._extra
+
+        def _run_extra(conexao):
+            for function in extra:
+                function(conexao)
+
+        await save_data(self.shard, users=self.user_ids, extra=_run_extra if extra else None)
+
+    def _rollback(self):
+        # Saldos só mudam no commit; o resto do perfil volta ao estado da entrada
+        for uid, before in self._before.items():
+            before.update({account: self.shard.profiles[uid][account] for account in ACCOUNTS})
+            self.shard.profiles[uid] = before
+
+async def _vips_expired(user_ids):
+    # Chamado pelo índice de VIPs quando as expirações vencem, todas de uma vez
+    for uid in user_ids:
+        data['vip'].pop(uid, None)
+    await save_data(vip=user_ids)
+
+# VIPs ativos; as expirações rodam em segundo plano, fora dos comandos
+vips = IndiceVip('economia', ao_expirar=_vips_expired)
 
 def is_vip(user_id):
-    vip_data = data['vip'].get(str(user_id))
-    if not vip_data:
-        return False
-    if datetime.fromisoformat(vip_data['expires']) > datetime.now():
-        return True
-    else:
-        del data['vip'][str(user_id)]
-        return False
+    return str(user_id) in vips
 
-async def add_xp(user_id, amount):
-    user_data = get_user_data(user_id)
+async def add_xp(shard, user_id, amount):
+    user_data = get_user_data(shard, user_id)
     user_data['xp'] += amount
     level_up_xp = user_data['level'] * 100
     if user_data['xp'] >= level_up_xp:
@@ -67,11 +338,207 @@ async def add_xp(user_id, amount):
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        load_data()
+        vips.bot = bot
+        self._partition = None
+        self.partition_error = None  # Último erro da divisão da economia global, enquanto ela não sai
+
+        # O horário do próximo sorteio fica no estado da loteria, então o agendador não precisa persistir nada
+        self.lottery_scheduler = Agendador(esperar=self.bot.wait_until_ready, nome="sorteio da loteria")
+        self.lottery_scheduler.registrar("loteria", self.draw_lottery)
+
+    async def cog_load(self):
+        await load_data()
+        if not partitioned.is_set():
+            self._partition = asyncio.create_task(self._partition_legacy())
+        self.compact_ledger.start()
+        vips.iniciar()
+        if not data['lottery']['next_draw']:
+            data['lottery']['next_draw'] = time.time() + LOTTERY_HOURS * 3600
+            await save_data(lottery=True)
+        await self.lottery_scheduler.agendar("sorteio", data['lottery']['next_draw'], "loteria")
+        self.lottery_scheduler.iniciar()
+        tamanho_cache("economia_servidores", lambda: len(shards))
+        tamanho_cache("economia_usuarios", lambda: sum(len(shard.profiles) for shard in shards))
+        tamanho_cache("economia_vip", lambda: len(data['vip']))
+        tamanho_cache("economia_ranking", lambda: sum(len(shard.wealth) for shard in shards))
+
+    async def cog_unload(self):
+        remover_cache("economia_servidores")
+        remover_cache("economia_usuarios")
+        remover_cache("economia_vip")
+        remover_cache("economia_ranking")
+        if self._partition is not None:
+            self._partition.cancel()
+        self.compact_ledger.cancel()
+        await self.lottery_scheduler.parar()
+        await vips.parar()
+        await ledger.snapshot(shards.accounts)
+
+    async def cog_check(self, ctx):
+        # Cada servidor tem a sua economia, então nada funciona na DM
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        if self.partition_error is not None and not partitioned.is_set():
+            # Sem isso o comando ficaria esperando a divisão, que ainda está sendo tentada de novo
+            await ctx.send("❌ A economia está indisponível no momento. Tente novamente em alguns minutos.")
+            return False
+        return True
+
+    async def _partition_legacy(self):
+        """Divide a economia global de antes dos shards: cada conta vai para um servidor do membro."""
+        await self.bot.wait_until_ready()
+        attempt = 0
+        while True:
+            try:
+                balances = {uid: balance for uid, balance in (await ledger.load_balances()).items() if ':' not in uid}
+                members = {
+                    guild.id: [str(member.id) for member in guild.members if not member.bot]
+                    for guild in self.bot.guilds
+                }
+                moved = await armazenamento.executar(partition_legacy, members, balances, data['lottery']['round'])
+                await _load_lottery_tickets()
+                break
+            except Exception as e:
+                # Enquanto isso os comandos respondem com erro e o sorteio continua esperando
+                self.partition_error = e
+                delay = min(PARTITION_RETRY_MAX, 5 * 2 ** attempt)
+                attempt += 1
+                print(f"❌ Erro ao separar a economia global por servidor: {e} (nova tentativa em {delay}s)")
+                await asyncio.sleep(delay)
+        self.partition_error = None
+        partitioned.set()
+        print(f"💾 Economia: {moved} perfis divididos entre {len(members)} servidores")
+
+    @tasks.loop(minutes=SNAPSHOT_MINUTES)
+    async def compact_ledger(self):
+        # Consolida o ledger em um snapshot para que a recuperação leia só o final
+        started = time.monotonic()
+        try:
+            await ledger.snapshot(shards.accounts)
+        except Exception as e:
+            print(f"❌ Erro ao consolidar o ledger da economia: {e}")
+            return
+        # Tudo o que os shards sem uso desde o início do snapshot alteraram já está no banco
+        shards.evict(started)
+
+    async def draw_lottery(self, _items):
+        """Sorteia a rodada atual: os bilhetes de todos os servidores são conferidos e pagos de uma vez."""
+        await partitioned.wait()
+        await lottery_gate.close()
+        try:
+            result = await self._draw_round()
+        except Exception as e:
+            # Os servidores ainda não pagos continuam com os bilhetes; tenta de novo em alguns minutos
+            print(f"❌ Erro no sorteio da loteria: {e}")
+            data['lottery']['next_draw'] = time.time() + 300
+            result = None
+        finally:
+            lottery_gate.reopen()
+        await self.lottery_scheduler.agendar("sorteio", data['lottery']['next_draw'], "loteria")
+
+        if result and LOTTERY_CHANNEL:
+            channel = self.bot.get_channel(LOTTERY_CHANNEL)
+            if channel is not None:
+                try:
+                    await channel.send(embed=self._lottery_embed(result))
+                except discord.HTTPException as e:
+                    print(f"❌ Erro ao anunciar o resultado da loteria: {e}")
+
+    async def _draw_round(self):
+        state = data['lottery']
+        round_id = state['round']
+        if not state.get('drawing'):
+            # Os números são gravados antes de pagar: se o sorteio falhar no meio,
+            # a nova tentativa paga os servidores que faltam com o mesmo resultado
+            state['drawing'] = {
+                'numbers': sorted(random.sample(range(1, NUMBERS + 1), PICKS)),
+                'drawn_at': time.time(),
+                'guilds': {},
+            }
+            await save_data(lottery=True)
+        winning_mask = to_mask(state['drawing']['numbers'])
+
+        for guild_id, pool in list(lottery_pools.items()):
+            await self._pay_guild(guild_id, pool, winning_mask)
+            del lottery_pools[guild_id]
+
+        drawing = data['lottery']['drawing']
+        guilds = drawing['guilds']
+        tiers = {}
+        for summary in guilds.values():
+            for hits, count in summary['tiers'].items():
+                tiers[hits] = tiers.get(hits, 0) + count
+        result = {
+            'round': round_id,
+            'numbers': drawing['numbers'],
+            'drawn_at': drawing['drawn_at'],
+            'tickets': sum(summary['tickets'] for summary in guilds.values()),
+            'tiers': tiers,
+            'paid': sum(summary['paid'] for summary in guilds.values()),
+            'top': sorted((entry for summary in guilds.values() for entry in summary['top']),
+                          key=lambda item: -item[1])[:10],
+            'guilds': guilds,
+        }
+        previous = data['lottery']
+        data['lottery'] = {
+            'round': round_id + 1,
+            'next_draw': max(previous['next_draw'] or drawing['drawn_at'], drawing['drawn_at']) + LOTTERY_HOURS * 3600,
+            'last': result,
+        }
+        try:
+            await save_data(lottery=True)
+        except Exception:
+            data['lottery'] = previous
+            raise
+
+        print(f"🎲 Loteria: rodada #{round_id} sorteada ({result['tickets']} bilhetes em {len(guilds)} servidores, "
+              f"${result['paid']} pagos)")
+        return result
+
+    async def _pay_guild(self, guild_id, pool, winning_mask):
+        """Paga os ganhadores de um servidor e fecha a rodada dele em uma transação do banco."""
+        round_id = data['lottery']['round']
+        users, totals, best, tiers = pool.payouts(winning_mask, LOTTERY_PRIZES)
+        paid = []
+
+        def _close(conexao):
+            aplicar_alteracoes(conexao, [('economia_loteria', 'estado', state)])
+            conexao.execute(
+                "DELETE FROM economia_loteria_bilhetes WHERE round = ? AND guild_id = ?", (round_id, guild_id)
+            )
+
+        def _state():
+            paid.sort(key=lambda item: -item[1])
+            summary = {
+                'tickets': len(pool),
+                'tiers': {str(hits): count for hits, count in tiers.items()},
+                'paid': sum(prize for _, prize in paid),
+                'top': paid[:10],
+            }
+            drawing = data['lottery']['drawing']
+            return dict(data['lottery'], drawing=dict(drawing, guilds=dict(drawing['guilds'], **{str(guild_id): summary})))
+
+        if users:
+            async with Transaction(guild_id, *users) as tx:
+                for uid, prize, hits in zip(users, totals, best):
+                    # Bônus VIP
+                    if is_vip(uid):
+                        prize += int(prize * LOTTERY_VIP_BONUS)
+                    tx.change(uid, prize, 'loteria_premio')
+                    # XP por ganhar na loteria
+                    await add_xp(tx.shard, uid, hits * 5)
+                    paid.append((str(uid), prize))
+                state = _state()
+                tx.execute(_close)
+        else:
+            # Ninguém ganhou: não precisa nem carregar o shard
+            state = _state()
+            await save_data(extra=_close)
+        data['lottery'] = state
 
     @commands.Cog.listener()
     async def on_ready(self):
-        print(f'Sistema de Economia carregado!')
+        print('Sistema de Economia carregado!')
 
     # COMANDOS DE ECONOMIA
 
@@ -79,7 +546,8 @@ class Economy(commands.Cog):
     async def balance(self, ctx, member: discord.Member = None):
         if member is None:
             member = ctx.author
-        user_data = get_user_data(member.id)
+        shard = await shards.get(ctx.guild.id)
+        user_data = get_user_data(shard, member.id)
         vip_status = "👑 VIP" if is_vip(member.id) else "Comum"
         
         embed = discord.Embed(title=f"💰 Saldo de {member.display_name}", color=0x00ff00)
@@ -90,71 +558,111 @@ class Economy(commands.Cog):
         embed.add_field(name="Status", value=vip_status, inline=True)
         await ctx.send(embed=embed)
 
+    @commands.command(name='rank', aliases=['baltop', 'ricos'])
+    async def rank(self, ctx, page: int = 1):
+        wealth = (await shards.get(ctx.guild.id)).wealth
+        if not len(wealth):
+            await ctx.send("📭 Ninguém tem dinheiro ainda!")
+            return
+
+        total_pages = max(1, (len(wealth) + 9) // 10)
+        page = min(max(page, 1), total_pages)
+
+        embed = discord.Embed(title="💰 Mais Ricos", color=0xffd700)
+        lines = []
+        for position, (user_id, total) in enumerate(wealth.pagina(page, 10), start=(page - 1) * 10 + 1):
+            user = self.bot.get_user(user_id)
+            name = user.display_name if user else f"<Usuário {user_id}>"
+            medal = "👑" if position == 1 else "🥈" if position == 2 else "🥉" if position == 3 else "▫️"
+            vip = " 👑" if is_vip(user_id) else ""
+            lines.append(f"{medal} **{position}º** {name}{vip} — ${total}")
+        embed.description = "\n".join(lines)
+
+        footer = f"Página {page}/{total_pages}"
+        position = wealth.posicao(ctx.author.id)
+        if position:
+            footer += f" • Sua posição: {position}º de {len(wealth)}"
+        embed.set_footer(text=footer)
+        await ctx.send(embed=embed)
+
+    @commands.command(name='rankpos', aliases=['posicao'])
+    async def rank_position(self, ctx, member: discord.Member = None):
+        if member is None:
+            member = ctx.author
+
+        shard = await shards.get(ctx.guild.id)
+        position = shard.wealth.posicao(member.id)
+        if position is None:
+            await ctx.send(f"📭 {member.display_name} ainda não está no ranking!")
+            return
+
+        user_data = get_user_data(shard, member.id)
+        await ctx.send(
+            f"💰 {member.display_name} está em **{position}º** de {len(shard.wealth)} "
+            f"(${user_data['money'] + user_data['bank']})"
+        )
+
     @commands.command(name='daily', aliases=['diario'])
     async def daily(self, ctx):
-        user_data = get_user_data(ctx.author.id)
-        now = datetime.now()
-        
-        if user_data['daily_claimed']:
-            last_claim = datetime.fromisoformat(user_data['daily_claimed'])
-            if now - last_claim < timedelta(hours=24):
-                remaining = timedelta(hours=24) - (now - last_claim)
-                hours, remainder = divmod(remaining.seconds, 3600)
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            user_data = tx.user(ctx.author.id)
+            now = int(time.time())
+
+            if user_data['daily_claimed'] and now - user_data['daily_claimed'] < DAILY_HOURS * 3600:
+                remaining = DAILY_HOURS * 3600 - (now - user_data['daily_claimed'])
+                hours, remainder = divmod(remaining, 3600)
                 minutes, _ = divmod(remainder, 60)
                 await ctx.send(f"⏰ Você já coletou hoje! Volte em {hours}h {minutes}m")
                 return
-        
-        base_reward = 100
-        vip_bonus = 50 if is_vip(ctx.author.id) else 0
-        total_reward = base_reward + vip_bonus
-        
-        user_data['money'] += total_reward
-        user_data['daily_claimed'] = now.isoformat()
-        
+
+            base_reward = DAILY_REWARD
+            vip_bonus = DAILY_VIP_BONUS if is_vip(ctx.author.id) else 0
+            total_reward = base_reward + vip_bonus
+
+            tx.change(ctx.author.id, total_reward, 'daily')
+            user_data['daily_claimed'] = now
+
         embed = discord.Embed(title="🎁 Daily Coletado!", color=0x00ff00)
         embed.add_field(name="Recompensa Base", value=f"${base_reward}", inline=True)
         if vip_bonus > 0:
             embed.add_field(name="Bônus VIP", value=f"${vip_bonus}", inline=True)
         embed.add_field(name="Total Recebido", value=f"${total_reward}", inline=True)
-        
-        save_data()
+
         await ctx.send(embed=embed)
 
     @commands.command(name='work', aliases=['trabalhar'])
     async def work(self, ctx):
-        user_data = get_user_data(ctx.author.id)
-        now = datetime.now()
-        
-        if user_data['work_cooldown']:
-            last_work = datetime.fromisoformat(user_data['work_cooldown'])
-            if now - last_work < timedelta(hours=1):
-                remaining = timedelta(hours=1) - (now - last_work)
-                minutes, seconds = divmod(remaining.seconds, 60)
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            user_data = tx.user(ctx.author.id)
+            now = int(time.time())
+
+            if user_data['work_cooldown'] and now - user_data['work_cooldown'] < WORK_HOURS * 3600:
+                remaining = WORK_HOURS * 3600 - (now - user_data['work_cooldown'])
+                minutes, seconds = divmod(remaining, 60)
                 await ctx.send(f"⏰ Você está cansado! Descanse por {minutes}m {seconds}s")
                 return
-        
-        jobs = [
-            "programou um bot", "entregou pizza", "lavou carros", "cuidou de pets",
-            "deu aulas", "fez stream", "vendeu doces", "cortou grama"
-        ]
-        
-        base_pay = random.randint(50, 150)
-        vip_bonus = int(base_pay * 0.5) if is_vip(ctx.author.id) else 0
-        total_pay = base_pay + vip_bonus
-        
-        user_data['money'] += total_pay
-        user_data['work_cooldown'] = now.isoformat()
-        
-        job = random.choice(jobs)
-        embed = discord.Embed(title="💼 Trabalho Concluído!", 
-                             description=f"Você {job} e ganhou ${total_pay}!", 
-                             color=0x00ff00)
-        
-        # Chance de ganhar XP
-        if await add_xp(ctx.author.id, random.randint(5, 15)):
-            embed.add_field(name="🎉 Level Up!", value=f"Você chegou ao level {user_data['level']}!", inline=False)
-        
-        save_data()
+
+            jobs = [
+                "programou um bot", "entregou pizza", "lavou carros", "cuidou de pets",
+                "deu aulas", "fez stream", "vendeu doces", "cortou grama"
+            ]
+
+            base_pay = random.randint(*WORK_PAY)
+            vip_bonus = int(base_pay * WORK_VIP_BONUS) if is_vip(ctx.author.id) else 0
+            total_pay = base_pay + vip_bonus
+
+            tx.change(ctx.author.id, total_pay, 'work')
+            user_data['work_cooldown'] = now
+
+            job = random.choice(jobs)
+            embed = discord.Embed(title="💼 Trabalho Concluído!",
+                                 description=f"Você {job} e ganhou ${total_pay}!",
+                                 color=0x00ff00)
+
+            # Chance de ganhar XP
+            if await add_xp(tx.shard, ctx.author.id, random.randint(5, 15)):
+                embed.add_field(name="🎉 Level Up!", value=f"Você chegou ao level {user_data['level']}!", inline=False)
+
         await ctx.send(embed=embed)
 
     @commands.command(name='apostar', aliases=['bet'])
@@ -163,27 +671,26 @@ class Economy(commands.Cog):
             await ctx.send("❌ Valor inválido!")
             return
         
-        user_data = get_user_data(ctx.author.id)
-        if user_data['money'] < amount:
-            await ctx.send("❌ Você não tem dinheiro suficiente!")
-            return
-        
-        # VIP tem melhor chance de ganhar
-        win_chance = 0.55 if is_vip(ctx.author.id) else 0.45
-        
-        if random.random() < win_chance:
-            winnings = int(amount * random.uniform(1.5, 2.5))
-            user_data['money'] += winnings - amount
-            embed = discord.Embed(title="🎰 Você Ganhou!", 
-                                 description=f"Apostou ${amount} e ganhou ${winnings}!", 
-                                 color=0x00ff00)
-        else:
-            user_data['money'] -= amount
-            embed = discord.Embed(title="💸 Você Perdeu!", 
-                                 description=f"Perdeu ${amount} na aposta!", 
-                                 color=0xff0000)
-        
-        save_data()
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            if tx.balance(ctx.author.id) < amount:
+                await ctx.send("❌ Você não tem dinheiro suficiente!")
+                return
+
+            # VIP tem melhor chance de ganhar
+            win_chance = BET_WIN_CHANCE_VIP if is_vip(ctx.author.id) else BET_WIN_CHANCE
+
+            if random.random() < win_chance:
+                winnings = int(amount * random.uniform(*BET_PAYOUT))
+                tx.change(ctx.author.id, winnings - amount, 'apostar')
+                embed = discord.Embed(title="🎰 Você Ganhou!",
+                                     description=f"Apostou ${amount} e ganhou ${winnings}!",
+                                     color=0x00ff00)
+            else:
+                tx.change(ctx.author.id, -amount, 'apostar')
+                embed = discord.Embed(title="💸 Você Perdeu!",
+                                     description=f"Perdeu ${amount} na aposta!",
+                                     color=0xff0000)
+
         await ctx.send(embed=embed)
 
     @commands.command(name='roubar', aliases=['rob', 'steal'])
@@ -196,229 +703,278 @@ class Economy(commands.Cog):
             await ctx.send("❌ Você não pode roubar de bots!")
             return
         
-        robber_data = get_user_data(ctx.author.id)
-        target_data = get_user_data(member.id)
-        
-        # Cooldown de 2 horas para roubar
-        now = datetime.now()
-        cooldown_key = f'rob_cooldown_{ctx.author.id}'
-        
-        if hasattr(robber_data, 'rob_cooldown') and robber_data.get('rob_cooldown'):
-            last_rob = datetime.fromisoformat(robber_data['rob_cooldown'])
-            if now - last_rob < timedelta(hours=2):
-                remaining = timedelta(hours=2) - (now - last_rob)
-                hours, remainder = divmod(remaining.seconds, 3600)
+        async with Transaction(ctx.guild.id, ctx.author.id, member.id) as tx:
+            robber_data = tx.user(ctx.author.id)
+
+            # Cooldown para roubar
+            now = int(time.time())
+
+            if robber_data['rob_cooldown'] and now - robber_data['rob_cooldown'] < ROB_HOURS * 3600:
+                remaining = ROB_HOURS * 3600 - (now - robber_data['rob_cooldown'])
+                hours, remainder = divmod(remaining, 3600)
                 minutes, _ = divmod(remainder, 60)
                 await ctx.send(f"⏰ Você já roubou recentemente! Espere {hours}h {minutes}m")
                 return
-        
-        # Verifica se o alvo tem dinheiro suficiente
-        if target_data['money'] < 50:
-            await ctx.send(f"💸 {member.display_name} está muito pobre para ser roubado! (mín. $50)")
-            return
-        
-        # Chances de sucesso
-        base_chance = 0.35
-        if is_vip(ctx.author.id):
-            base_chance += 0.15  # VIP tem mais chance
-        
-        # Se o alvo é VIP, é mais difícil roubar
-        if is_vip(member.id):
-            base_chance -= 0.10
-        
-        success = random.random() < base_chance
-        
-        if success:
-            # Roubo bem-sucedido
-            max_steal = min(target_data['money'] // 3, 500)  # Max 1/3 do dinheiro ou $500
-            stolen_amount = random.randint(25, max_steal)
-            
-            target_data['money'] -= stolen_amount
-            robber_data['money'] += stolen_amount
-            robber_data['rob_cooldown'] = now.isoformat()
-            
-            embed = discord.Embed(title="💰 Roubo Bem-sucedido!", 
-                                 description=f"{ctx.author.mention} roubou ${stolen_amount} de {member.mention}!", 
-                                 color=0x00ff00)
-            
-            # Chance de ganhar XP no roubo
-            if await add_xp(ctx.author.id, random.randint(10, 20)):
-                embed.add_field(name="🎉 Level Up!", value=f"Você chegou ao level {robber_data['level']}!", inline=False)
-        else:
-            # Roubo falhou - ladrão perde dinheiro
-            penalty = random.randint(50, 150)
-            penalty = min(penalty, robber_data['money'])
-            
-            robber_data['money'] -= penalty
-            robber_data['rob_cooldown'] = now.isoformat()
-            
-            embed = discord.Embed(title="🚨 Roubo Falhou!", 
-                                 description=f"{ctx.author.mention} foi pego tentando roubar {member.mention} e perdeu ${penalty}!", 
-                                 color=0xff0000)
-        
-        save_data()
+
+            # Verifica se o alvo tem dinheiro suficiente
+            if tx.balance(member.id) < ROB_MIN_TARGET_BALANCE:
+                await ctx.send(f"💸 {member.display_name} está muito pobre para ser roubado! (mín. ${ROB_MIN_TARGET_BALANCE})")
+                return
+
+            # Chances de sucesso
+            base_chance = ROB_CHANCE
+            if is_vip(ctx.author.id):
+                base_chance += ROB_VIP_BONUS
+
+            # Se o alvo é VIP, é mais difícil roubar
+            if is_vip(member.id):
+                base_chance -= ROB_TARGET_VIP_PENALTY
+
+            success = random.random() < base_chance
+
+            if success:
+                # Roubo bem-sucedido
+                max_steal = min(tx.balance(member.id) // 3, ROB_STEAL_MAX)  # Max 1/3 do dinheiro
+                # Alvos com pouco mais que o mínimo têm 1/3 do saldo abaixo de ROB_STEAL_MIN
+                stolen_amount = random.randint(min(ROB_STEAL_MIN, max_steal), max_steal)
+
+                tx.change(member.id, -stolen_amount, 'roubado')
+                tx.change(ctx.author.id, stolen_amount, 'roubar')
+                robber_data['rob_cooldown'] = now
+
+                embed = discord.Embed(title="💰 Roubo Bem-sucedido!",
+                                     description=f"{ctx.author.mention} roubou ${stolen_amount} de {member.mention}!",
+                                     color=0x00ff00)
+
+                # Chance de ganhar XP no roubo
+                if await add_xp(tx.shard, ctx.author.id, random.randint(10, 20)):
+                    embed.add_field(name="🎉 Level Up!", value=f"Você chegou ao level {robber_data['level']}!", inline=False)
+            else:
+                # Roubo falhou - ladrão perde dinheiro
+                penalty = random.randint(*ROB_FINE)
+                penalty = min(penalty, tx.balance(ctx.author.id))
+
+                tx.change(ctx.author.id, -penalty, 'roubar_multa')
+                robber_data['rob_cooldown'] = now
+
+                embed = discord.Embed(title="🚨 Roubo Falhou!",
+                                     description=f"{ctx.author.mention} foi pego tentando roubar {member.mention} e perdeu ${penalty}!",
+                                     color=0xff0000)
+
         await ctx.send(embed=embed)
 
     @commands.command(name='loteria', aliases=['lottery', 'loto'])
     async def lottery(self, ctx, *numbers):
-        ticket_price = 100
-        user_data = get_user_data(ctx.author.id)
-        
-        if user_data['money'] < ticket_price:
-            await ctx.send(f"❌ Você precisa de ${ticket_price} para comprar um bilhete da loteria!")
-            return
-        
         # Se não forneceu números, gera aleatoriamente
         if not numbers:
-            user_numbers = [random.randint(1, 50) for _ in range(6)]
+            user_numbers = random.sample(range(1, NUMBERS + 1), PICKS)
         else:
             try:
-                user_numbers = [int(num) for num in numbers[:6]]
-                if len(user_numbers) != 6:
-                    await ctx.send("❌ Você deve escolher exatamente 6 números de 1 a 50!")
-                    return
-                if any(num < 1 or num > 50 for num in user_numbers):
-                    await ctx.send("❌ Os números devem estar entre 1 e 50!")
-                    return
-                if len(set(user_numbers)) != 6:
-                    await ctx.send("❌ Não é possível repetir números!")
-                    return
+                user_numbers = [int(num) for num in numbers[:PICKS]]
             except ValueError:
                 await ctx.send("❌ Por favor, digite apenas números válidos!")
                 return
-        
-        # Cobrar o bilhete
-        user_data['money'] -= ticket_price
-        
-        # Gerar números sorteados
-        winning_numbers = random.sample(range(1, 51), 6)
-        
-        # Verificar acertos
-        matches = len(set(user_numbers) & set(winning_numbers))
-        
-        # Calcular prêmio
-        prizes = {
-            6: 10000,  # Sena
-            5: 2000,   # Quina
-            4: 500,    # Quadra
-            3: 100,    # Terno
-        }
-        
-        prize = prizes.get(matches, 0)
-        
-        embed = discord.Embed(title="🎲 Resultado da Loteria", color=0x9932cc)
+            if len(user_numbers) != PICKS:
+                await ctx.send(f"❌ Você deve escolher exatamente {PICKS} números de 1 a {NUMBERS}!")
+                return
+            if any(num < 1 or num > NUMBERS for num in user_numbers):
+                await ctx.send(f"❌ Os números devem estar entre 1 e {NUMBERS}!")
+                return
+            if len(set(user_numbers)) != PICKS:
+                await ctx.send("❌ Não é possível repetir números!")
+                return
+        mask = to_mask(user_numbers)
+
+        # O sorteio espera as compras em andamento, então o bilhete sempre cai na rodada certa
+        async with lottery_gate:
+            round_id = data['lottery']['round']
+            async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+                if tx.balance(ctx.author.id) < LOTTERY_TICKET_PRICE:
+                    await ctx.send(f"❌ Você precisa de ${LOTTERY_TICKET_PRICE} para comprar um bilhete da loteria!")
+                    return
+
+                tx.change(ctx.author.id, -LOTTERY_TICKET_PRICE, 'loteria_bilhete')
+                tx.execute(lambda conexao: conexao.execute(
+                    "INSERT INTO economia_loteria_bilhetes (round, guild_id, user_id, mask) VALUES (?, ?, ?, ?)",
+                    (round_id, ctx.guild.id, ctx.author.id, mask)
+                ))
+            pool = lottery_pools.setdefault(ctx.guild.id, TicketPool())
+            pool.add(ctx.author.id, mask)
+
+        embed = discord.Embed(title="🎟️ Bilhete da Loteria", color=0x9932cc)
         embed.add_field(name="Seus Números", value=" - ".join(map(str, sorted(user_numbers))), inline=False)
-        embed.add_field(name="Números Sorteados", value=" - ".join(map(str, sorted(winning_numbers))), inline=False)
-        embed.add_field(name="Acertos", value=f"{matches}/6", inline=True)
-        
-        if prize > 0:
-            # Bônus VIP
-            if is_vip(ctx.author.id):
-                vip_bonus = int(prize * 0.25)
-                prize += vip_bonus
-                embed.add_field(name="Bônus VIP", value=f"+${vip_bonus}", inline=True)
-            
-            user_data['money'] += prize
-            embed.add_field(name="🎉 Prêmio", value=f"${prize}", inline=True)
-            embed.color = 0x00ff00
-            
-            # XP por ganhar na loteria
-            if await add_xp(ctx.author.id, matches * 5):
-                embed.add_field(name="🎉 Level Up!", value=f"Você chegou ao level {user_data['level']}!", inline=False)
+        embed.add_field(name="Rodada", value=f"#{round_id}", inline=True)
+        if data['lottery']['next_draw']:
+            embed.add_field(name="Sorteio", value=f"<t:{int(data['lottery']['next_draw'])}:R>", inline=True)
+        embed.set_footer(text=f"Bilhete custou ${LOTTERY_TICKET_PRICE} | {len(pool)} bilhetes na rodada")
+        await ctx.send(embed=embed)
+
+    @commands.command(name='bilhetes', aliases=['tickets'])
+    async def tickets(self, ctx):
+        pool = lottery_pools.get(ctx.guild.id)
+        masks = pool.tickets_of(ctx.author.id) if pool is not None else []
+        embed = discord.Embed(title=f"🎟️ Seus bilhetes - Rodada #{data['lottery']['round']}", color=0x9932cc)
+        if masks:
+            lines = [" - ".join(map(str, from_mask(mask))) for mask in masks[:15]]
+            if len(masks) > 15:
+                lines.append(f"... e mais {len(masks) - 15}")
+            embed.description = "\n".join(lines)
         else:
-            embed.add_field(name="😢 Prêmio", value="Mais sorte na próxima!", inline=True)
-            embed.color = 0xff0000
-        
-        embed.set_footer(text=f"Bilhete custou ${ticket_price}")
-        
-        save_data()
+            embed.description = "Você não tem bilhetes nesta rodada. Use `!loteria` para comprar!"
+        embed.add_field(name="Bilhetes na rodada", value=str(len(pool) if pool is not None else 0), inline=True)
+        if data['lottery']['next_draw']:
+            embed.add_field(name="Sorteio", value=f"<t:{int(data['lottery']['next_draw'])}:R>", inline=True)
         await ctx.send(embed=embed)
 
+    @commands.command(name='resultadoloteria', aliases=['lotoresultado'])
+    async def lottery_result(self, ctx):
+        last = data['lottery'].get('last')
+        if not last:
+            await ctx.send("❌ Ainda não houve nenhum sorteio!")
+            return
+        await ctx.send(embed=self._lottery_embed(last, ctx.guild.id))
+
+    def _lottery_embed(self, result, guild_id=None):
+        """Resultado do sorteio; com `guild_id`, bilhetes e prêmios são só os daquele servidor."""
+        embed = discord.Embed(title=f"🎲 Resultado da Loteria - Rodada #{result['round']}", color=0x9932cc,
+                              timestamp=datetime.fromtimestamp(result['drawn_at']))
+        if guild_id is not None and 'guilds' in result:
+            summary = result['guilds'].get(str(guild_id), {'tickets': 0, 'tiers': {}, 'paid': 0, 'top': []})
+        else:
+            summary = result
+        embed.add_field(name="Números Sorteados", value=" - ".join(map(str, result['numbers'])), inline=False)
+        embed.add_field(name="Bilhetes", value=str(summary['tickets']), inline=True)
+        embed.add_field(name="Total pago", value=f"${summary['paid']}", inline=True)
+        embed.add_field(name="Acertos",
+                        value="\n".join(f"{hits} números: {summary['tiers'].get(str(hits), 0)} bilhete(s)"
+                                         for hits in sorted(LOTTERY_PRIZES, reverse=True)),
+                        inline=False)
+        if summary['top']:
+            embed.add_field(name="🎉 Maiores prêmios",
+                            value="\n".join(f"<@{uid}>: ${prize}" for uid, prize in summary['top']),
+                            inline=False)
+        return embed
+
     @commands.command(name='loja', aliases=['shop'])
-    async def shop(self, ctx):
-        embed = discord.Embed(title="🛒 Loja do Servidor", color=0x0099ff)
-        
-        for emoji, item in data['shop']['items'].items():
-            embed.add_field(
-                name=f"{emoji} {item['name']} - ${item['price']}", 
-                value=item['description'], 
-                inline=False
-            )
-        
-        embed.set_footer(text="Use !comprar <emoji> para comprar um item")
+    async def shop(self, ctx, page: int = 1):
+        embed, _, _ = catalog.page(page)
         await ctx.send(embed=embed)
 
     @commands.command(name='comprar', aliases=['buy'])
-    async def buy(self, ctx, item_emoji: str):
-        if item_emoji not in data['shop']['items']:
-            await ctx.send("❌ Item não encontrado na loja!")
+    async def buy(self, ctx, *order):
+        try:
+            items = parse_order(order)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
             return
-        
-        user_data = get_user_data(ctx.author.id)
-        item = data['shop']['items'][item_emoji]
-        
-        if user_data['money'] < item['price']:
-            await ctx.send(f"❌ Você precisa de ${item['price']} para comprar {item['name']}!")
+        if not items:
+            await ctx.send("❌ Uso: !comprar <emoji> [quantidade] [<emoji> [quantidade] ...]")
             return
-        
-        user_data['money'] -= item['price']
-        
-        if item_emoji not in user_data['inventory']:
-            user_data['inventory'][item_emoji] = 0
-        user_data['inventory'][item_emoji] += 1
-        
-        embed = discord.Embed(title="✅ Compra Realizada!", 
-                             description=f"Você comprou {item_emoji} {item['name']} por ${item['price']}!", 
-                             color=0x00ff00)
-        
-        save_data()
+
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            # Preços conferidos já com a trava: um !removeitem no meio não passa despercebido
+            missing = [emoji for emoji, _ in items if emoji not in catalog]
+            if missing:
+                await ctx.send(f"❌ Item não encontrado na loja: {' '.join(missing)}")
+                return
+
+            user_data = tx.user(ctx.author.id)
+            lines = [(emoji, quantity, catalog.get(emoji)) for emoji, quantity in items]
+            total = sum(item['price'] * quantity for _, quantity, item in lines)
+
+            if tx.balance(ctx.author.id) < total:
+                if len(lines) == 1 and lines[0][1] == 1:
+                    item = lines[0][2]
+                    await ctx.send(f"❌ Você precisa de ${item['price']} para comprar {item['name']}!")
+                else:
+                    await ctx.send(f"❌ Você precisa de ${total} para esta compra!")
+                return
+
+            # Tudo ou nada: os itens e o pagamento são gravados juntos no fim da transação
+            for emoji, quantity, item in lines:
+                tx.change(ctx.author.id, -item['price'] * quantity, 'comprar')
+                user_data['inventory'][emoji] = user_data['inventory'].get(emoji, 0) + quantity
+
+        if len(lines) == 1 and lines[0][1] == 1:
+            emoji, _, item = lines[0]
+            description = f"Você comprou {emoji} {item['name']} por ${item['price']}!"
+        else:
+            description = "\n".join(
+                f"{quantity}x {emoji} {item['name']} — ${item['price'] * quantity}" for emoji, quantity, item in lines
+            )
+        embed = discord.Embed(title="✅ Compra Realizada!", description=description, color=0x00ff00)
+        if len(lines) > 1 or lines[0][1] > 1:
+            embed.add_field(name="Total", value=f"${total}", inline=True)
         await ctx.send(embed=embed)
 
     @commands.command(name='inventario', aliases=['inv', 'inventory'])
-    async def inventory(self, ctx, member: discord.Member = None):
+    async def inventory(self, ctx, member: typing.Optional[discord.Member] = None, page: int = 1):
         if member is None:
             member = ctx.author
         
-        user_data = get_user_data(member.id)
+        shard = await shards.get(ctx.guild.id)
+        user_data = get_user_data(shard, member.id)
         
         if not user_data['inventory']:
             await ctx.send(f"📦 {member.display_name} não possui itens no inventário!")
             return
         
+        items = list(user_data['inventory'].items())
+        total_pages = (len(items) + INVENTORY_PAGE_SIZE - 1) // INVENTORY_PAGE_SIZE
+        page = min(max(page, 1), total_pages)
+
         embed = discord.Embed(title=f"📦 Inventário de {member.display_name}", color=0x9932cc)
-        
-        for emoji, quantity in user_data['inventory'].items():
-            item_name = data['shop']['items'].get(emoji, {}).get('name', 'Item Desconhecido')
-            embed.add_field(name=f"{emoji} {item_name}", value=f"Quantidade: {quantity}", inline=True)
+        lines = []
+        for emoji, quantity in items[(page - 1) * INVENTORY_PAGE_SIZE:page * INVENTORY_PAGE_SIZE]:
+            item_name = catalog.get(emoji, {}).get('name', 'Item Desconhecido')
+            lines.append(f"{emoji} **{item_name}** — {quantity}x")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Página {page}/{total_pages} • {len(items)} itens, "
+                              f"{sum(user_data['inventory'].values())} unidades")
         
         await ctx.send(embed=embed)
 
     @commands.command(name='vender', aliases=['sell'])
-    async def sell(self, ctx, item_emoji: str, quantity: int = 1):
-        user_data = get_user_data(ctx.author.id)
-        
-        if item_emoji not in user_data['inventory'] or user_data['inventory'][item_emoji] < quantity:
-            await ctx.send("❌ Você não possui este item em quantidade suficiente!")
+    async def sell(self, ctx, *order):
+        try:
+            items = parse_order(order)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
             return
-        
-        if item_emoji not in data['shop']['items']:
-            await ctx.send("❌ Este item não pode ser vendido!")
+        if not items:
+            await ctx.send("❌ Uso: !vender <emoji> [quantidade] [<emoji> [quantidade] ...]")
             return
-        
-        item = data['shop']['items'][item_emoji]
-        sell_price = int(item['price'] * 0.7 * quantity)  # 70% do preço original
-        
-        user_data['inventory'][item_emoji] -= quantity
-        if user_data['inventory'][item_emoji] == 0:
-            del user_data['inventory'][item_emoji]
-        
-        user_data['money'] += sell_price
-        
-        embed = discord.Embed(title="💰 Item Vendido!", 
-                             description=f"Você vendeu {quantity}x {item_emoji} {item['name']} por ${sell_price}!", 
-                             color=0x00ff00)
-        
-        save_data()
+
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            user_data = tx.user(ctx.author.id)
+            inventory = user_data['inventory']
+
+            if any(inventory.get(emoji, 0) < quantity for emoji, quantity in items):
+                await ctx.send("❌ Você não possui este item em quantidade suficiente!")
+                return
+
+            if any(emoji not in catalog for emoji, _ in items):
+                await ctx.send("❌ Este item não pode ser vendido!")
+                return
+
+            lines = []
+            total = 0
+            for emoji, quantity in items:
+                item = catalog.get(emoji)
+                sell_price = int(item['price'] * SHOP_SELL_RATE * quantity)
+                inventory[emoji] -= quantity
+                if inventory[emoji] == 0:
+                    del inventory[emoji]
+                tx.change(ctx.author.id, sell_price, 'vender')
+                total += sell_price
+                lines.append(f"{quantity}x {emoji} {item['name']} por ${sell_price}")
+
+        if len(lines) == 1:
+            embed = discord.Embed(title="💰 Item Vendido!", description=f"Você vendeu {lines[0]}!", color=0x00ff00)
+        else:
+            embed = discord.Embed(title="💰 Itens Vendidos!", description="\n".join(lines), color=0x00ff00)
+            embed.add_field(name="Total", value=f"${total}", inline=True)
+
         await ctx.send(embed=embed)
 
     @commands.command(name='depositar', aliases=['dep'])
@@ -427,16 +983,14 @@ class Economy(commands.Cog):
             await ctx.send("❌ Valor inválido!")
             return
         
-        user_data = get_user_data(ctx.author.id)
-        if user_data['money'] < amount:
-            await ctx.send("❌ Você não tem dinheiro suficiente!")
-            return
-        
-        user_data['money'] -= amount
-        user_data['bank'] += amount
-        
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            if tx.balance(ctx.author.id) < amount:
+                await ctx.send("❌ Você não tem dinheiro suficiente!")
+                return
+
+            tx.transfer(ctx.author.id, ctx.author.id, amount, 'depositar', target_account='bank')
+
         await ctx.send(f"✅ Você depositou ${amount} no banco!")
-        save_data()
 
     @commands.command(name='sacar', aliases=['withdraw'])
     async def withdraw(self, ctx, amount: int):
@@ -444,16 +998,14 @@ class Economy(commands.Cog):
             await ctx.send("❌ Valor inválido!")
             return
         
-        user_data = get_user_data(ctx.author.id)
-        if user_data['bank'] < amount:
-            await ctx.send("❌ Você não tem dinheiro suficiente no banco!")
-            return
-        
-        user_data['bank'] -= amount
-        user_data['money'] += amount
-        
+        async with Transaction(ctx.guild.id, ctx.author.id) as tx:
+            if tx.balance(ctx.author.id, 'bank') < amount:
+                await ctx.send("❌ Você não tem dinheiro suficiente no banco!")
+                return
+
+            tx.transfer(ctx.author.id, ctx.author.id, amount, 'sacar', source_account='bank')
+
         await ctx.send(f"✅ Você sacou ${amount} do banco!")
-        save_data()
 
     # COMANDOS VIP (apenas admins)
 
@@ -464,18 +1016,20 @@ class Economy(commands.Cog):
             await ctx.send("❌ Número de dias inválido!")
             return
         
-        expire_date = datetime.now() + timedelta(days=days)
+        expires = int(time.time()) + days * 86400
+        expire_date = datetime.fromtimestamp(expires)
         data['vip'][str(member.id)] = {
-            'expires': expire_date.isoformat(),
+            'expires': expires,
             'granted_by': ctx.author.id
         }
+        await vips.definir(str(member.id), expires)
         
         embed = discord.Embed(title="👑 VIP Concedido!", 
                              description=f"{member.mention} agora é VIP por {days} dias!", 
                              color=0xffd700)
         embed.add_field(name="Expira em", value=expire_date.strftime("%d/%m/%Y %H:%M"), inline=False)
         
-        save_data()
+        await save_data(vip=[member.id])
         await ctx.send(embed=embed)
 
     @commands.command(name='removervip')
@@ -486,12 +1040,13 @@ class Economy(commands.Cog):
             return
         
         del data['vip'][str(member.id)]
+        await vips.remover(str(member.id))
         
         embed = discord.Embed(title="👑 VIP Removido!", 
                              description=f"VIP de {member.mention} foi removido!", 
                              color=0xff0000)
         
-        save_data()
+        await save_data(vip=[member.id])
         await ctx.send(embed=embed)
 
     @commands.command(name='listvip')
@@ -506,7 +1061,7 @@ class Economy(commands.Cog):
         for user_id, vip_data in data['vip'].items():
             try:
                 user = self.bot.get_user(int(user_id))
-                expires = datetime.fromisoformat(vip_data['expires'])
+                expires = datetime.fromtimestamp(vip_data['expires'])
                 embed.add_field(
                     name=f"{user.display_name if user else 'Usuário Desconhecido'}", 
                     value=f"Expira: {expires.strftime('%d/%m/%Y %H:%M')}", 
@@ -526,34 +1081,33 @@ class Economy(commands.Cog):
             return
         
         name, description = parts
-        data['shop']['items'][emoji] = {
+        catalog.set(emoji, {
             'name': name.strip(),
             'price': price,
             'description': description.strip()
-        }
+        })
         
         embed = discord.Embed(title="✅ Item Adicionado!", 
                              description=f"{emoji} {name} foi adicionado à loja por ${price}!", 
                              color=0x00ff00)
         
-        save_data()
+        await save_data(shop=True)
         await ctx.send(embed=embed)
 
     @commands.command(name='removeitem')
     @commands.has_permissions(administrator=True)
     async def remove_item(self, ctx, emoji: str):
-        if emoji not in data['shop']['items']:
+        if emoji not in catalog:
             await ctx.send("❌ Item não encontrado na loja!")
             return
         
-        item_name = data['shop']['items'][emoji]['name']
-        del data['shop']['items'][emoji]
+        item_name = catalog.remove(emoji)['name']
         
         embed = discord.Embed(title="✅ Item Removido!", 
                              description=f"{emoji} {item_name} foi removido da loja!", 
                              color=0xff0000)
         
-        save_data()
+        await save_data(shop=True)
         await ctx.send(embed=embed)
 
     @commands.command(name='dar', aliases=['give'])
@@ -563,14 +1117,33 @@ class Economy(commands.Cog):
             await ctx.send("❌ Valor inválido!")
             return
         
-        user_data = get_user_data(member.id)
-        user_data['money'] += amount
-        
-        embed = discord.Embed(title="💰 Dinheiro Concedido!", 
-                             description=f"{member.mention} recebeu ${amount}!", 
+        async with Transaction(ctx.guild.id, member.id) as tx:
+            tx.change(member.id, amount, 'dar')
+
+        embed = discord.Embed(title="💰 Dinheiro Concedido!",
+                             description=f"{member.mention} recebeu ${amount}!",
                              color=0x00ff00)
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name='extrato', aliases=['statement'])
+    async def statement(self, ctx, member: discord.Member = None):
+        if member is None:
+            member = ctx.author
+        
+        entries = await ledger.history(f"{ctx.guild.id}:{member.id}", limit=15)
+        if not entries:
+            await ctx.send(f"📜 {member.display_name} ainda não tem movimentações!")
+            return
         
-        save_data()
+        embed = discord.Embed(title=f"📜 Extrato de {member.display_name}", color=0x0099ff)
+        lines = []
+        for _, account, delta, reason, ts in entries:
+            sign = "+" if delta > 0 else "-"
+            where = "🏦" if account == 'bank' else "👛"
+            lines.append(f"<t:{ts}:d> {where} `{sign}${abs(delta)}` {reason}")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text="Últimas 15 movimentações")
         await ctx.send(embed=embed)
 
     # Comando de ajuda personalizado
@@ -579,19 +1152,19 @@ class Economy(commands.Cog):
         embed = discord.Embed(title="💰 Sistema de Economia", color=0x0099ff)
         
         embed.add_field(name="💵 Comandos Básicos", 
-                        value="`!saldo` - Ver seu saldo\n`!daily` - Recompensa diária\n`!work` - Trabalhar por dinheiro", 
+                        value="`!saldo` - Ver seu saldo\n`!daily` - Recompensa diária\n`!work` - Trabalhar por dinheiro\n`!rank [página]` - Mais ricos\n`!rankpos [@usuário]` - Posição no ranking", 
                         inline=False)
         
         embed.add_field(name="🛒 Loja", 
-                        value="`!loja` - Ver itens\n`!comprar <emoji>` - Comprar item\n`!vender <emoji> [qtd]` - Vender item", 
+                        value="`!loja [página]` - Ver itens\n`!comprar <emoji> [qtd] ...` - Comprar um ou vários itens\n`!vender <emoji> [qtd] ...` - Vender itens\n`!inventario [@usuário] [página]` - Ver itens", 
                         inline=False)
         
         embed.add_field(name="🏦 Banco", 
-                        value="`!depositar <valor>` - Depositar no banco\n`!sacar <valor>` - Sacar do banco", 
+                        value="`!depositar <valor>` - Depositar no banco\n`!sacar <valor>` - Sacar do banco\n`!extrato` - Ver suas movimentações", 
                         inline=False)
         
         embed.add_field(name="🎰 Diversão", 
-                        value="`!apostar <valor>` - Apostar dinheiro\n`!roubar @usuário` - Tentar roubar alguém\n`!loteria [números]` - Jogar na loteria\n`!inventario` - Ver seus itens", 
+                        value="`!apostar <valor>` - Apostar dinheiro\n`!roubar @usuário` - Tentar roubar alguém\n`!loteria [números]` - Comprar bilhete da loteria\n`!bilhetes` - Seus bilhetes da rodada\n`!resultadoloteria` - Último sorteio", 
                         inline=False)
         
         embed.add_field(name="👑 Benefícios VIP", 
@@ -1,45 +1,68 @@
 import discord
-from discord.ext import commands, tasks
-import json
-import os
+from discord.ext import commands
 import asyncio
+import os
+
+from cogs._agendador import Agendador
+from cogs._armazenamento import obter_armazenamento
 
-ARQUIVO = "data/mensagens.json"
+# Quantas mensagens automáticas podem ser enviadas ao mesmo tempo
+ENVIOS_SIMULTANEOS = int(os.getenv("MENSAGENS_ENVIOS_SIMULTANEOS", "5"))
+INTERVALO_MINIMO = 1  # Segundos
 
 class Mensagens(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.mensagens = self.carregar_mensagens()
-        self.envio_automatico.start()
-
-    def carregar_mensagens(self):
-        if not os.path.exists("data"):
-            os.makedirs("data")
-        if not os.path.exists(ARQUIVO):
-            with open(ARQUIVO, "w", encoding="utf-8") as f:
-                json.dump([], f)
-        with open(ARQUIVO, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-
-    def salvar_mensagens(self):
-        with open(ARQUIVO, "w", encoding="utf-8") as f:
-            json.dump(self.mensagens, f, indent=2, ensure_ascii=False)
+        self.armazenamento = obter_armazenamento()
+        self.mensagens = []
+        self.limite_envios = asyncio.Semaphore(ENVIOS_SIMULTANEOS)
+
+        # O proximo_envio já fica gravado em cada mensagem, então o agendador não precisa persistir nada
+        self.agendador = Agendador(esperar=self.bot.wait_until_ready, nome="agendador de mensagens")
+        self.agendador.registrar("mensagem", self.envio_automatico)
+
+    async def cog_load(self):
+        self.mensagens = await self.carregar_mensagens()
+        for msg in self.mensagens:
+            await self.agendar(msg)
+        self.agendador.iniciar()
+
+    async def cog_unload(self):
+        await self.agendador.parar()
+
+    async def agendar(self, msg):
+        # Com intervalo <= 0 o próximo envio já estaria vencido e a mensagem dispararia sem parar
+        if msg["intervalo"] < INTERVALO_MINIMO:
+            print(f"⚠️ Mensagem automática {msg['id']} com intervalo inválido ({msg['intervalo']}s) não foi agendada")
+            return False
+        await self.agendador.agendar(msg["id"], msg.get("proximo_envio", 0), "mensagem")
+        return True
+
+    async def carregar_mensagens(self):
+        return list((await self.armazenamento.carregar("mensagens")).values())
+
+    async def salvar_mensagens(self, *mensagens):
+        """Grava só as mensagens informadas"""
+        await self.armazenamento.salvar("mensagens", {f"{msg['id']:08d}": msg for msg in mensagens})
 
     @commands.command(name="setmensagem")
     @commands.has_permissions(administrator=True)
     async def set_mensagem(self, ctx, canal: discord.TextChannel, tempo: int, *, mensagem: str):
         """Adiciona uma nova mensagem automática"""
+        if tempo < INTERVALO_MINIMO:
+            await ctx.send(f"❌ O intervalo deve ser de pelo menos {INTERVALO_MINIMO} segundo.")
+            return
+
         nova = {
+            "id": max((msg["id"] for msg in self.mensagens), default=0) + 1,
             "canal_id": canal.id,
             "mensagem": mensagem,
             "intervalo": tempo,
             "proximo_envio": discord.utils.utcnow().timestamp() + tempo
         }
         self.mensagens.append(nova)
-        self.salvar_mensagens()
+        await self.salvar_mensagens(nova)
+        await self.agendar(nova)
         await ctx.send(f"✅ Mensagem adicionada ao canal {canal.mention} com intervalo de {tempo} segundos.")
 
     @commands.command(name="removemensagem")
@@ -48,7 +71,8 @@ class Mensagens(commands.Cog):
         """Remove uma mensagem automática"""
         if 0 < indice <= len(self.mensagens):
             removida = self.mensagens.pop(indice - 1)
-            self.salvar_mensagens()
+            await self.agendador.cancelar(removida["id"])
+            await self.armazenamento.remover("mensagens", [f"{removida['id']:08d}"])
             await ctx.send(f"🗑️ Mensagem removida do canal <#{removida['canal_id']}>:\n```{removida['mensagem']}```")
         else:
             await ctx.send("❌ Índice inválido.")
@@ -74,23 +98,31 @@ class Mensagens(commands.Cog):
 
         await ctx.send(embed=embed)
 
-    @tasks.loop(seconds=60)
-    async def envio_automatico(self):
-        agora = discord.utils.utcnow().timestamp()
-        for msg in self.mensagens:
-            if agora >= msg.get("proximo_envio", 0):
-                canal = self.bot.get_channel(msg["canal_id"])
-                if canal:
+    async def envio_automatico(self, itens):
+        """Envia juntas as mensagens que venceram no mesmo instante"""
+        por_id = {msg["id"]: msg for msg in self.mensagens}
+        vencidas = [por_id[msg_id] for msg_id, _ in itens if msg_id in por_id]
+
+        async def _enviar(msg):
+            canal = self.bot.get_channel(msg["canal_id"])
+            if canal:
+                async with self.limite_envios:
                     try:
                         await canal.send(msg["mensagem"])
                     except Exception as e:
                         print(f"Erro ao enviar mensagem automática: {e}")
-                msg["proximo_envio"] = agora + msg["intervalo"]
-        self.salvar_mensagens()
 
-    @envio_automatico.before_loop
-    async def before_envio_automatico(self):
-        await self.bot.wait_until_ready()
+        await asyncio.gather(*(_enviar(msg) for msg in vencidas))
+
+        # Um !removemensagem durante os envios não pode trazer a mensagem de volta
+        por_id = {msg["id"]: msg for msg in self.mensagens}
+        vencidas = [msg for msg in vencidas if por_id.get(msg["id"]) is msg]
+        agora = discord.utils.utcnow().timestamp()
+        for msg in vencidas:
+            msg["proximo_envio"] = agora + msg["intervalo"]
+            await self.agendar(msg)
+        if vencidas:
+            await self.salvar_mensagens(*vencidas)
 
 async def setup(bot):
     await bot.add_cog(Mensagens(bot))
@@ -1,70 +1,147 @@
 import discord
-from discord.ext import commands
-import json
-import os
+from discord.ext import commands, tasks
 import asyncio
+import os
+import typing
 from datetime import datetime, timedelta
 
+from cogs._agendador import Agendador
+from cogs._armazenamento import obter_armazenamento
+from cogs._historico import HistoricoModeracao
+
+# Entradas do histórico mais velhas que isso vão para o arquivo comprimido
+DIAS_HISTORICO = int(os.getenv("MOD_DIAS_HISTORICO", "90"))
+
+# Nomes das ações como são gravados no histórico; !historicoacao aceita qualquer capitalização
+ACOES_HISTORICO = {acao.lower(): acao for acao in (
+    "Aviso", "Limpeza de Avisos", "Mute", "Unmute", "Kick", "Ban", "Unban"
+)}
+
+CONFIG_PADRAO = {
+    "canal_logs": None,
+    "cargo_mute": None,
+    "max_avisos": 3,
+    "auto_punir": True
+}
+
 class Moderacao(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.arquivo_moderacao = 'moderacao.json'
-        self.dados_moderacao = self.carregar_dados()
-
-    def carregar_dados(self):
-        """Carrega dados do arquivo JSON ou cria um novo se não existir"""
-        if os.path.exists(self.arquivo_moderacao):
-            try:
-                with open(self.arquivo_moderacao, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                print(f"Erro ao carregar {self.arquivo_moderacao}. Criando novo arquivo...")
-                return self.criar_arquivo_inicial()
-        else:
-            print(f"Arquivo {self.arquivo_moderacao} não encontrado. Criando novo...")
-            return self.criar_arquivo_inicial()
-
-    def criar_arquivo_inicial(self):
-        """Cria a estrutura inicial do arquivo JSON"""
-        dados_iniciais = {
+        self.armazenamento = obter_armazenamento()
+        self.dados_moderacao = {
             "avisos": {},
             "mutes": {},
             "bans_temporarios": {},
-            "configuracoes": {
-                "canal_logs": None,
-                "cargo_mute": None,
-                "max_avisos": 3,
-                "auto_punir": True
-            },
-            "historico": []
+            "configuracoes": dict(CONFIG_PADRAO)
         }
-        self.salvar_dados(dados_iniciais)
-        print(f"✅ Arquivo {self.arquivo_moderacao} criado com sucesso!")
-        return dados_iniciais
-
-    def salvar_dados(self, dados=None):
-        """Salva os dados no arquivo JSON"""
-        if dados is None:
-            dados = self.dados_moderacao
-        
-        try:
-            with open(self.arquivo_moderacao, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Erro ao salvar dados: {e}")
+        self.historico_mod = HistoricoModeracao(self.armazenamento)
+
+        # Fim dos mutes: um único loop para todos, recarregado do banco ao reiniciar
+        self.agendador = Agendador(
+            self.armazenamento,
+            colecao="mod_agendamentos",
+            esperar=self.bot.wait_until_ready,
+            nome="agendador de mutes"
+        )
+        self.agendador.registrar("desmute", self._expirar_mutes)
+
+    async def cog_load(self):
+        self.dados_moderacao = await self.carregar_dados()
+        await self.agendador.carregar()
+        await self._agendar_mutes_antigos()
+        self.agendador.iniciar()
+        await self.historico_mod.preparar()
+        self.arquivar_historico.start()
+
+    async def cog_unload(self):
+        self.arquivar_historico.cancel()
+        await self.agendador.parar()
+
+    @tasks.loop(hours=24)
+    async def arquivar_historico(self):
+        """Move as entradas antigas do histórico para segmentos comprimidos"""
+        arquivadas = await self.historico_mod.arquivar(DIAS_HISTORICO)
+        if arquivadas:
+            print(f"🗄️ {arquivadas} entradas do histórico de moderação arquivadas")
+
+    async def _agendar_mutes_antigos(self):
+        """Agenda mutes gravados antes do agendador existir (sem guild conhecida)"""
+        for user_id, mute in self.dados_moderacao["mutes"].items():
+            chave = f"desmute:{mute.get('guild_id')}:{user_id}"
+            if chave in self.agendador:
+                continue
+            fim = datetime.fromisoformat(mute["fim"]).timestamp()
+            await self.agendador.agendar(
+                chave, fim, "desmute",
+                {"guild_id": mute.get("guild_id"), "usuario_id": int(user_id)}
+            )
 
-    def adicionar_historico(self, acao, moderador, usuario, motivo=None, duracao=None):
-        """Adiciona uma ação ao histórico"""
-        entrada = {
-            "acao": acao,
-            "moderador": str(moderador),
-            "usuario": str(usuario),
-            "motivo": motivo,
-            "duracao": duracao,
-            "timestamp": datetime.now().isoformat()
+    def _guild_mute_antigo(self):
+        """Guild de um mute gravado sem guild_id: a dona do cargo de mute configurado"""
+        cargo_mute_id = self.dados_moderacao["configuracoes"]["cargo_mute"]
+        if cargo_mute_id:
+            for guild in self.bot.guilds:
+                if guild.get_role(cargo_mute_id) is not None:
+                    return guild
+        return None
+
+    async def _expirar_mutes(self, itens):
+        """Remove de uma vez todos os mutes vencidos; retorna as chaves a tentar de novo"""
+        async def _expirar(dados):
+            if dados["guild_id"] is not None:
+                guild = self.bot.get_guild(dados["guild_id"])
+                if guild is None or guild.unavailable:
+                    # Reconectando (ou fora da guild): o agendador tenta de novo mais tarde
+                    raise RuntimeError(f"guild {dados['guild_id']} indisponível")
+            else:
+                guild = self._guild_mute_antigo()
+                if guild is None:
+                    print(f"⚠️ Mute antigo de {dados['usuario_id']} sem guild conhecida; cargo não removido")
+
+            if guild is not None:
+                membro = guild.get_member(dados["usuario_id"])
+                if membro is None:
+                    try:
+                        membro = await guild.fetch_member(dados["usuario_id"])
+                    except (discord.NotFound, discord.Forbidden):
+                        membro = None
+                if membro is not None:
+                    await self.desmutar_automatico(membro)
+
+            user_id = str(dados["usuario_id"])
+            if user_id in self.dados_moderacao["mutes"]:
+                del self.dados_moderacao["mutes"][user_id]
+                await self.salvar_dados(mutes=[user_id])
+
+        # Um desmute que falha não impede os outros do lote
+        resultados = await asyncio.gather(*(_expirar(dados) for _, dados in itens), return_exceptions=True)
+        falhas = []
+        for (chave, _), resultado in zip(itens, resultados):
+            if isinstance(resultado, Exception):
+                print(f"❌ Erro ao expirar {chave}: {resultado}")
+                falhas.append(chave)
+        return falhas
+
+    async def carregar_dados(self):
+        """Carrega os dados de moderação do banco"""
+        return {
+            "avisos": await self.armazenamento.carregar("mod_avisos"),
+            "mutes": await self.armazenamento.carregar("mod_mutes"),
+            "bans_temporarios": await self.armazenamento.carregar("mod_bans_temporarios"),
+            "configuracoes": await self.armazenamento.obter("config", "moderacao", dict(CONFIG_PADRAO))
         }
-        self.dados_moderacao["historico"].append(entrada)
-        self.salvar_dados()
+
+    async def salvar_dados(self, avisos=(), mutes=(), config=False):
+        """Grava só os registros alterados; usuários sem dados são removidos do banco"""
+        alteracoes = [("mod_avisos", uid, self.dados_moderacao["avisos"].get(uid)) for uid in avisos]
+        alteracoes += [("mod_mutes", uid, self.dados_moderacao["mutes"].get(uid)) for uid in mutes]
+        if config:
+            alteracoes.append(("config", "moderacao", self.dados_moderacao["configuracoes"]))
+        await self.armazenamento.gravar(alteracoes)
+
+    async def adicionar_historico(self, acao, moderador, usuario, motivo=None, duracao=None):
+        """Adiciona uma ação ao histórico"""
+        await self.historico_mod.registrar(moderador.guild.id, acao, moderador, usuario, motivo, duracao)
 
     async def enviar_log(self, embed):
         """Envia log para o canal configurado"""
@@ -112,7 +189,7 @@ class Moderacao(commands.Cog):
                         continue
                 
                 self.dados_moderacao["configuracoes"]["cargo_mute"] = cargo_mute.id
-                self.salvar_dados()
+                await self.salvar_dados(config=True)
                 return cargo_mute
             except discord.Forbidden:
                 return None
@@ -143,8 +220,8 @@ class Moderacao(commands.Cog):
         self.dados_moderacao["avisos"][user_id].append(aviso)
         total_avisos = len(self.dados_moderacao["avisos"][user_id])
         
-        self.salvar_dados()
-        self.adicionar_historico("Aviso", ctx.author, membro, motivo)
+        await self.salvar_dados(avisos=[user_id])
+        await self.adicionar_historico("Aviso", ctx.author, membro, motivo)
 
         # Embed de resposta
         embed = discord.Embed(
@@ -213,8 +290,8 @@ class Moderacao(commands.Cog):
         if user_id in self.dados_moderacao["avisos"]:
             avisos_removidos = len(self.dados_moderacao["avisos"][user_id])
             del self.dados_moderacao["avisos"][user_id]
-            self.salvar_dados()
-            self.adicionar_historico("Limpeza de Avisos", ctx.author, membro)
+            await self.salvar_dados(avisos=[user_id])
+            await self.adicionar_historico("Limpeza de Avisos", ctx.author, membro)
             await ctx.send(f"✅ {avisos_removidos} avisos de {membro.display_name} foram removidos.")
         else:
             await ctx.send(f"❌ {membro.display_name} não possui avisos.")
@@ -265,10 +342,15 @@ class Moderacao(commands.Cog):
             self.dados_moderacao["mutes"][str(membro.id)] = {
                 "fim": fim_mute.isoformat(),
                 "motivo": motivo,
-                "moderador": str(ctx.author)
+                "moderador": str(ctx.author),
+                "guild_id": ctx.guild.id
             }
-            self.salvar_dados()
-            self.adicionar_historico("Mute", ctx.author, membro, motivo, duracao)
+            await self.salvar_dados(mutes=[str(membro.id)])
+            await self.agendador.agendar(
+                f"desmute:{ctx.guild.id}:{membro.id}", fim_mute.timestamp(), "desmute",
+                {"guild_id": ctx.guild.id, "usuario_id": membro.id}
+            )
+            await self.adicionar_historico("Mute", ctx.author, membro, motivo, duracao)
 
             embed = discord.Embed(
                 title="🔇 Membro Mutado",
@@ -284,10 +366,6 @@ class Moderacao(commands.Cog):
             await ctx.send(embed=embed)
             await self.enviar_log(embed)
 
-            # Agendar desmute
-            await asyncio.sleep(segundos)
-            await self.desmutar_automatico(membro)
-
         except discord.Forbidden:
             await ctx.send("❌ Não tenho permissão para mutar este usuário!")
 
@@ -301,7 +379,7 @@ class Moderacao(commands.Cog):
                     await membro.remove_roles(cargo_mute, reason="Mute expirado")
                     if str(membro.id) in self.dados_moderacao["mutes"]:
                         del self.dados_moderacao["mutes"][str(membro.id)]
-                        self.salvar_dados()
+                        await self.salvar_dados(mutes=[str(membro.id)])
                 except discord.Forbidden:
                     pass
 
@@ -325,11 +403,12 @@ class Moderacao(commands.Cog):
 
         try:
             await membro.remove_roles(cargo_mute, reason=f"Desmutado por {ctx.author}")
+            await self.agendador.cancelar(f"desmute:{ctx.guild.id}:{membro.id}")
             if str(membro.id) in self.dados_moderacao["mutes"]:
                 del self.dados_moderacao["mutes"][str(membro.id)]
-                self.salvar_dados()
+                await self.salvar_dados(mutes=[str(membro.id)])
             
-            self.adicionar_historico("Unmute", ctx.author, membro)
+            await self.adicionar_historico("Unmute", ctx.author, membro)
             await ctx.send(f"🔊 {membro.display_name} foi desmutado com sucesso!")
 
         except discord.Forbidden:
@@ -349,7 +428,7 @@ class Moderacao(commands.Cog):
 
         try:
             await membro.kick(reason=f"Expulso por {ctx.author}: {motivo}")
-            self.adicionar_historico("Kick", ctx.author, membro, motivo)
+            await self.adicionar_historico("Kick", ctx.author, membro, motivo)
 
             embed = discord.Embed(
                 title="🦶 Membro Expulso",
@@ -380,7 +459,7 @@ class Moderacao(commands.Cog):
 
         try:
             await membro.ban(reason=f"Banido por {ctx.author}: {motivo}", delete_message_days=1)
-            self.adicionar_historico("Ban", ctx.author, membro, motivo)
+            await self.adicionar_historico("Ban", ctx.author, membro, motivo)
 
             embed = discord.Embed(
                 title="🔨 Membro Banido",
@@ -404,7 +483,7 @@ class Moderacao(commands.Cog):
         try:
             user = await self.bot.fetch_user(user_id)
             await ctx.guild.unban(user, reason=f"Desbanido por {ctx.author}")
-            self.adicionar_historico("Unban", ctx.author, user)
+            await self.adicionar_historico("Unban", ctx.author, user)
             await ctx.send(f"✅ {user} foi desbanido com sucesso!")
 
         except discord.NotFound:
@@ -436,34 +515,64 @@ class Moderacao(commands.Cog):
 
     @commands.command()
     @commands.has_permissions(kick_members=True)
-    async def historico(self, ctx, membro: discord.Member = None, limite: int = 10):
-        """Mostra o histórico de moderação"""
+    async def historico(self, ctx, membro: typing.Optional[discord.Member] = None, limite: int = 10, cursor: int = None):
+        """Mostra o histórico de moderação (use o cursor do rodapé para a próxima página)"""
+        titulo = "📋 Histórico de Moderação" + (f" - {membro.display_name}" if membro else "")
+        proximo = f"!historico {membro.mention} {min(limite, 25)}" if membro else f"!historico {min(limite, 25)}"
+        await self._enviar_historico(
+            ctx, titulo, proximo, limite, cursor,
+            usuario_id=membro.id if membro else None,
+            usuario_nome=str(membro) if membro else None
+        )
+
+    @commands.command()
+    @commands.has_permissions(kick_members=True)
+    async def historicomod(self, ctx, moderador: discord.Member, limite: int = 10, cursor: int = None):
+        """Mostra as ações feitas por um moderador"""
+        await self._enviar_historico(
+            ctx, f"📋 Ações de {moderador.display_name}",
+            f"!historicomod {moderador.mention} {min(limite, 25)}", limite, cursor,
+            moderador_id=moderador.id, moderador_nome=str(moderador)
+        )
+
+    @commands.command()
+    @commands.has_permissions(kick_members=True)
+    async def historicoacao(self, ctx, acao: str, limite: int = 10, cursor: int = None):
+        """Mostra o histórico de um tipo de ação (Aviso, Mute, Kick, Ban...)"""
+        # Ações desconhecidas (como as importadas da versão antiga) são buscadas como foram digitadas
+        acao = ACOES_HISTORICO.get(acao.lower(), acao)
+        argumento = f'"{acao}"' if " " in acao else acao
+        await self._enviar_historico(
+            ctx, f"📋 Histórico de Moderação - {acao}",
+            f"!historicoacao {argumento} {min(limite, 25)}", limite, cursor,
+            acao=acao
+        )
+
+    async def _enviar_historico(self, ctx, titulo, proximo, limite, cursor, **filtros):
         if limite > 25:
             limite = 25
+        if limite < 1:
+            limite = 1
 
-        historico = self.dados_moderacao["historico"]
-        if membro:
-            historico = [h for h in historico if h["usuario"] == str(membro)]
+        entradas, proximo_cursor = await self.historico_mod.buscar(
+            ctx.guild.id, cursor=cursor, limite=limite, **filtros
+        )
 
-        if not historico:
+        if not entradas:
             await ctx.send("📋 Nenhum histórico encontrado.")
             return
 
-        # Pegar os últimos registros
-        historico_recente = historico[-limite:]
-        historico_recente.reverse()
-
         embed = discord.Embed(
-            title=f"📋 Histórico de Moderação" + (f" - {membro.display_name}" if membro else ""),
+            title=titulo,
             color=discord.Color.blue(),
             timestamp=datetime.now()
         )
 
-        for i, entrada in enumerate(historico_recente, 1):
-            data = datetime.fromisoformat(entrada["timestamp"]).strftime("%d/%m %H:%M")
+        for entrada in entradas:
+            data = datetime.fromtimestamp(entrada["timestamp"]).strftime("%d/%m %H:%M")
             usuario = entrada["usuario"].split("#")[0] if "#" in entrada["usuario"] else entrada["usuario"]
             moderador = entrada["moderador"].split("#")[0] if "#" in entrada["moderador"] else entrada["moderador"]
-            
+
             valor = f"**Usuário:** {usuario}\n**Moderador:** {moderador}\n**Data:** {data}"
             if entrada.get("motivo"):
                 valor += f"\n**Motivo:** {entrada['motivo']}"
@@ -471,11 +580,14 @@ class Moderacao(commands.Cog):
                 valor += f"\n**Duração:** {entrada['duracao']}"
 
             embed.add_field(
-                name=f"{entrada['acao']} #{i}",
+                name=f"{entrada['acao']} #{entrada['id']}",
                 value=valor,
                 inline=False
             )
 
+        if proximo_cursor is not None:
+            embed.set_footer(text=f"Próxima página: {proximo} {proximo_cursor}")
+
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -511,7 +623,6 @@ class Moderacao(commands.Cog):
                 canal = self.bot.get_channel(canal_id)
                 if canal:
                     self.dados_moderacao["configuracoes"]["canal_logs"] = canal_id
-                    self.salvar_dados()
                     await ctx.send(f"✅ Canal de logs configurado para {valor}")
                 else:
                     await ctx.send("❌ Canal não encontrado!")
@@ -523,7 +634,6 @@ class Moderacao(commands.Cog):
                 max_avisos = int(valor)
                 if max_avisos > 0:
                     self.dados_moderacao["configuracoes"]["max_avisos"] = max_avisos
-                    self.salvar_dados()
                     await ctx.send(f"✅ Máximo de avisos configurado para {max_avisos}")
                 else:
                     await ctx.send("❌ Valor deve ser maior que 0!")
@@ -542,12 +652,12 @@ class Moderacao(commands.Cog):
         else:
             await ctx.send("❌ Opção inválida! Use: canal_logs, max_avisos, auto_punir")
 
-        self.salvar_dados()
+        await self.salvar_dados(config=True)
 
     @commands.Cog.listener()
     async def on_ready(self):
         """Evento chamado quando o bot fica online"""
-        print(f"Sistema de Moderação carregado! Arquivo: {self.arquivo_moderacao}")
+        print("Sistema de Moderação carregado!")
 
 async def setup(bot):
     await bot.add_cog(Moderacao(bot))
\ No newline at end of file
@@ -1,28 +1,25 @@
 import discord
 from discord.ext import commands
-import json
-import os
 
-CAMINHO_ARQUIVO = "data/logs.json"
+from cogs._armazenamento import obter_armazenamento
 
-def carregar_logs():
-    if not os.path.exists(CAMINHO_ARQUIVO):
-        return {}
-    with open(CAMINHO_ARQUIVO, "r", encoding="utf-8") as f:
-        return json.load(f)
+async def carregar_logs(armazenamento):
+    return await armazenamento.carregar("logs")
 
-def salvar_logs(logs):
-    os.makedirs("data", exist_ok=True)
-    with open(CAMINHO_ARQUIVO, "w", encoding="utf-8") as f:
-        json.dump(logs, f, indent=4, ensure_ascii=False)
+async def salvar_logs(armazenamento, logs, guild_id):
+    await armazenamento.salvar("logs", {guild_id: logs[guild_id]})
 
 class PainelLogs(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.logs = carregar_logs()
+        self.armazenamento = obter_armazenamento()
+        self.logs = {}
 
-    def salvar(self):
-        salvar_logs(self.logs)
+    async def cog_load(self):
+        self.logs = await carregar_logs(self.armazenamento)
+
+    async def salvar(self, guild_id):
+        await salvar_logs(self.armazenamento, self.logs, guild_id)
 
     @commands.command(name="setlogcanal")
     @commands.has_permissions(manage_guild=True)
@@ -32,7 +29,7 @@ class PainelLogs(commands.Cog):
             self.logs[guild_id] = {}
 
         self.logs[guild_id]["log_channel"] = canal.id
-        self.salvar()
+        await self.salvar(guild_id)
 
         await ctx.send(f"✅ Canal de logs configurado para {canal.mention}.")
 
@@ -1,25 +1,27 @@
 import discord
 from discord.ext import commands
-import json
-import os
 from datetime import datetime
 
-ARQUIVO = 'aniversarios.json'
+from cogs._armazenamento import obter_armazenamento
 
 class Aniversarios(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.dados = self.carregar_dados()
+        self.armazenamento = obter_armazenamento()
+        self.dados = {}
 
-    def carregar_dados(self):
-        if os.path.exists(ARQUIVO):
-            with open(ARQUIVO, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+    async def cog_load(self):
+        self.dados = await self.carregar_dados()
 
-    def salvar_dados(self):
-        with open(ARQUIVO, 'w', encoding='utf-8') as f:
-            json.dump(self.dados, f, indent=4, ensure_ascii=False)
+    async def carregar_dados(self):
+        dados = {}
+        for chave, registro in (await self.armazenamento.carregar("aniversarios")).items():
+            guild_id, user_id = chave.split(":", 1)
+            dados.setdefault(guild_id, {})[user_id] = registro
+        return dados
+
+    async def salvar_dados(self, guild_id, user_id):
+        await self.armazenamento.salvar("aniversarios", {f"{guild_id}:{user_id}": self.dados[guild_id][user_id]})
 
     @commands.command(name="setaniversario")
     async def setar_aniversario(self, ctx, data: str):
@@ -40,7 +42,7 @@ class Aniversarios(commands.Cog):
             "nome": ctx.author.name,
             "data": data
         }
-        self.salvar_dados()
+        await self.salvar_dados(guild_id, user_id)
         await ctx.send(f"🎉 Aniversário registrado como `{data}` para {ctx.author.mention}!")
 
     @commands.command(name="veraniversarios")
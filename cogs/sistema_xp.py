@@ -1,156 +1,280 @@
 import discord
 from discord.ext import commands
-import json
 import os
-import random
 import asyncio
-from datetime import datetime, timedelta
-
-CAMINHO_XP = "data/xp.json"
-
-def carregar_dados():
-    if not os.path.exists(CAMINHO_XP):
-        return {}
-    with open(CAMINHO_XP, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def salvar_dados(dados):
-    with open(CAMINHO_XP, "w", encoding="utf-8") as f:
-        json.dump(dados, f, indent=4, ensure_ascii=False)
+import time
+import typing
+from dataclasses import replace
+
+from cogs._anuncios import FilaAnuncios
+from cogs._armazenamento import obter_armazenamento
+from cogs._backfill_xp import BackfillXP
+from cogs._cooldowns import Cooldowns
+from cogs._gravacao import GravacaoAtrasada
+from cogs._metricas import medir_listener, tamanho_cache, remover_cache
+from cogs._ranking import Ranking
+from cogs._regras_xp import CHAVES_CONFIG, ConfigXP, aplicar_mensagem
+from cogs._tabela_xp import TAMANHO_BLOCO, CAMPOS, RegistroXP, TabelaXP, gravar_blocos, ler_blocos
+from cogs._vip import IndiceVip, para_epoch
+
+# Gravação em segundo plano: a cada X segundos ou quando houver Y blocos de membros alterados
+INTERVALO_GRAVACAO = float(os.getenv("XP_INTERVALO_GRAVACAO", 30))
+LIMITE_SUJOS = int(os.getenv("XP_LIMITE_SUJOS", 200))
+
+# Máximo de cooldowns guardados em memória ao mesmo tempo
+LIMITE_COOLDOWNS = int(os.getenv("XP_LIMITE_COOLDOWNS", 100_000))
+
+# Level ups de um canal são agrupados nessa janela (segundos) em uma única mensagem
+JANELA_ANUNCIOS = float(os.getenv("XP_JANELA_ANUNCIOS", 3))
+
+async def carregar_tabelas(armazenamento):
+    """Lê os blocos binários de todas as guilds: {guild_id (str): TabelaXP}"""
+    tabelas = {}
+    for gid, blocos in (await armazenamento.executar(ler_blocos)).items():
+        try:
+            tabelas[str(gid)] = TabelaXP.desserializar(blocos)
+        except ValueError as e:
+            raise ValueError(f"XP da guild {gid} corrompido: {e}") from e
+    return tabelas
+
+def blocos_serializados(tabelas, chaves):
+    """[(guild_id, bloco, bytes)] dos blocos (guild_id, bloco) informados"""
+    return [
+        (int(gid), bloco, tabelas[gid].serializar_bloco(bloco))
+        for gid, bloco in chaves if gid in tabelas
+    ]
 
 class SistemaXP(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.dados = carregar_dados()
-        self.cooldowns = {}  # user_id: datetime
-
-    def salvar(self):
-        salvar_dados(self.dados)
-
-    def get_config(self):
-        if "config" not in self.dados:
-            self.dados["config"] = {
-                "mensagens_por_xp": 10,
-                "xp_base": 10,
-                "xp_por_nivel": 10,
-                "cooldown": 60,
-                # Configurações VIP
-                "vip_multiplicador_xp": 2.0,
-                "vip_reducao_cooldown": 0.5,  # 50% de redução
-                "vip_bonus_nivel": 1.5,  # Bônus no cálculo de XP necessário
-                "vip_mensagens_bonus": 5  # A cada 5 mensagens ganha XP extra
-            }
-        return self.dados["config"]
+        self.armazenamento = obter_armazenamento()
+        self.config_global = None  # Valores padrão de todas as guilds
+        self.tabelas = {}  # guild_id (str): TabelaXP
+        self.cooldowns = Cooldowns(limite=LIMITE_COOLDOWNS, nome="xp")  # (guild, usuário), expiram sozinhos
+        self.rankings = {}  # guild_id: Ranking, montado na primeira consulta
+        self.config_guilds = {}  # guild_id (str): overrides definidos pelos comandos !set*
+        self.configs = {}  # guild_id: ConfigXP montada
+        self.backfill = {}  # guild_id: BackfillXP em andamento
+        self.vips = IndiceVip("xp", ao_expirar=self._vips_expirados, bot=bot)  # chaves (gid, uid)
+        self.anuncios = FilaAnuncios(
+            janela=JANELA_ANUNCIOS,
+            titulo_resumo="📈 Level Up!",
+            cor_resumo=discord.Color.green(),
+            nome="level_up"
+        )
+
+        self.gravacao = GravacaoAtrasada(
+            self._gravar_sujos,
+            intervalo=INTERVALO_GRAVACAO,
+            limite_sujos=LIMITE_SUJOS,
+            nome="xp"
+        )
+
+    async def cog_load(self):
+        self.config_global = await self.armazenamento.obter("config", "xp")
+        self.tabelas = await carregar_tabelas(self.armazenamento)
+        await self._importar_legado()
+        self.config_guilds = await self.armazenamento.carregar("xp_config")
+        await self._carregar_vips()
+        await self._retomar_backfills()
+        self.gravacao.iniciar()
+        self.vips.iniciar()
+        tamanho_cache("xp_usuarios", lambda: sum(len(tabela) for tabela in self.tabelas.values()))
+        tamanho_cache("xp_cooldowns", lambda: len(self.cooldowns))
+        tamanho_cache("xp_rankings", lambda: len(self.rankings))
+
+    async def cog_unload(self):
+        for nome in ("xp_usuarios", "xp_cooldowns", "xp_rankings"):
+            remover_cache(nome)
+        for backfill in self.backfill.values():
+            backfill.tarefa.cancel()
+        await self.anuncios.parar()
+        await self.vips.parar()
+        await self.gravacao.parar()
+
+    async def _importar_legado(self):
+        """Passa os registros JSON da versão anterior (coleção "xp") para as tabelas"""
+        legado = await self.armazenamento.carregar("xp")
+        if not legado:
+            return
+
+        guilds = set()
+        for chave, registro in legado.items():
+            gid, uid = chave.split(":", 1)
+            if not uid.isdigit():
+                continue
+            valores = {campo: registro[campo] for campo in CAMPOS if campo in registro}
+            # Formato antigo: expiração em texto ISO (UTC)
+            valores["vip_expira"] = para_epoch(valores.get("vip_expira"), utc=True)
+            self.get_tabela(gid).registro(uid).update(**valores)
+            guilds.add(gid)
+
+        blocos = blocos_serializados(
+            self.tabelas, [(gid, bloco) for gid in guilds for bloco in range(self.tabelas[gid].blocos)]
+        )
+        # Os blocos novos e a remoção dos registros antigos vão na mesma transação
+        await self.armazenamento.gravar(
+            [("xp", chave, None) for chave in legado],
+            extra=lambda conexao: gravar_blocos(conexao, blocos)
+        )
+        print(f"✅ {len(legado)} registros de XP convertidos para {len(blocos)} blocos binários")
+
+    async def _retomar_backfills(self):
+        """Volta a registrar e a executar os backfills que uma reinicialização interrompeu"""
+        for guild_id in await BackfillXP.pendentes(self.armazenamento):
+            # A guild de verdade só existe depois do ready; até lá as mensagens novas já entram no backfill
+            backfill = await BackfillXP.retomar(self.armazenamento, discord.Object(guild_id))
+            self.backfill[guild_id] = backfill
+            backfill.tarefa = asyncio.create_task(self._continuar_backfill(backfill))
+
+    async def _continuar_backfill(self, backfill):
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(backfill.guild.id)
+        if guild is None:
+            # O bot saiu da guild: o progresso fica salvo para o !xpbackfillcancelar
+            del self.backfill[backfill.guild.id]
+            return
+        backfill.guild = guild
+        print(f"📚 Retomando o backfill de XP da guild {guild.id} ({backfill.canais_concluidos} canais já concluídos)")
+        await self._executar_backfill(guild, backfill)
+
+    async def _carregar_vips(self):
+        for gid, tabela in self.tabelas.items():
+            for user_id, expira in tabela.vips():
+                await self.vips.definir((gid, str(user_id)), expira)
+
+    async def _vips_expirados(self, chaves):
+        """Desliga de uma vez o VIP de todos os usuários que expiraram"""
+        por_guild = {}
+        for gid, uid in chaves:
+            por_guild.setdefault(gid, []).append(int(uid))
+        for gid, user_ids in por_guild.items():
+            tabela = self.tabelas.get(gid)
+            if tabela is not None:
+                self.marcar_linhas(gid, tabela.desligar_vip(user_ids))
+
+    def salvar(self, guild_id=None, user_id=None):
+        """Marca o bloco de um membro (ou a config, sem argumentos) para a próxima gravação"""
+        if guild_id is None:
+            self.gravacao.marcar(("config", None))
+        else:
+            gid = str(guild_id)
+            self.gravacao.marcar((gid, self.tabelas[gid].procurar(user_id) // TAMANHO_BLOCO))
+
+    def marcar_linhas(self, gid, linhas):
+        for bloco in {linha // TAMANHO_BLOCO for linha in linhas.tolist()}:
+            self.gravacao.marcar((gid, bloco))
+
+    async def _gravar_sujos(self, chaves):
+        alteracoes = []
+        blocos = []
+        for gid, bloco in chaves:
+            if bloco is None:
+                alteracoes.append(("config", "xp", self.config_global))
+            else:
+                blocos.append((gid, bloco))
+        if not alteracoes and not blocos:
+            return
+        blocos = blocos_serializados(self.tabelas, blocos)
+        await self.armazenamento.gravar(alteracoes, extra=lambda conexao: gravar_blocos(conexao, blocos))
+
+    def get_config_global(self):
+        """Valores padrão de todas as guilds (a config antiga, antes dos overrides por guild)"""
+        if self.config_global is None:
+            self.config_global = {chave: getattr(ConfigXP(), chave) for chave in CHAVES_CONFIG}
+        return self.config_global
+
+    def get_config(self, guild_id):
+        config = self.configs.get(guild_id)
+        if config is None:
+            config = self.configs[guild_id] = ConfigXP.montar(
+                self.get_config_global(), self.config_guilds.get(str(guild_id), {})
+            )
+        return config
+
+    async def definir_config(self, guild_id, chave, valor):
+        """Grava um override da guild e descarta a config montada para ela"""
+        gid = str(guild_id)
+        overrides = self.config_guilds.setdefault(gid, {})
+        overrides[chave] = valor
+        self.configs.pop(guild_id, None)
+        await self.armazenamento.salvar("xp_config", {gid: overrides})
+
+    def get_tabela(self, guild_id):
+        gid = str(guild_id)
+        tabela = self.tabelas.get(gid)
+        if tabela is None:
+            tabela = self.tabelas[gid] = TabelaXP()
+        return tabela
 
     def get_usuario(self, guild_id, user_id):
+        """Registro do membro (lê e escreve direto nas colunas da tabela da guild)"""
+        tabela = self.get_tabela(guild_id)
+        linha = tabela.procurar(user_id)
+        if linha is None:
+            linha = tabela.linha(user_id)
+            # Linha nova (até pelo !xp): sem gravar o bloco, ela sumiria na reinicialização
+            self.gravacao.marcar((str(guild_id), linha // TAMANHO_BLOCO))
+        return RegistroXP(tabela, linha)
+
+    def get_ranking(self, guild_id):
+        """Ranking (nível, XP) da guild, atualizado incrementalmente a cada ganho de XP"""
         gid = str(guild_id)
-        uid = str(user_id)
-        if gid not in self.dados:
-            self.dados[gid] = {}
-        if uid not in self.dados[gid]:
-            self.dados[gid][uid] = {
-                "xp": 0,
-                "nivel": 1,
-                "mensagens": 0,
-                "vip": False,
-                "vip_expira": None  # Timestamp para quando o VIP expira
-            }
-        return self.dados[gid][uid]
-
-    def is_vip_ativo(self, usuario):
-        """Verifica se o usuário tem VIP ativo"""
-        if not usuario.get("vip", False):
-            return False
-        
-        # Se não tem data de expiração, é VIP permanente
-        if not usuario.get("vip_expira"):
-            return True
-            
-        # Verifica se ainda não expirou
-        expira = datetime.fromisoformat(usuario["vip_expira"])
-        return datetime.utcnow() < expira
-
-    def get_multiplicador_xp(self, usuario):
-        """Retorna o multiplicador de XP baseado no status VIP"""
-        if self.is_vip_ativo(usuario):
-            return self.get_config()["vip_multiplicador_xp"]
-        return 1.0
-
-    def get_cooldown_usuario(self, usuario):
-        """Retorna o cooldown baseado no status VIP"""
-        config = self.get_config()
-        cooldown_base = config["cooldown"]
-        
-        if self.is_vip_ativo(usuario):
-            return int(cooldown_base * config["vip_reducao_cooldown"])
-        return cooldown_base
+        if gid not in self.rankings:
+            self.rankings[gid] = Ranking(self.get_tabela(gid).pares_ranking())
+        return self.rankings[gid]
+
+    def is_vip_ativo(self, guild_id, user_id):
+        """Verifica se o usuário tem VIP ativo (as expirações são tratadas em segundo plano)"""
+        return (str(guild_id), str(user_id)) in self.vips
 
     @commands.Cog.listener()
+    @medir_listener
     async def on_message(self, message):
         if message.author.bot or not message.guild:
             return
 
         user_id = message.author.id
-        now = datetime.utcnow()
         usuario = self.get_usuario(message.guild.id, user_id)
+        config = self.get_config(message.guild.id)
+        is_vip = self.is_vip_ativo(message.guild.id, user_id)
+
+        backfill = self.backfill.get(message.guild.id)
+        if backfill is not None:
+            # Mensagens novas também entram no resultado do backfill em andamento
+            backfill.registrar_ao_vivo(user_id, message.created_at.timestamp())
 
         # Cooldown personalizado baseado no status VIP
-        cooldown = self.get_cooldown_usuario(usuario)
-        last = self.cooldowns.get(user_id)
-        if last and now - last < timedelta(seconds=cooldown):
+        if not self.cooldowns.tentar(message.guild.id, user_id, config.cooldown_para(is_vip)):
             return
 
-        self.cooldowns[user_id] = now
-        usuario["mensagens"] += 1
-
-        config = self.get_config()
-        xp_ganho = 0
-        is_vip = self.is_vip_ativo(usuario)
-
-        # Ganho de XP normal
-        if usuario["mensagens"] % config["mensagens_por_xp"] == 0:
-            xp_base = config["xp_base"]
-            multiplicador = self.get_multiplicador_xp(usuario)
-            xp_ganho = int(xp_base * multiplicador)
-            usuario["xp"] += xp_ganho
-
-        # Bônus VIP: XP extra a cada X mensagens
-        if is_vip and usuario["mensagens"] % config["vip_mensagens_bonus"] == 0:
-            bonus_xp = int(config["xp_base"] * 0.5)  # 50% do XP base como bônus
-            usuario["xp"] += bonus_xp
-            xp_ganho += bonus_xp
-
-        # Verificar level up
-        if xp_ganho > 0:
-            xp_necessario = config["xp_por_nivel"] * usuario["nivel"]
-            
-            # Bônus VIP: XP necessário ligeiramente reduzido
+        _, subiu = aplicar_mensagem(usuario, config, is_vip)
+
+        if subiu:
+            # Embed de level up diferenciado para VIP
             if is_vip:
-                xp_necessario = int(xp_necessario / config["vip_bonus_nivel"])
-
-            if usuario["xp"] >= xp_necessario:
-                usuario["xp"] -= xp_necessario
-                usuario["nivel"] += 1
-
-                # Embed de level up diferenciado para VIP
-                if is_vip:
-                    embed = discord.Embed(
-                        title="✨ VIP Level Up! ✨",
-                        description=f"{message.author.mention} subiu para o **nível {usuario['nivel']}**!\n💎 *Benefício VIP ativo*",
-                        color=discord.Color.gold()
-                    )
-                    embed.set_footer(text="⭐ Status VIP ativo")
-                else:
-                    embed = discord.Embed(
-                        title="📈 Level Up!",
-                        description=f"{message.author.mention} subiu para o **nível {usuario['nivel']}**!",
-                        color=discord.Color.green()
-                    )
-                
-                embed.set_thumbnail(url=message.author.avatar.url if message.author.avatar else None)
-                await message.channel.send(embed=embed)
+                embed = discord.Embed(
+                    title="✨ VIP Level Up! ✨",
+                    description=f"{message.author.mention} subiu para o **nível {usuario['nivel']}**!\n💎 *Benefício VIP ativo*",
+                    color=discord.Color.gold()
+                )
+                embed.set_footer(text="⭐ Status VIP ativo")
+            else:
+                embed = discord.Embed(
+                    title="📈 Level Up!",
+                    description=f"{message.author.mention} subiu para o **nível {usuario['nivel']}**!",
+                    color=discord.Color.green()
+                )
+            
+            embed.set_thumbnail(url=message.author.avatar.url if message.author.avatar else None)
+            resumo = f"{'✨ ' if is_vip else ''}{message.author.mention} → nível **{usuario['nivel']}**"
+            self.anuncios.anunciar(message.channel, user_id, embed, resumo)
 
-        self.salvar()
+        ranking = self.rankings.get(str(message.guild.id))
+        if ranking is not None:
+            ranking.atualizar(user_id, usuario["nivel"], usuario["xp"])
+
+        self.salvar(message.guild.id, user_id)
 
     @commands.command(name="xp")
     async def ver_xp(self, ctx, membro: discord.Member = None):
@@ -159,14 +283,10 @@ class SistemaXP(commands.Cog):
         nivel = usuario["nivel"]
         xp = usuario["xp"]
         mensagens = usuario["mensagens"]
-        is_vip = self.is_vip_ativo(usuario)
-        
-        config = self.get_config()
-        xp_max = config["xp_por_nivel"] * nivel
+        is_vip = self.is_vip_ativo(ctx.guild.id, membro.id)
         
-        # Ajustar XP necessário se for VIP
-        if is_vip:
-            xp_max = int(xp_max / config["vip_bonus_nivel"])
+        config = self.get_config(ctx.guild.id)
+        xp_max = config.xp_necessario(nivel, is_vip)
 
         porcentagem = int((xp / xp_max) * 10) if xp_max > 0 else 0
         barra = "█" * porcentagem + "░" * (10 - porcentagem)
@@ -184,20 +304,17 @@ class SistemaXP(commands.Cog):
         embed.add_field(name="Progresso", value=f"[{barra}] {int((xp / xp_max) * 100) if xp_max > 0 else 0}%", inline=False)
         
         if is_vip:
-            multiplicador = config["vip_multiplicador_xp"]
-            cooldown_reduzido = int(config["cooldown"] * config["vip_reducao_cooldown"])
             embed.add_field(
                 name="💎 Benefícios VIP",
-                value=f"• {multiplicador}x XP\n• Cooldown: {cooldown_reduzido}s\n• Bônus a cada {config['vip_mensagens_bonus']} msgs",
+                value=f"• {config.vip_multiplicador_xp}x XP\n• Cooldown: {config.cooldown_vip}s\n• Bônus a cada {config.vip_mensagens_bonus} msgs",
                 inline=False
             )
             
             # Mostrar data de expiração se tiver
             if usuario.get("vip_expira"):
-                expira = datetime.fromisoformat(usuario["vip_expira"])
                 embed.add_field(
                     name="⏰ VIP expira em",
-                    value=f"<t:{int(expira.timestamp())}:R>",
+                    value=f"<t:{usuario['vip_expira']}:R>",
                     inline=False
                 )
 
@@ -205,29 +322,24 @@ class SistemaXP(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command(name="topxp")
-    async def top_xp(self, ctx):
+    async def top_xp(self, ctx, pagina: int = 1):
         gid = str(ctx.guild.id)
-        if gid not in self.dados:
+        if not self.tabelas.get(gid):
             return await ctx.send("Nenhum dado de XP encontrado.")
 
-        usuarios = []
-        for uid, info in self.dados[gid].items():
-            try:
-                user_id = int(uid)
-                is_vip = self.is_vip_ativo(info)
-                usuarios.append((user_id, info["nivel"], info["xp"], is_vip))
-            except ValueError:
-                continue
-                
-        top = sorted(usuarios, key=lambda x: (x[1], x[2]), reverse=True)[:10]
+        ranking = self.get_ranking(ctx.guild.id)
+        total_paginas = max(1, (len(ranking) + 9) // 10)
+        pagina = min(max(pagina, 1), total_paginas)
+        top = ranking.pagina(pagina, 10)
 
         embed = discord.Embed(title="🏆 Top XP do Servidor", color=discord.Color.gold())
         
-        for i, (uid, nivel, xp, is_vip) in enumerate(top, start=1):
+        for i, (uid, nivel, xp) in enumerate(top, start=(pagina - 1) * 10 + 1):
             membro = ctx.guild.get_member(uid)
             nome = membro.display_name if membro else f"<Usuário {uid}>"
             
             # Adicionar indicador VIP
+            is_vip = self.is_vip_ativo(gid, uid)
             vip_indicator = " ✨" if is_vip else ""
             emoji = "👑" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "▫️"
             
@@ -237,8 +349,29 @@ class SistemaXP(commands.Cog):
                 inline=False
             )
 
+        posicao = ranking.posicao(ctx.author.id)
+        rodape = f"Página {pagina}/{total_paginas}"
+        if posicao:
+            rodape += f" • Sua posição: {posicao}º de {len(ranking)}"
+        embed.set_footer(text=rodape)
+
         await ctx.send(embed=embed)
 
+    @commands.command(name="rankxp", aliases=["posicaoxp"])
+    async def rank_xp(self, ctx, membro: discord.Member = None):
+        """Mostra a posição de um membro no ranking de XP do servidor."""
+        membro = membro or ctx.author
+        ranking = self.get_ranking(ctx.guild.id)
+        posicao = ranking.posicao(membro.id)
+        if posicao is None:
+            return await ctx.send(f"📭 {membro.display_name} ainda não está no ranking de XP.")
+
+        usuario = self.get_usuario(ctx.guild.id, membro.id)
+        await ctx.send(
+            f"🏆 {membro.display_name} está em **{posicao}º** de {len(ranking)} "
+            f"(Nível {usuario['nivel']} | {usuario['xp']} XP)"
+        )
+
     # Comandos de administração VIP
     @commands.command(name="addvip")
     @commands.has_permissions(administrator=True)
@@ -248,14 +381,14 @@ class SistemaXP(commands.Cog):
         usuario["vip"] = True
         
         if dias:
-            expira = datetime.utcnow() + timedelta(days=dias)
-            usuario["vip_expira"] = expira.isoformat()
+            usuario["vip_expira"] = int(time.time()) + dias * 86400
             await ctx.send(f"✨ VIP adicionado para {membro.mention} por {dias} dias!")
         else:
             usuario["vip_expira"] = None
             await ctx.send(f"✨ VIP permanente adicionado para {membro.mention}!")
         
-        self.salvar()
+        await self.vips.definir((str(ctx.guild.id), str(membro.id)), usuario["vip_expira"])
+        self.salvar(ctx.guild.id, membro.id)
 
     @commands.command(name="removevip")
     @commands.has_permissions(administrator=True)
@@ -264,32 +397,28 @@ class SistemaXP(commands.Cog):
         usuario = self.get_usuario(ctx.guild.id, membro.id)
         usuario["vip"] = False
         usuario["vip_expira"] = None
+        await self.vips.remover((str(ctx.guild.id), str(membro.id)))
         await ctx.send(f"❌ VIP removido de {membro.mention}.")
-        self.salvar()
+        self.salvar(ctx.guild.id, membro.id)
 
     @commands.command(name="listvips")
     @commands.has_permissions(administrator=True)
     async def list_vips(self, ctx):
         """Lista todos os usuários VIP do servidor."""
         gid = str(ctx.guild.id)
-        if gid not in self.dados:
+        if not self.tabelas.get(gid):
             return await ctx.send("Nenhum dado encontrado.")
 
         vips = []
-        for uid, info in self.dados[gid].items():
-            if self.is_vip_ativo(info):
-                try:
-                    user_id = int(uid)
-                    membro = ctx.guild.get_member(user_id)
-                    nome = membro.display_name if membro else f"<Usuário {uid}>"
-                    
-                    if info.get("vip_expira"):
-                        expira = datetime.fromisoformat(info["vip_expira"])
-                        vips.append(f"• {nome} - Expira <t:{int(expira.timestamp())}:R>")
-                    else:
-                        vips.append(f"• {nome} - Permanente")
-                except ValueError:
-                    continue
+        for user_id, expira in self.tabelas[gid].vips():
+            if self.is_vip_ativo(gid, user_id):
+                membro = ctx.guild.get_member(user_id)
+                nome = membro.display_name if membro else f"<Usuário {user_id}>"
+
+                if expira:
+                    vips.append(f"• {nome} - Expira <t:{expira}:R>")
+                else:
+                    vips.append(f"• {nome} - Permanente")
 
         if not vips:
             return await ctx.send("Nenhum usuário VIP ativo.")
@@ -302,64 +431,220 @@ class SistemaXP(commands.Cog):
     @commands.command(name="verxpconfig")
     @commands.has_permissions(administrator=True)
     async def ver_config(self, ctx):
-        config = self.get_config()
+        config = self.get_config(ctx.guild.id)
         embed = discord.Embed(title="⚙️ Configurações de XP", color=discord.Color.blue())
-        embed.add_field(name="Mensagens por XP", value=config["mensagens_por_xp"], inline=True)
-        embed.add_field(name="XP Base", value=config["xp_base"], inline=True)
-        embed.add_field(name="Multiplicador por Nível", value=config["xp_por_nivel"], inline=True)
-        embed.add_field(name="Cooldown (segundos)", value=config["cooldown"], inline=True)
+        embed.add_field(name="Mensagens por XP", value=config.mensagens_por_xp, inline=True)
+        embed.add_field(name="XP Base", value=config.xp_base, inline=True)
+        embed.add_field(name="Multiplicador por Nível", value=config.xp_por_nivel, inline=True)
+        embed.add_field(name="Cooldown (segundos)", value=config.cooldown, inline=True)
         
         # Configurações VIP
-        embed.add_field(name="✨ VIP Multiplicador XP", value=f"{config['vip_multiplicador_xp']}x", inline=True)
-        embed.add_field(name="✨ VIP Redução Cooldown", value=f"{int(config['vip_reducao_cooldown']*100)}%", inline=True)
-        embed.add_field(name="✨ VIP Bonus Nível", value=f"{config['vip_bonus_nivel']}x", inline=True)
-        embed.add_field(name="✨ VIP Mensagens Bonus", value=config["vip_mensagens_bonus"], inline=True)
+        embed.add_field(name="✨ VIP Multiplicador XP", value=f"{config.vip_multiplicador_xp}x", inline=True)
+        embed.add_field(name="✨ VIP Redução Cooldown", value=f"{int(config.vip_reducao_cooldown*100)}%", inline=True)
+        embed.add_field(name="✨ VIP Bonus Nível", value=f"{config.vip_bonus_nivel}x", inline=True)
+        embed.add_field(name="✨ VIP Mensagens Bonus", value=config.vip_mensagens_bonus, inline=True)
+
+        sobrescritos = self.config_guilds.get(str(ctx.guild.id))
+        if sobrescritos:
+            embed.set_footer(text="Definidos só para este servidor: " + ", ".join(sorted(sobrescritos)))
         
         await ctx.send(embed=embed)
 
+    @commands.command(name="xpgravacao")
+    @commands.has_permissions(administrator=True)
+    async def ver_gravacao(self, ctx):
+        """Mostra os contadores da gravação em segundo plano do XP."""
+        m = self.gravacao.metricas()
+        embed = discord.Embed(title="💾 Gravação de XP", color=discord.Color.blue())
+        embed.add_field(name="Gravações", value=m["gravacoes"], inline=True)
+        embed.add_field(name="Registros gravados", value=m["registros_gravados"], inline=True)
+        embed.add_field(name="Pendentes", value=m["pendentes"], inline=True)
+        embed.add_field(name="Última latência", value=f"{m['ultima_latencia'] * 1000:.1f}ms", inline=True)
+        embed.add_field(name="Latência média", value=f"{m['latencia_media'] * 1000:.1f}ms", inline=True)
+        embed.add_field(name="Latência máxima", value=f"{m['latencia_maxima'] * 1000:.1f}ms", inline=True)
+        if m["falhas"]:
+            embed.add_field(name="Falhas", value=m["falhas"], inline=True)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="xpbackfill")
+    @commands.has_permissions(administrator=True)
+    async def xp_backfill(self, ctx, dias: int = None):
+        """Calcula o XP a partir do histórico dos canais (retoma um backfill interrompido)."""
+        backfill = self.backfill.get(ctx.guild.id)
+        if backfill is not None and backfill.tarefa.done():
+            # Parou com erro, mas continuou registrando as mensagens novas: retoma com o mesmo objeto
+            await ctx.send(f"📚 Retomando o backfill ({backfill.canais_concluidos} canais já concluídos).")
+            backfill.tarefa = asyncio.create_task(self._executar_backfill(ctx.guild, backfill, ctx))
+            return
+        if backfill is not None:
+            return await ctx.send(
+                f"⏳ Backfill em andamento: {backfill.canais_concluidos}/{len(backfill.estado['canais'])} canais, "
+                f"{backfill.mensagens_lidas} mensagens lidas nesta execução."
+            )
+
+        backfill = await BackfillXP.retomar(self.armazenamento, ctx.guild)
+        if backfill is None:
+            backfill = BackfillXP(self.armazenamento, ctx.guild)
+            if dias:
+                backfill.estado["desde"] = backfill.estado["corte"] - dias * 86400
+            await ctx.send("📚 Lendo o histórico dos canais. Isso pode demorar; use `!xpbackfill` para ver o progresso.")
+        else:
+            await ctx.send(f"📚 Retomando o backfill ({backfill.canais_concluidos} canais já concluídos).")
+
+        self.backfill[ctx.guild.id] = backfill
+        backfill.tarefa = asyncio.create_task(self._executar_backfill(ctx.guild, backfill, ctx))
+
+    @commands.command(name="xpbackfillcancelar")
+    @commands.has_permissions(administrator=True)
+    async def xp_backfill_cancelar(self, ctx):
+        """Cancela o backfill e apaga o progresso salvo."""
+        backfill = self.backfill.pop(ctx.guild.id, None)
+        if backfill is not None:
+            backfill.tarefa.cancel()
+        else:
+            backfill = await BackfillXP.retomar(self.armazenamento, ctx.guild)
+            if backfill is None:
+                return await ctx.send("Nenhum backfill em andamento.")
+        await backfill.descartar()
+        await ctx.send("🗑️ Backfill cancelado.")
+
+    async def _executar_backfill(self, guild, backfill, ctx=None):
+        gid = str(guild.id)
+        inicio = time.perf_counter()
+        try:
+            await backfill.ler_historico()
+
+            vips = [int(uid) for g, uid in self.vips if g == gid]
+            resultado = await backfill.calcular(self.get_config(guild.id), vips)
+
+            # Substitui o progresso da guild pelo recalculado, mantendo os dados de VIP
+            tabela = self.get_tabela(gid)
+            for user_id, calculado in resultado.items():
+                tabela.registro(user_id).update(
+                    xp=calculado["xp"], nivel=calculado["nivel"], mensagens=calculado["mensagens"]
+                )
+            blocos = blocos_serializados(self.tabelas, [(gid, bloco) for bloco in range(tabela.blocos)])
+            await backfill.descartar(extra=lambda conexao: gravar_blocos(conexao, blocos))
+            self.rankings.pop(gid, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Continua em self.backfill: as mensagens novas seguem entrando até alguém retomar
+            print(f"❌ Erro no backfill de XP da guild {gid}: {e}")
+            if ctx is not None:
+                await ctx.send("❌ O backfill parou com um erro; use `!xpbackfill` para retomar.")
+            return
+
+        if self.backfill.get(guild.id) is backfill:
+            del self.backfill[guild.id]
+        mensagem = (f"✅ Backfill concluído: {len(resultado)} membros atualizados "
+                    f"em {time.perf_counter() - inicio:.0f}s.")
+        if ctx is not None:
+            await ctx.send(mensagem)
+        else:
+            print(f"{mensagem} (guild {gid})")
+
+    async def _operacao_em_massa(self, ctx, descricao, cargo, operacao):
+        """Aplica `operacao(tabela, linhas)` aos membros da guild (ou do cargo) e grava tudo de uma vez"""
+        gid = str(ctx.guild.id)
+        inicio = time.perf_counter()
+        tabela = self.get_tabela(gid)
+        linhas = tabela.selecionar(None if cargo is None else [membro.id for membro in cargo.members])
+        if not len(linhas):
+            return await ctx.send("📭 Nenhum membro com dados de XP para alterar.")
+
+        try:
+            operacao(tabela, linhas)
+        except ValueError as e:
+            return await ctx.send(f"❌ {e}")
+        blocos = blocos_serializados(self.tabelas, [(gid, bloco) for bloco in tabela.blocos_de(linhas)])
+        await self.armazenamento.executar(gravar_blocos, blocos)
+        self.rankings.pop(gid, None)
+
+        alvo = f" do cargo {cargo.name}" if cargo else ""
+        await ctx.send(
+            f"✅ {descricao}: {len(linhas)} membros{alvo} alterados "
+            f"em {(time.perf_counter() - inicio) * 1000:.0f}ms."
+        )
+
+    @commands.command(name="xpreset")
+    @commands.has_permissions(administrator=True)
+    async def xp_reset(self, ctx, cargo: discord.Role = None):
+        """Reinicia a temporada: todos (ou os membros do cargo) voltam ao nível 1."""
+        await self._operacao_em_massa(ctx, "🔄 Temporada reiniciada", cargo, lambda tabela, linhas: tabela.resetar(linhas))
+
+    @commands.command(name="xpdecair")
+    @commands.has_permissions(administrator=True)
+    async def xp_decair(self, ctx, porcentagem: float, cargo: discord.Role = None):
+        """Remove uma porcentagem do XP acumulado (pode baixar o nível)."""
+        if not 0 < porcentagem <= 100:
+            return await ctx.send("❌ A porcentagem precisa estar entre 0 e 100.")
+        config = self.get_config(ctx.guild.id)
+        await self._operacao_em_massa(
+            ctx, f"📉 Decaimento de {porcentagem:g}% aplicado", cargo,
+            lambda tabela, linhas: tabela.decair(linhas, porcentagem, config)
+        )
+
+    @commands.command(name="xpdar")
+    @commands.has_permissions(administrator=True)
+    async def xp_dar(self, ctx, quantidade: int, cargo: discord.Role = None):
+        """Dá (ou tira, com valor negativo) XP a todos ou aos membros de um cargo."""
+        config = self.get_config(ctx.guild.id)
+        await self._operacao_em_massa(
+            ctx, f"🎁 {quantidade:+} XP concedido", cargo,
+            lambda tabela, linhas: tabela.conceder(linhas, quantidade, config)
+        )
+
+    @commands.command(name="xprecalcular")
+    @commands.has_permissions(administrator=True)
+    async def xp_recalcular(self, ctx, xp_por_nivel_antigo: typing.Optional[int] = None, cargo: discord.Role = None):
+        """Refaz os níveis com o xp_por_nivel atual, mantendo o XP acumulado (medido com o valor antigo, se informado)."""
+        config = self.get_config(ctx.guild.id)
+        if xp_por_nivel_antigo is not None and xp_por_nivel_antigo <= 0:
+            return await ctx.send("❌ O XP por nível antigo precisa ser positivo.")
+        antiga = replace(config, xp_por_nivel=xp_por_nivel_antigo) if xp_por_nivel_antigo else None
+        await self._operacao_em_massa(
+            ctx, "🧮 Níveis recalculados", cargo,
+            lambda tabela, linhas: tabela.recalcular(linhas, config, antiga)
+        )
+
     @commands.command(name="setvipxp")
     @commands.has_permissions(administrator=True)
     async def set_vip_multiplicador(self, ctx, valor: float):
         """Define o multiplicador de XP para usuários VIP."""
-        self.get_config()["vip_multiplicador_xp"] = valor
-        self.salvar()
+        await self.definir_config(ctx.guild.id, "vip_multiplicador_xp", valor)
         await ctx.send(f"✨ Multiplicador VIP de XP definido como {valor}x.")
 
     @commands.command(name="setvipcooldown")
     @commands.has_permissions(administrator=True)
     async def set_vip_cooldown(self, ctx, porcentagem: float):
         """Define a redução de cooldown para VIPs (0.5 = 50% de redução)."""
-        self.get_config()["vip_reducao_cooldown"] = porcentagem
-        self.salvar()
+        await self.definir_config(ctx.guild.id, "vip_reducao_cooldown", porcentagem)
         await ctx.send(f"⏱️ Redução de cooldown VIP definida como {int(porcentagem*100)}%.")
 
     # Comandos de configuração existentes
     @commands.command(name="setmensagensporxp")
     @commands.has_permissions(administrator=True)
     async def set_mensagens_por_xp(self, ctx, valor: int):
-        self.get_config()["mensagens_por_xp"] = valor
-        self.salvar()
+        await self.definir_config(ctx.guild.id, "mensagens_por_xp", valor)
         await ctx.send(f"✅ Mensagens por XP definido como {valor}.")
 
     @commands.command(name="setxpbase")
     @commands.has_permissions(administrator=True)
     async def set_xp_base(self, ctx, valor: int):
-        self.get_config()["xp_base"] = valor
-        self.salvar()
+        await self.definir_config(ctx.guild.id, "xp_base", valor)
         await ctx.send(f"✅ XP base definido como {valor}.")
 
     @commands.command(name="setxppornivel")
     @commands.has_permissions(administrator=True)
     async def set_xp_por_nivel(self, ctx, valor: int):
-        self.get_config()["xp_por_nivel"] = valor
-        self.salvar()
+        await self.definir_config(ctx.guild.id, "xp_por_nivel", valor)
         await ctx.send(f"✅ Multiplicador de XP por nível definido como {valor}.")
 
     @commands.command(name="setxpcooldown")
     @commands.has_permissions(administrator=True)
     async def set_cooldown(self, ctx, segundos: int):
-        self.get_config()["cooldown"] = segundos
-        self.salvar()
+        await self.definir_config(ctx.guild.id, "cooldown", segundos)
         await ctx.send(f"⏱️ Cooldown ajustado para {segundos} segundos.")
 
 async def setup(bot):
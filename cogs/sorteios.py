@@ -1,43 +1,85 @@
 import discord
 from discord.ext import commands
-import json
-import os
 import random
 import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Iterable
 from datetime import datetime
 
+from cogs._armazenamento import Armazenamento, obter_armazenamento
+from cogs._gravacao import GravacaoAtrasada
+from cogs._metricas import medir_listener, tamanho_cache, remover_cache
+
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
+EMOJI_SORTEIO = "🎉"
+
+class Participantes:
+    """Conjunto de IDs de participantes com entrada, saída e sorteio em O(1).
+
+    Guarda os IDs em uma lista e a posição de cada um em um dicionário;
+    para remover, o último elemento ocupa o lugar do que saiu.
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._lista: List[int] = []
+        self._posicao: Dict[int, int] = {}
+        for user_id in ids:
+            self.adicionar(user_id)
+
+    def __len__(self) -> int:
+        return len(self._lista)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._posicao
+
+    def __iter__(self):
+        return iter(self._lista)
+
+    def adicionar(self, user_id: int) -> bool:
+        """Adiciona um participante. Retorna False se ele já estava no sorteio."""
+        if user_id in self._posicao:
+            return False
+        self._posicao[user_id] = len(self._lista)
+        self._lista.append(user_id)
+        return True
+
+    def remover(self, user_id: int) -> bool:
+        """Remove um participante. Retorna False se ele não estava no sorteio."""
+        indice = self._posicao.pop(user_id, None)
+        if indice is None:
+            return False
+        ultimo = self._lista.pop()
+        if ultimo != user_id:
+            self._lista[indice] = ultimo
+            self._posicao[ultimo] = indice
+        return True
+
+    def sortear(self) -> Optional[int]:
+        """Escolhe um participante aleatório, ou None se não houver nenhum."""
+        return random.choice(self._lista) if self._lista else None
+
 class SorteioConfig:
     """Classe para gerenciar configurações de sorteio de forma mais estruturada."""
     
-    def __init__(self, caminho_arquivo: str = "data/sorteios.json"):
-        self.caminho_arquivo = caminho_arquivo
-        self._config = self._carregar_config()
+    def __init__(self, armazenamento: Armazenamento):
+        self.armazenamento = armazenamento
+        self._config: Dict[str, Any] = {}
     
-    def _carregar_config(self) -> Dict[str, Any]:
-        """Carrega as configurações do arquivo JSON."""
+    async def carregar(self) -> None:
+        """Carrega as configurações do banco."""
         try:
-            if not os.path.exists(self.caminho_arquivo):
-                # Cria o diretório se não existir
-                os.makedirs(os.path.dirname(self.caminho_arquivo), exist_ok=True)
-                return {}
-            
-            with open(self.caminho_arquivo, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError) as e:
+            self._config = await self.armazenamento.carregar("sorteios")
+        except Exception as e:
             logger.error(f"Erro ao carregar configurações: {e}")
-            return {}
+            self._config = {}
     
-    def salvar_config(self) -> bool:
-        """Salva as configurações no arquivo JSON."""
+    async def salvar_config(self, guild_id: int) -> bool:
+        """Salva a configuração de uma guild no banco."""
+        guild_str = str(guild_id)
         try:
-            os.makedirs(os.path.dirname(self.caminho_arquivo), exist_ok=True)
-            with open(self.caminho_arquivo, "w", encoding="utf-8") as f:
-                json.dump(self._config, f, indent=4, ensure_ascii=False)
+            await self.armazenamento.salvar("sorteios", {guild_str: self._config[guild_str]})
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar configurações: {e}")
@@ -47,14 +89,14 @@ class SorteioConfig:
         """Obtém a configuração de uma guild específica."""
         return self._config.get(str(guild_id), {})
     
-    def set_guild_config(self, guild_id: int, key: str, value: Any) -> bool:
+    async def set_guild_config(self, guild_id: int, key: str, value: Any) -> bool:
         """Define uma configuração para uma guild específica."""
         guild_str = str(guild_id)
         if guild_str not in self._config:
             self._config[guild_str] = {}
         
         self._config[guild_str][key] = value
-        return self.salvar_config()
+        return await self.salvar_config(guild_id)
 
 class SorteioEmbed:
     """Classe para criar embeds padronizados para sorteios."""
@@ -123,11 +165,147 @@ class Sorteios(commands.Cog):
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.config_manager = SorteioConfig()
-        self.sorteios_ativos: Dict[int, int] = {}  # guild_id: message_id
+        self.armazenamento = obter_armazenamento()
+        self.config_manager = SorteioConfig(self.armazenamento)
+        self.sorteios_ativos: Dict[int, Dict[str, Any]] = {}  # guild_id: {mensagem_id, canal_id, premio}
+        self.participantes: Dict[int, Participantes] = {}  # message_id: participantes
+
+        # Reações que chegam enquanto um sorteio é reconciliado com o Discord
+        self._reconciliando: Dict[int, List[Tuple[bool, int]]] = {}
+        self._reconciliacao: Optional[asyncio.Task] = None
+
+        # Entradas e saídas são gravadas em lote; grandes sorteios recebem muitas reações por segundo
+        self.gravacao = GravacaoAtrasada(
+            self._gravar_participantes,
+            intervalo=5.0,
+            limite_sujos=500,
+            nome="participantes de sorteio"
+        )
         
         logger.info("Cog de Sorteios inicializado com sucesso")
     
+    async def cog_load(self) -> None:
+        """Carrega as configurações e os sorteios ativos antes de registrar os comandos."""
+        await self.config_manager.carregar()
+
+        for guild_str, info in (await self.armazenamento.carregar("sorteios_ativos")).items():
+            ids = await self.armazenamento.carregar(self._colecao_participantes(info["mensagem_id"]))
+            self.sorteios_ativos[int(guild_str)] = info
+            self.participantes[info["mensagem_id"]] = Participantes(int(uid) for uid in ids)
+
+        self.gravacao.iniciar()
+        self._reconciliacao = asyncio.create_task(self._reconciliar_todos())
+        tamanho_cache("sorteio_participantes", lambda: sum(map(len, self.participantes.values())))
+
+    async def cog_unload(self) -> None:
+        remover_cache("sorteio_participantes")
+        if self._reconciliacao is not None:
+            self._reconciliacao.cancel()
+        await self.gravacao.parar()
+
+    @staticmethod
+    def _colecao_participantes(message_id: int) -> str:
+        return f"sorteio_participantes:{message_id}"
+
+    async def _gravar_participantes(self, chaves) -> None:
+        """Grava as entradas e saídas pendentes (chaves são (message_id, user_id))."""
+        alteracoes = []
+        for message_id, user_id in chaves:
+            participantes = self.participantes.get(message_id)
+            presente = participantes is not None and user_id in participantes
+            alteracoes.append((self._colecao_participantes(message_id), str(user_id), True if presente else None))
+        await self.armazenamento.gravar(alteracoes)
+
+    def _registrar_reacao(self, message_id: int, user_id: int, entrou: bool) -> None:
+        participantes = self.participantes.get(message_id)
+        if participantes is None:
+            return
+        if message_id in self._reconciliando:
+            self._reconciliando[message_id].append((entrou, user_id))
+
+        alterou = participantes.adicionar(user_id) if entrou else participantes.remover(user_id)
+        if alterou:
+            self.gravacao.marcar((message_id, user_id))
+
+    async def _reconciliar_todos(self) -> None:
+        """Confere os sorteios ativos com as reações reais depois de uma reinicialização."""
+        await self.bot.wait_until_ready()
+        for guild_id, info in list(self.sorteios_ativos.items()):
+            try:
+                await self._reconciliar(guild_id, info)
+            except Exception as e:
+                logger.error(f"Erro ao reconciliar sorteio {info['mensagem_id']}: {e}")
+
+    async def _reconciliar(self, guild_id: int, info: Dict[str, Any]) -> None:
+        message_id = info["mensagem_id"]
+        canal = self.bot.get_channel(info["canal_id"])
+        if canal is None:
+            return
+
+        self._reconciliando[message_id] = []
+        try:
+            try:
+                mensagem = await canal.fetch_message(message_id)
+            except discord.NotFound:
+                logger.info(f"Mensagem do sorteio {message_id} não existe mais, limpando registro")
+                await self._finalizar(guild_id)
+                return
+
+            reais = set()
+            reacao = discord.utils.get(mensagem.reactions, emoji=EMOJI_SORTEIO)
+            if reacao:
+                async for user in reacao.users(limit=None):
+                    if not user.bot:
+                        reais.add(user.id)
+
+            # Reações recebidas durante a paginação são mais novas que a lista buscada
+            for entrou, user_id in self._reconciliando[message_id]:
+                if entrou:
+                    reais.add(user_id)
+                else:
+                    reais.discard(user_id)
+
+            participantes = self.participantes.get(message_id)
+            if participantes is None:
+                return
+            for user_id in reais.difference(participantes):
+                participantes.adicionar(user_id)
+                self.gravacao.marcar((message_id, user_id))
+            for user_id in set(participantes).difference(reais):
+                participantes.remover(user_id)
+                self.gravacao.marcar((message_id, user_id))
+
+            logger.info(f"Sorteio {message_id} reconciliado: {len(participantes)} participantes")
+        finally:
+            self._reconciliando.pop(message_id, None)
+
+    async def _finalizar(self, guild_id: int) -> None:
+        """Remove o sorteio ativo da guild e seus participantes gravados."""
+        info = self.sorteios_ativos.pop(guild_id, None)
+        if info is None:
+            return
+        participantes = self.participantes.pop(info["mensagem_id"], None) or ()
+        colecao = self._colecao_participantes(info["mensagem_id"])
+        alteracoes = [("sorteios_ativos", str(guild_id), None)]
+        alteracoes += [(colecao, str(user_id), None) for user_id in participantes]
+        await self.armazenamento.gravar(alteracoes)
+
+    @commands.Cog.listener()
+    @medir_listener
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if payload.message_id not in self.participantes or str(payload.emoji) != EMOJI_SORTEIO:
+            return
+        if payload.member is not None and payload.member.bot:
+            return
+        self._registrar_reacao(payload.message_id, payload.user_id, True)
+
+    @commands.Cog.listener()
+    @medir_listener
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        if payload.message_id not in self.participantes or str(payload.emoji) != EMOJI_SORTEIO:
+            return
+        self._registrar_reacao(payload.message_id, payload.user_id, False)
+    
     def _verificar_permissao_canal(self, ctx: commands.Context) -> bool:
         """Verifica se o comando está sendo usado no canal correto."""
         guild_config = self.config_manager.get_guild_config(ctx.guild.id)
@@ -168,7 +346,7 @@ class Sorteios(commands.Cog):
         Aliases: !scc
         """
         try:
-            sucesso = self.config_manager.set_guild_config(
+            sucesso = await self.config_manager.set_guild_config(
                 ctx.guild.id, "canal_comando", canal.id
             )
             
@@ -205,7 +383,7 @@ class Sorteios(commands.Cog):
         Aliases: !ssc
         """
         try:
-            sucesso = self.config_manager.set_guild_config(
+            sucesso = await self.config_manager.set_guild_config(
                 ctx.guild.id, "canal_sorteio", canal.id
             )
             
@@ -274,10 +452,13 @@ class Sorteios(commands.Cog):
             # Criar e enviar embed do sorteio
             embed_sorteio = SorteioEmbed.criar_sorteio(premio, ctx.author)
             msg_sorteio = await canal_sorteio.send(embed=embed_sorteio)
-            await msg_sorteio.add_reaction("🎉")
             
-            # Registrar sorteio ativo
-            self.sorteios_ativos[ctx.guild.id] = msg_sorteio.id
+            # Registrar sorteio ativo antes da reação, para já receber as entradas
+            info = {"mensagem_id": msg_sorteio.id, "canal_id": canal_sorteio.id, "premio": premio}
+            self.sorteios_ativos[ctx.guild.id] = info
+            self.participantes[msg_sorteio.id] = Participantes()
+            await self.armazenamento.salvar("sorteios_ativos", {str(ctx.guild.id): info})
+            await msg_sorteio.add_reaction(EMOJI_SORTEIO)
             
             # Confirmar criação
             embed_confirmacao = SorteioEmbed.criar_sucesso(
@@ -329,37 +510,37 @@ class Sorteios(commands.Cog):
             await self._enviar_resposta(ctx, embed)
             return
         
-        canal_sorteio = self._obter_canal_sorteio(ctx.guild)
+        info = self.sorteios_ativos[ctx.guild.id]
+        canal_sorteio = ctx.guild.get_channel(info["canal_id"])
         if not canal_sorteio:
             embed = SorteioEmbed.criar_erro(
                 "Canal Não Encontrado",
-                "O canal de sorteios configurado não foi encontrado."
+                "O canal do sorteio não foi encontrado."
             )
             await self._enviar_resposta(ctx, embed)
             return
         
         try:
-            # Buscar mensagem do sorteio
-            msg_id = self.sorteios_ativos[ctx.guild.id]
-            msg_sorteio = await canal_sorteio.fetch_message(msg_id)
-            
-            # Encontrar reação do sorteio
-            reaction = discord.utils.get(msg_sorteio.reactions, emoji="🎉")
-            if not reaction:
-                embed = SorteioEmbed.criar_erro(
-                    "Sem Reações",
-                    "Nenhuma reação encontrada no sorteio."
-                )
-                await self._enviar_resposta(ctx, embed)
-                return
+            # Depois de uma reinicialização, espera a lista de participantes ser conferida
+            if self._reconciliacao is not None and not self._reconciliacao.done():
+                await asyncio.shield(self._reconciliacao)
+
+            participantes = self.participantes.get(info["mensagem_id"], Participantes())
+            total = len(participantes)
             
-            # Obter participantes (excluindo bots)
-            participantes = []
-            async for user in reaction.users():
-                if not user.bot:
-                    participantes.append(user)
+            # Sortear entre os participantes registrados; quem saiu do servidor é descartado
+            vencedor = None
+            while vencedor is None and len(participantes):
+                user_id = participantes.sortear()
+                vencedor = ctx.guild.get_member(user_id)
+                if vencedor is None:
+                    try:
+                        vencedor = await ctx.guild.fetch_member(user_id)
+                    except discord.NotFound:
+                        participantes.remover(user_id)
+                        self.gravacao.marcar((info["mensagem_id"], user_id))
             
-            if not participantes:
+            if vencedor is None:
                 embed = SorteioEmbed.criar_erro(
                     "Sem Participantes",
                     "Nenhum participante válido encontrado no sorteio."
@@ -367,38 +548,23 @@ class Sorteios(commands.Cog):
                 await self._enviar_resposta(ctx, embed)
                 return
             
-            # Escolher vencedor aleatoriamente
-            vencedor = random.choice(participantes)
-            
-            # Extrair prêmio do embed original
-            premio = msg_sorteio.embeds[0].description.split("**Prêmio:** ")[1].split("\n")[0]
-            
             # Anunciar vencedor
-            embed_vencedor = SorteioEmbed.criar_vencedor(vencedor, premio)
+            embed_vencedor = SorteioEmbed.criar_vencedor(vencedor, info["premio"])
             await canal_sorteio.send(embed=embed_vencedor)
             
             # Remover sorteio ativo
-            del self.sorteios_ativos[ctx.guild.id]
+            await self._finalizar(ctx.guild.id)
             
             # Confirmar para o administrador
             embed_confirmacao = SorteioEmbed.criar_sucesso(
                 "Vencedor Escolhido",
                 f"Vencedor anunciado: {vencedor.mention}\n" +
-                f"Total de participantes: **{len(participantes)}**"
+                f"Total de participantes: **{total}**"
             )
             await self._enviar_resposta(ctx, embed_confirmacao)
             
             logger.info(f"Vencedor escolhido na guild {ctx.guild.name}: {vencedor.name}")
             
-        except discord.NotFound:
-            embed = SorteioEmbed.criar_erro(
-                "Mensagem Não Encontrada",
-                "A mensagem do sorteio não foi encontrada."
-            )
-            await self._enviar_resposta(ctx, embed)
-            # Limpar sorteio inválido
-            if ctx.guild.id in self.sorteios_ativos:
-                del self.sorteios_ativos[ctx.guild.id]
         except Exception as e:
             logger.error(f"Erro ao escolher vencedor: {e}")
             embed = SorteioEmbed.criar_erro(
@@ -433,24 +599,24 @@ class Sorteios(commands.Cog):
             await self._enviar_resposta(ctx, embed)
             return
         
-        canal_sorteio = self._obter_canal_sorteio(ctx.guild)
+        info = self.sorteios_ativos[ctx.guild.id]
+        canal_sorteio = ctx.guild.get_channel(info["canal_id"])
         if not canal_sorteio:
             embed = SorteioEmbed.criar_erro(
                 "Canal Não Encontrado",
-                "O canal de sorteios configurado não foi encontrado."
+                "O canal do sorteio não foi encontrado."
             )
             await self._enviar_resposta(ctx, embed)
             return
         
         try:
+            # Remover sorteio ativo antes de limpar, para ignorar os eventos de remoção
+            await self._finalizar(ctx.guild.id)
+
             # Buscar e limpar mensagem do sorteio
-            msg_id = self.sorteios_ativos[ctx.guild.id]
-            msg_sorteio = await canal_sorteio.fetch_message(msg_id)
+            msg_sorteio = await canal_sorteio.fetch_message(info["mensagem_id"])
             await msg_sorteio.clear_reactions()
             
-            # Remover sorteio ativo
-            del self.sorteios_ativos[ctx.guild.id]
-            
             # Confirmar encerramento
             embed_confirmacao = SorteioEmbed.criar_sucesso(
                 "Sorteio Encerrado",
@@ -461,8 +627,6 @@ class Sorteios(commands.Cog):
             logger.info(f"Sorteio encerrado na guild {ctx.guild.name} por {ctx.author.name}")
             
         except discord.NotFound:
-            # Limpar sorteio inválido
-            del self.sorteios_ativos[ctx.guild.id]
             embed = SorteioEmbed.criar_erro(
                 "Mensagem Não Encontrada",
                 "A mensagem do sorteio não foi encontrada, mas o registro foi limpo."
@@ -543,13 +707,12 @@ class Sorteios(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild):
         """Remove configurações quando o bot sai de um servidor."""
-        if guild.id in self.sorteios_ativos:
-            del self.sorteios_ativos[guild.id]
+        await self._finalizar(guild.id)
         
         # Opcionalmente, limpar configurações salvas
         # guild_config = self.config_manager._config.pop(str(guild.id), None)
         # if guild_config:
-        #     self.config_manager.salvar_config()
+        #     await self.config_manager.armazenamento.remover("sorteios", [str(guild.id)])
         
         logger.info(f"Bot removido da guild {guild.name}, limpando dados temporários")
 
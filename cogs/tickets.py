@@ -1,28 +1,26 @@
 import discord
 from discord.ext import commands
-import json
-import os
 import asyncio  # necessário para o sleep
 
-CAMINHO_TICKETS = "data/tickets.json"
+from cogs._armazenamento import obter_armazenamento
 
-def carregar_config():
-    if not os.path.exists(CAMINHO_TICKETS):
-        return {}
-    with open(CAMINHO_TICKETS, "r", encoding="utf-8") as f:
-        return json.load(f)
+async def carregar_config(armazenamento):
+    return await armazenamento.carregar("tickets")
 
-def salvar_config(config):
-    with open(CAMINHO_TICKETS, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+async def salvar_config(armazenamento, config, guild_id):
+    await armazenamento.salvar("tickets", {guild_id: config[guild_id]})
 
 class Tickets(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config = carregar_config()
+        self.armazenamento = obter_armazenamento()
+        self.config = {}
 
-    def salvar(self):
-        salvar_config(self.config)
+    async def cog_load(self):
+        self.config = await carregar_config(self.armazenamento)
+
+    async def salvar(self, guild_id):
+        await salvar_config(self.armazenamento, self.config, guild_id)
 
     @commands.command(name="ticket")
     async def abrir_ticket(self, ctx):
@@ -87,7 +85,7 @@ class Tickets(commands.Cog):
             self.config[guild_id] = {}
 
         self.config[guild_id]["categoria_id"] = categoria.id
-        self.salvar()
+        await self.salvar(guild_id)
 
         await ctx.send(f"Categoria de tickets definida para **{categoria.name}**.")
 
@@ -101,7 +99,7 @@ class Tickets(commands.Cog):
             self.config[guild_id] = {}
 
         self.config[guild_id]["canal_comando"] = canal.id
-        self.salvar()
+        await self.salvar(guild_id)
 
         await ctx.send(f"O comando `!ticket` agora só pode ser usado em {canal.mention}.")
 
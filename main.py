@@ -1,36 +1,11 @@
 import os
 import discord
 from discord.ext import commands
-from flask import Flask
-import threading
-import requests
-import time
+from cogs._armazenamento import obter_armazenamento
+from cogs._migracao import migrar_arquivos_json
+from cogs._servidor import Servidor
 import asyncio
-
-# ==== Flask Server (Keep Alive) ====
-app = Flask(__name__)
-
-@app.route('/')
-def home():
-    return "✅ Bot está online!"
-
-def run_flask():
-    port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
-
-# ==== Auto-ping (a cada 10 minutos) ====
-def auto_ping():
-    while True:
-        try:
-            url = os.getenv("RENDER_EXTERNAL_URL")
-            if url:
-                requests.get(url)
-                print(f"✅ Auto-ping enviado para: {url}")
-            else:
-                print("⚠️ Variável RENDER_EXTERNAL_URL não encontrada.")
-        except Exception as e:
-            print(f"❌ Erro no auto-ping: {e}")
-        time.sleep(600)
+import signal
 
 # ==== Intents ====
 intents = discord.Intents.default()
@@ -53,11 +28,30 @@ async def load_cogs():
                 print(f"❌ Erro ao carregar o cog {filename}: {e}")
 
 async def main():
-    await load_cogs()
-    await bot.start(os.getenv("TOKEN"))
+    # SIGTERM (enviado pelo Render ao reiniciar) fecha o bot normalmente,
+    # descarregando os cogs para que gravem os dados pendentes
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, lambda: asyncio.create_task(bot.close())
+        )
+    except NotImplementedError:
+        pass  # Windows
+
+    armazenamento = obter_armazenamento()
+    await migrar_arquivos_json(armazenamento)
+
+    # Keep-alive, /healthz e /metrics no mesmo loop do bot
+    servidor = Servidor(bot)
+    await servidor.iniciar()
+
+    try:
+        async with bot:
+            await load_cogs()
+            await bot.start(os.getenv("TOKEN"))
+    finally:
+        await servidor.parar()
+        await armazenamento.fechar()
 
 # ==== Início ====
 if __name__ == "__main__":
-    threading.Thread(target=run_flask).start()
-    threading.Thread(target=auto_ping).start()
     asyncio.run(main())
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from cogs._agendador import FOLGA_HEAP, RETENTATIVA_INICIAL, Agendador
+
+
+def test_reagendar_nao_acumula_entradas_no_heap():
+    async def cenario():
+        agendador = Agendador()
+        for vez in range(10_000):
+            await agendador.agendar(f"msg:{vez % 5}", time.time() + vez, "mensagem")
+        assert len(agendador) == 5
+        assert len(agendador._heap) <= 2 * len(agendador) + FOLGA_HEAP + 1
+
+        for chave in list(agendador._itens):
+            await agendador.cancelar(chave)
+        assert len(agendador._heap) <= FOLGA_HEAP + 1
+
+    asyncio.run(cenario())
+
+
+def test_tratador_que_falha_e_tentado_de_novo():
+    async def cenario():
+        agendador = Agendador()
+        chamadas = []
+
+        async def tratador(itens):
+            chamadas.append(sorted(chave for chave, _ in itens))
+            if len(chamadas) == 1:
+                raise RuntimeError("discord fora do ar")
+            return ["b"] if len(chamadas) == 2 else None
+
+        agendador.registrar("desmute", tratador)
+        await agendador.agendar("a", 0, "desmute")
+        await agendador.agendar("b", 0, "desmute")
+
+        agora = time.time()
+        await agendador._disparar(agendador._retirar_vencidos(agora))
+        assert sorted(agendador._itens) == ["a", "b"]
+        assert agendador.vencimento("a") >= agora + RETENTATIVA_INICIAL
+
+        # Só o item devolvido como falha volta, com espera maior
+        await agendador._disparar(agendador._retirar_vencidos(agora + RETENTATIVA_INICIAL + 1))
+        assert list(agendador._itens) == ["b"]
+        assert agendador.vencimento("b") >= agora + 2 * RETENTATIVA_INICIAL
+
+        await agendador._disparar(agendador._retirar_vencidos(agora + 10 * RETENTATIVA_INICIAL))
+        assert len(agendador) == 0
+        assert chamadas == [["a", "b"], ["a", "b"], ["b"]]
+
+    asyncio.run(cenario())
@@ -0,0 +1,82 @@
+import asyncio
+
+import cogs.economia as economia
+from cogs._armazenamento import Armazenamento
+from cogs._ledger import Ledger
+from cogs._profiles import create_tables
+from cogs._shards import ShardCache
+
+
+def test_saldos_sao_refeitos_pelo_snapshot_e_pelo_final_do_ledger(tmp_path):
+    async def cenario():
+        armazenamento = Armazenamento(str(tmp_path / "ledger.db"))
+        try:
+            ledger = Ledger(armazenamento)
+            await ledger.setup()
+            contas = {"1:10": {"money": 0, "bank": 0}, "1:20": {"money": 0, "bank": 0}, "2:10": {"money": 0, "bank": 0}}
+
+            def mover(chave, conta, delta, motivo):
+                contas[chave][conta] += delta
+                ledger.add(chave, conta, delta, motivo)
+
+            mover("1:10", "money", 500, "daily")
+            mover("1:20", "money", 300, "work")
+            mover("1:10", "money", -200, "depositar")
+            mover("1:10", "bank", 200, "depositar")
+            await ledger.commit()
+            assert await ledger.snapshot(contas) == 2
+
+            # Depois do snapshot: só estas linhas precisam ser somadas ao reiniciar
+            mover("1:20", "money", -50, "loja")
+            mover("2:10", "money", 75, "abertura")
+            mover("1:10", "bank", -20, "sacar")
+            mover("1:10", "money", 20, "sacar")
+            await ledger.commit()
+
+            relido = Ledger(armazenamento)
+            assert await relido.load_balances() == contas
+            assert relido.snapshot_id == ledger.snapshot_id
+            assert await relido.load_balances(prefix="1:") == {k: v for k, v in contas.items() if k.startswith("1:")}
+            # Saldos antigos (de antes do ledger) só valem para quem ainda não tem snapshot
+            base = {"9:1": {"money": 7, "bank": 0}, "1:10": {"money": 999, "bank": 999}}
+            assert await relido.load_balances(base=base) == {**contas, "9:1": {"money": 7, "bank": 0}}
+        finally:
+            await armazenamento.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_transferencias_opostas_nao_travam_e_conservam_o_total(tmp_path, monkeypatch):
+    armazenamento = Armazenamento(str(tmp_path / "economia.db"))
+    ledger = Ledger(armazenamento)
+    monkeypatch.setattr(economia, "armazenamento", armazenamento)
+    monkeypatch.setattr(economia, "ledger", ledger)
+    monkeypatch.setattr(economia, "shards", ShardCache(economia._load_shard))
+    economia.partitioned.set()
+
+    async def transferir(origem, destino, valor):
+        async with economia.Transaction(1, origem, destino) as tx:
+            # Cede o loop com as travas na mão, para as transações se intercalarem
+            await asyncio.sleep(0)
+            tx.transfer(origem, destino, valor, "pagar")
+
+    async def cenario():
+        try:
+            await ledger.setup()
+            await armazenamento.executar(create_tables)
+            pedidos = [transferir(10, 20, 3) if i % 2 else transferir(20, 10, 2) for i in range(200)]
+            await asyncio.wait_for(asyncio.gather(*pedidos), timeout=10)
+
+            shard = await economia.shards.get(1)
+            saldos = {uid: shard.profiles[uid]["money"] for uid in ("10", "20")}
+            # Cada conta abre com 100; 100 transferências de 3 para um lado e 100 de 2 para o outro
+            assert saldos == {"10": 100 - 300 + 200, "20": 100 + 300 - 200}
+            assert len(economia.user_locks) == 0
+
+            relidos = await Ledger(armazenamento).load_balances(prefix="1:")
+            assert sum(saldo["money"] for saldo in relidos.values()) == 200
+            assert {k: v["money"] for k, v in relidos.items()} == {"1:10": saldos["10"], "1:20": saldos["20"]}
+        finally:
+            await armazenamento.fechar()
+
+    asyncio.run(cenario())
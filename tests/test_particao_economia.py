@@ -0,0 +1,53 @@
+import json
+import sqlite3
+
+from cogs._lottery import create_tables as create_lottery_tables
+from cogs._profiles import create_tables, new_profile, pack, read_guild_profiles, write_profiles
+from cogs._shards import PARTITION_KEY, legacy_pending, partition_legacy
+
+
+def _banco():
+    conexao = sqlite3.connect(":memory:")
+    conexao.execute(
+        "CREATE TABLE registros (colecao TEXT NOT NULL, chave TEXT NOT NULL, valor TEXT NOT NULL,"
+        " PRIMARY KEY (colecao, chave)) WITHOUT ROWID"
+    )
+    create_tables(conexao)
+    create_lottery_tables(conexao)
+    return conexao
+
+
+def _saldos(conexao):
+    return {
+        chave: json.loads(valor)
+        for chave, valor in conexao.execute("SELECT chave, valor FROM registros WHERE colecao = 'economia_saldos'")
+    }
+
+
+def test_membro_de_dois_servidores_mantem_o_total_de_dinheiro():
+    conexao = _banco()
+    write_profiles(conexao, [("1", pack(new_profile())), ("2", pack(new_profile()))])
+    conexao.executemany(
+        "INSERT INTO economia_loteria_bilhetes (round, user_id, mask) VALUES (?, ?, ?)",
+        [(7, 1, 0b111111), (7, 1, 0b1111110), (7, 2, 0b111111)]
+    )
+    balances = {"1": {"money": 500, "bank": 1500}, "2": {"money": 30, "bank": 0}}
+    assert legacy_pending(conexao)
+
+    # O usuário 1 está nos dois servidores; o 2, só no menor
+    partition_legacy(conexao, {10: ["1", "2"], 20: ["1", "3", "4"]}, balances, 7)
+
+    saldos = _saldos(conexao)
+    contas_1 = [chave for chave in saldos if chave.endswith(":1")]
+    assert contas_1 == ["20:1"]
+    for conta in ("money", "bank"):
+        assert sum(saldo[conta] for saldo in saldos.values()) == sum(saldo[conta] for saldo in balances.values())
+
+    bilhetes = conexao.execute("SELECT user_id, guild_id FROM economia_loteria_bilhetes ORDER BY user_id").fetchall()
+    assert bilhetes == [(1, 20), (1, 20), (2, 10)]
+    assert set(read_guild_profiles(conexao, 20)) == {"1"}
+    assert set(read_guild_profiles(conexao, 10)) == {"2"}
+    assert not legacy_pending(conexao)
+    assert conexao.execute(
+        "SELECT 1 FROM registros WHERE colecao = '_meta' AND chave = ?", (PARTITION_KEY,)
+    ).fetchone()
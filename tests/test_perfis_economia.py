@@ -0,0 +1,25 @@
+import struct
+
+from cogs._profiles import new_profile, pack, unpack
+
+
+def test_item_com_nome_longo_volta_igual():
+    perfil = new_profile()
+    perfil.update(level=3, xp=40, daily_claimed=1_700_000_000)
+    perfil['inventory'] = {"💎": 2, "🎁" * 100: 1, "Espada " * 60: 5}
+    assert len(("🎁" * 100).encode('utf-8')) > 255
+
+    assert unpack(pack(perfil)) == perfil
+
+
+def test_le_perfis_da_versao_1():
+    # Versão 1: tamanho do emoji em um único byte
+    emoji = "🔥".encode('utf-8')
+    raw = (
+        struct.pack("<BIIIIIH", 1, 2, 15, 0, 0, 0, 1)
+        + bytes((len(emoji),)) + emoji + struct.pack("<I", 3)
+        + struct.pack("<I", 0)
+    )
+    perfil = unpack(raw)
+    assert perfil['inventory'] == {"🔥": 3}
+    assert (perfil['level'], perfil['xp'], perfil['daily_claimed']) == (2, 15, None)
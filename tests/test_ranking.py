@@ -0,0 +1,116 @@
+import random
+from bisect import bisect_left
+
+import pytest
+
+from cogs._ranking import ListaOrdenada, Ranking
+
+
+class ListaPequena(ListaOrdenada):
+    # Blocos minúsculos para que divisões e blocos esvaziados aconteçam com poucos valores
+    CARGA = 4
+
+
+def _conferir(lista, modelo):
+    assert list(lista) == modelo
+    assert len(lista) == len(modelo)
+    for valor in set(modelo):
+        assert lista.indice(valor) == bisect_left(modelo, valor)
+    for inicio in range(-1, len(modelo) + 2):
+        for fim in (inicio, inicio + 1, inicio + 5, len(modelo) + 3):
+            assert lista.fatia(inicio, fim) == modelo[max(inicio, 0):max(fim, 0)]
+    # A árvore de Fenwick tem que bater com o tamanho dos blocos
+    for i in range(len(lista._blocos) + 1):
+        assert lista._antes_do_bloco(i) == sum(len(bloco) for bloco in lista._blocos[:i])
+
+
+def test_operacoes_aleatorias_iguais_a_sorted():
+    sorteio = random.Random(4)
+    lista = ListaPequena()
+    modelo = []
+    for _ in range(2000):
+        if modelo and sorteio.random() < 0.45:
+            valor = sorteio.choice(modelo)
+            lista.remover(valor)
+            modelo.remove(valor)
+        else:
+            # Poucos valores distintos: muitas duplicatas
+            valor = sorteio.randrange(30)
+            lista.adicionar(valor)
+            modelo.append(valor)
+            modelo.sort()
+        assert list(lista) == modelo
+    _conferir(lista, modelo)
+
+
+def test_divisao_de_blocos_com_duplicatas():
+    lista = ListaPequena([5] * 3)
+    modelo = [5] * 3
+    for valor in [5] * 10 + [1] * 10 + [9] * 10:
+        lista.adicionar(valor)
+        modelo.append(valor)
+    modelo.sort()
+    assert len(lista._blocos) > 1
+    assert all(len(bloco) <= 2 * ListaPequena.CARGA for bloco in lista._blocos)
+    _conferir(lista, modelo)
+
+
+def test_remover_o_ultimo_valor_de_um_bloco():
+    modelo = list(range(12))
+    lista = ListaPequena(modelo)
+    assert [len(bloco) for bloco in lista._blocos] == [4, 4, 4]
+
+    # Esvazia o bloco do meio, começando pelo maior valor dele
+    for valor in (7, 6, 5, 4):
+        lista.remover(valor)
+        modelo.remove(valor)
+        _conferir(lista, modelo)
+    assert len(lista._blocos) == 2
+
+    # O maior valor do último bloco e depois o bloco inteiro
+    for valor in (11, 10, 9, 8):
+        lista.remover(valor)
+        modelo.remove(valor)
+        _conferir(lista, modelo)
+    assert len(lista._blocos) == 1
+
+    # Valores maiores que todos voltam para o fim
+    for valor in (20, 15):
+        lista.adicionar(valor)
+        modelo = sorted(modelo + [valor])
+        _conferir(lista, modelo)
+
+
+def test_valor_ausente():
+    lista = ListaPequena([1, 2, 3])
+    with pytest.raises(ValueError):
+        lista.remover(4)
+    with pytest.raises(ValueError):
+        lista.indice(0)
+    assert ListaPequena().fatia(0, 10) == []
+
+
+def test_ranking_igual_a_ordenacao_ingenua(monkeypatch):
+    monkeypatch.setattr(ListaOrdenada, "CARGA", 4)
+    sorteio = random.Random(7)
+    pontuacoes = {uid: (sorteio.randrange(1, 4), sorteio.randrange(0, 3)) for uid in range(1, 40)}
+    ranking = Ranking(pontuacoes)
+
+    for _ in range(500):
+        uid = sorteio.randrange(1, 60)
+        if uid in pontuacoes and sorteio.random() < 0.2:
+            ranking.remover(uid)
+            del pontuacoes[uid]
+        else:
+            pontuacoes[uid] = (sorteio.randrange(1, 4), sorteio.randrange(0, 3))
+            ranking.atualizar(uid, *pontuacoes[uid])
+
+    # Maior pontuação primeiro; empates pelo menor id
+    esperado = sorted(((uid, *p) for uid, p in pontuacoes.items()), key=lambda e: (-e[1], -e[2], e[0]))
+    assert len(ranking) == len(esperado)
+    for posicao, (uid, *_) in enumerate(esperado, 1):
+        assert ranking.posicao(uid) == posicao
+    for numero in range(1, len(esperado) // 10 + 3):
+        assert ranking.pagina(numero) == esperado[(numero - 1) * 10:numero * 10]
+    assert ranking.top(3) == esperado[:3]
+    assert ranking.posicao(10_000) is None
@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from cogs._armazenamento import Armazenamento
+from cogs._tabela_xp import TAMANHO_BLOCO, TabelaXP, criar_tabela, gravar_blocos, ler_blocos
+from cogs.sistema_xp import SistemaXP, carregar_tabelas
+
+
+def _preencher(tabela, quantidade):
+    for i in range(quantidade):
+        usuario = tabela.registro(10_000 + i * 7)
+        usuario.update(xp=i, nivel=1 + i % 50, mensagens=i * 3, vip=i % 11 == 0,
+                       vip_expira=1_700_000_000 + i if i % 22 == 0 else None)
+
+
+def _criar(quantidade):
+    tabela = TabelaXP()
+    _preencher(tabela, quantidade)
+    return tabela
+
+
+def _gravar_e_ler(tabela, guild_id=1):
+    conexao = sqlite3.connect(":memory:")
+    criar_tabela(conexao)
+    gravar_blocos(conexao, [(guild_id, bloco, tabela.serializar_bloco(bloco)) for bloco in range(tabela.blocos)])
+    return TabelaXP.desserializar(ler_blocos(conexao)[guild_id])
+
+
+def _linhas(tabela):
+    return [(int(uid), tabela.registro(int(uid)).para_dict()) for uid in tabela.coluna("ids")]
+
+
+def test_ida_e_volta_atravessando_blocos():
+    tabela = _criar(2 * TAMANHO_BLOCO + 5)
+    assert tabela.blocos == 3
+
+    relida = _gravar_e_ler(tabela)
+    assert len(relida) == len(tabela)
+    assert _linhas(relida) == _linhas(tabela)
+    assert relida.top(10) == tabela.top(10)
+    # O índice id → linha também volta: os membros dos dois lados da fronteira são achados
+    for linha in (TAMANHO_BLOCO - 1, TAMANHO_BLOCO, 2 * TAMANHO_BLOCO):
+        assert relida.procurar(10_000 + linha * 7) == linha
+
+
+def test_linhas_criadas_por_consulta_depois_de_recarregar():
+    tabela = _gravar_e_ler(_criar(TAMANHO_BLOCO - 1))
+    # A primeira linha nova fecha o bloco 0 e a segunda abre o bloco 1
+    for uid in (1, 2):
+        assert uid not in tabela
+        tabela.registro(uid)["xp"] = uid * 100
+    relida = _gravar_e_ler(tabela)
+    assert relida.procurar(1) == TAMANHO_BLOCO - 1
+    assert relida.procurar(2) == TAMANHO_BLOCO
+    assert relida.registro(2)["xp"] == 200
+
+
+def test_bloco_ausente_ou_incompleto_e_recusado():
+    tabela = _criar(2 * TAMANHO_BLOCO + 1)
+    blocos = [(bloco, tabela.serializar_bloco(bloco)) for bloco in range(tabela.blocos)]
+    with pytest.raises(ValueError):
+        TabelaXP.desserializar([blocos[0], blocos[2]])
+    with pytest.raises(ValueError):
+        TabelaXP.desserializar([(0, tabela.serializar(0, 10)), blocos[1]])
+    # A ordem em que os blocos chegam não importa
+    assert _linhas(TabelaXP.desserializar(reversed(blocos))) == _linhas(tabela)
+
+
+def test_membro_visto_so_pelo_xp_e_gravado(tmp_path):
+    async def cenario():
+        cog = SistemaXP(bot=None)
+        cog.armazenamento = Armazenamento(str(tmp_path / "xp.db"))
+        try:
+            cog.tabelas = await carregar_tabelas(cog.armazenamento)
+            # Só consultas, como o !xp faz: nenhuma chamada a salvar()
+            for uid in range(1, TAMANHO_BLOCO + 3):
+                cog.get_usuario(42, uid)
+            assert cog.gravacao.pendentes == 2
+            await cog.gravacao.gravar_pendentes()
+
+            tabela = (await carregar_tabelas(cog.armazenamento))["42"]
+            assert len(tabela) == TAMANHO_BLOCO + 2
+            assert tabela.procurar(TAMANHO_BLOCO + 2) == TAMANHO_BLOCO + 1
+        finally:
+            await cog.armazenamento.fechar()
+
+    asyncio.run(cenario())